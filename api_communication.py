@@ -1,9 +1,50 @@
-from typing import Any, Dict, Optional
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
 
 import asyncio
-from anthropic import AsyncAnthropic
-from writerai import AsyncWriter
-from utils import print_error, print_warning
+import importlib
+import json
+import time
+from utils import estimate_tokens, print_error, print_warning
+
+# Provider SDKs are imported lazily inside each backend so that a run only pays
+# the import cost (httpx, pydantic models, ...) of the provider it actually uses.
+# The interactive CLI preloads them all with preload_backends while it waits for input.
+
+# Responses kept per backend when a task profile enables caching
+RESPONSE_CACHE_SIZE = 1024
+
+# Labels attached to per-call metrics; set by callers for the duration of a task
+current_task_name: ContextVar[Optional[str]] = ContextVar(
+    "current_task_name", default=None
+)
+current_test_case: ContextVar[Optional[str]] = ContextVar(
+    "current_test_case", default=None
+)
+current_run_id: ContextVar[Optional[int]] = ContextVar("current_run_id", default=None)
+# The (provider, model) that served the current call, set by backends that route requests
+# to other providers (KeyPool) so per-call metrics name the model actually used
+served_by: ContextVar[Optional[Tuple[str, str]]] = ContextVar("served_by", default=None)
+
+
+class APIStatusError(Exception):
+    """Raised by backends that talk HTTP directly when the server returns an error status."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
 
 
 def handle_http_error(error: Exception) -> None:
@@ -27,9 +68,195 @@ def handle_http_error(error: Exception) -> None:
         print_error(f"Unexpected HTTP error: {error})")
 
 
-class AnthropicAPI:
-    def __init__(self, api_key: str):
+class LLMBackend(ABC):
+    """
+    Async interface shared by every provider backend.
+
+    Subclasses implement `get_client`, `_complete` and `_stream`; retries, usage
+    accounting and batching are handled here.
+    """
+
+    provider_name = ""
+    # Modules imported by get_client, preloaded by preload_backends
+    sdk_modules: Tuple[str, ...] = ()
+    # Whether _complete_structured is implemented
+    supports_structured_output = False
+
+    def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key
+        self._client = None
+        self.usage = {
+            "requests": 0,
+            "errors": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+        }
+        self._response_cache: OrderedDict = OrderedDict()
+        # Identical deterministic requests in flight: request key -> [task, waiter count]
+        self._in_flight: Dict[Tuple, List[Any]] = {}
+        # Callables receiving a metrics dict for every API call attempt
+        self.call_listeners: List[Callable[[Dict[str, Any]], None]] = []
+        # Optional object with an async acquire() awaited before every request attempt
+        self.rate_limiter: Optional[Any] = None
+
+    @abstractmethod
+    def get_client(self) -> Any:
+        """
+        Returns the provider client, importing the SDK and creating the client on first use.
+
+        Returns:
+            Any: The shared client for this backend.
+        """
+
+    @abstractmethod
+    async def _complete(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        stop_sequences: List[str],
+        timeout: Optional[float],
+    ) -> Tuple[str, int, int]:
+        """
+        Sends a single request without retries.
+
+        Args:
+            prompt (str): The prompt for generating the response.
+            model (str): The model to use for generating the response.
+            max_tokens (int): The maximum number of tokens to sample.
+            temperature (float): The sampling temperature.
+            stop_sequences (List[str]): Sequences that end generation.
+            timeout (Optional[float]): Request timeout in seconds, or None for the client default.
+
+        Returns:
+            Tuple[str, int, int]: The response text, input tokens and output tokens.
+        """
+
+    @abstractmethod
+    def _stream(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        stop_sequences: List[str],
+        timeout: Optional[float],
+    ) -> AsyncIterator[str]:
+        """
+        Sends a single streaming request without retries.
+
+        Args:
+            prompt (str): The prompt for generating the response.
+            model (str): The model to use for generating the response.
+            max_tokens (int): The maximum number of tokens to sample.
+            temperature (float): The sampling temperature.
+            stop_sequences (List[str]): Sequences that end generation.
+            timeout (Optional[float]): Request timeout in seconds, or None for the client default.
+
+        Returns:
+            AsyncIterator[str]: The response text, chunk by chunk.
+        """
+
+    async def _complete_structured(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        timeout: Optional[float],
+        schema: Dict[str, Any],
+    ) -> Tuple[Dict[str, Any], int, int]:
+        """
+        Sends a single request whose answer must follow a schema, without retries.
+        Only backends with `supports_structured_output` implement it.
+
+        Args:
+            prompt (str): The prompt for generating the response.
+            model (str): The model to use for generating the response.
+            max_tokens (int): The maximum number of tokens to sample.
+            temperature (float): The sampling temperature.
+            timeout (Optional[float]): Request timeout in seconds, or None for the client default.
+            schema (Dict[str, Any]): The output's "name", "description" and JSON Schema "parameters".
+
+        Returns:
+            Tuple[Dict[str, Any], int, int]: The output, input tokens and output tokens.
+        """
+        raise NotImplementedError(
+            f"{self.provider_name} does not support structured output."
+        )
+
+    def _record_usage(self, input_tokens: int, output_tokens: int) -> None:
+        self.usage["requests"] += 1
+        self.usage["input_tokens"] += input_tokens
+        self.usage["output_tokens"] += output_tokens
+
+    def _emit_call(
+        self,
+        model: str,
+        started: float,
+        input_tokens: int,
+        output_tokens: int,
+        error: Optional[Exception] = None,
+        coalesced: bool = False,
+        success: Optional[bool] = None,
+    ) -> None:
+        if not self.call_listeners:
+            return
+        # Each attempt clears served_by first; a coalesced request made no call of its own
+        routed = None if coalesced else served_by.get()
+        provider, model = routed or (self.provider_name, model)
+        metrics = {
+            "provider": provider,
+            "task": current_task_name.get(),
+            "test_case": current_test_case.get(),
+            "run_id": current_run_id.get(),
+            "model": model,
+            "latency": time.perf_counter() - started,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "success": error is None if success is None else success,
+            "status_code": getattr(error, "status_code", None),
+            # True for a request served by an identical in-flight request's API call
+            "coalesced": coalesced,
+        }
+        for listener in self.call_listeners:
+            # A failing listener (e.g. a locked history database) must not fail the request
+            try:
+                listener(metrics)
+            except Exception as e:
+                print_warning(f"Could not record API call metrics: {e}")
+
+    async def warm_up(self) -> None:
+        """
+        Creates the client and opens a connection to the provider, so the first request
+        skips the SDK import and DNS, TCP and TLS setup. Failures are ignored; the first
+        request then connects as usual.
+
+        Returns:
+            None
+        """
+        import httpx
+
+        try:
+            # Any response, even an error status, leaves an open connection in the pool
+            await self.get_client().with_options(max_retries=0).get(
+                "/", cast_to=httpx.Response
+            )
+        except Exception:
+            pass
+
+    def get_usage(self) -> Dict[str, int]:
+        """
+        Reports the usage accumulated by this backend.
+
+        Returns:
+            Dict[str, int]: Counts of successful requests, errors, input tokens, output tokens,
+            cache hits and requests coalesced into an identical in-flight request.
+        """
+        return dict(self.usage)
 
     async def send_request_to_model(
         self,
@@ -38,9 +265,17 @@ class AnthropicAPI:
         max_tokens_to_sample: int = 4000,
         temperature: float = 0,
         max_retries: int = 10,
+        timeout: Optional[float] = None,
+        stop_sequences: Optional[List[str]] = None,
+        retry_initial_delay: float = 0.5,
+        retry_backoff: float = 1.5,
+        cache: bool = False,
+        stream: bool = False,
+        coalesce: bool = True,
+        schema: Optional[Dict[str, Any]] = None,
     ) -> Optional[str]:
         """
-        Sends a request to the Anthropic API to generate a response based on the given prompt.
+        Sends a request to the provider to generate a response based on the given prompt.
 
         Args:
             prompt (str): The prompt for generating the response.
@@ -48,34 +283,175 @@ class AnthropicAPI:
             max_tokens_to_sample (int, optional): The maximum number of tokens to sample. Defaults to 4000.
             temperature (float, optional): The temperature parameter for controlling the randomness of the generated response. Defaults to 0.
             max_retries (int, optional): The maximum number of retries in case of an error. Defaults to 10.
+            timeout (Optional[float], optional): Request timeout in seconds. Defaults to the client default.
+            stop_sequences (Optional[List[str]], optional): Sequences that end generation. Defaults to None.
+            retry_initial_delay (float, optional): Seconds to wait after the first rate-limit error. Defaults to 0.5.
+            retry_backoff (float, optional): Multiplier applied to the wait after each rate-limit error. Defaults to 1.5.
+            cache (bool, optional): Whether to reuse the response to an identical earlier request. Defaults to False.
+            stream (bool, optional): Whether to stream the response and join the chunks. Defaults to False.
+            coalesce (bool, optional): Whether a request identical to one already in flight waits for
+                that request's response instead of calling the API again. Only applies at temperature 0,
+                where identical requests are expected to get the same response. Defaults to True.
+            schema (Optional[Dict[str, Any]], optional): Requests the answer as structured output following
+                this schema (see `_complete_structured`) and returns it as JSON. Requires a backend with
+                `supports_structured_output`; `stream` is ignored. Defaults to None.
 
         Returns:
-            Optional[str]: The generated response from the Claude API, or None if an error occurred.
+            Optional[str]: The generated response, or None if an error occurred.
         """
-        rate_limit_sleep_time = 0.5
+        stop_sequences = stop_sequences or []
+        cache_key = (
+            model,
+            prompt,
+            temperature,
+            max_tokens_to_sample,
+            tuple(stop_sequences),
+            schema["name"] if schema else None,
+        )
+        if cache and cache_key in self._response_cache:
+            self.usage["cache_hits"] += 1
+            self._response_cache.move_to_end(cache_key)
+            return self._response_cache[cache_key]
+
+        async def request() -> Optional[str]:
+            if stream and schema is None:
+                chunks = [
+                    chunk
+                    async for chunk in self.stream_request_to_model(
+                        prompt,
+                        model,
+                        max_tokens_to_sample,
+                        temperature,
+                        max_retries,
+                        timeout,
+                        stop_sequences,
+                        retry_initial_delay,
+                        retry_backoff,
+                    )
+                ]
+                return "".join(chunks) or None
+            return await self._send_with_retries(
+                prompt,
+                model,
+                max_tokens_to_sample,
+                temperature,
+                max_retries,
+                timeout,
+                stop_sequences,
+                retry_initial_delay,
+                retry_backoff,
+                schema,
+            )
+
+        if coalesce and temperature == 0:
+            text = await self._coalesce(cache_key, request)
+        else:
+            text = await request()
+
+        if cache and text is not None:
+            self._response_cache[cache_key] = text
+            if len(self._response_cache) > RESPONSE_CACHE_SIZE:
+                self._response_cache.popitem(last=False)
+        return text
+
+    async def _coalesce(
+        self, key: Tuple, request: Callable[[], Awaitable[Optional[str]]]
+    ) -> Optional[str]:
+        # Singleflight: the first caller for a key starts the request, and identical calls
+        # made before it finishes wait for the same task. The task is shielded so one
+        # cancelled caller does not cancel it for the others; it is only cancelled once
+        # every caller has gone, and is unregistered first so a later identical request
+        # starts afresh instead of awaiting the cancelled task.
+        #
+        # The task runs in the first caller's context, so the API call's metrics (tokens,
+        # test case, run and suite labels) are credited to that caller, which is the one
+        # that spent the tokens. Every other caller emits its own record, flagged
+        # "coalesced", with the time it waited and no tokens.
+        entry = self._in_flight.get(key)
+        leader = entry is None
+        if leader:
+            entry = [asyncio.ensure_future(request()), 0]
+            self._in_flight[key] = entry
+
+            def unregister(_: asyncio.Future) -> None:
+                if self._in_flight.get(key) is entry:
+                    del self._in_flight[key]
+
+            entry[0].add_done_callback(unregister)
+        else:
+            self.usage["coalesced"] += 1
+        task = entry[0]
+        entry[1] += 1
+        started = time.perf_counter()
+        try:
+            text = await asyncio.shield(task)
+        finally:
+            entry[1] -= 1
+            if not entry[1] and not task.done():
+                if self._in_flight.get(key) is entry:
+                    del self._in_flight[key]
+                task.cancel()
+        if not leader:
+            # key[0] is the model
+            self._emit_call(
+                key[0], started, 0, 0, coalesced=True, success=text is not None
+            )
+        return text
+
+    async def _send_with_retries(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens_to_sample: int,
+        temperature: float,
+        max_retries: int,
+        timeout: Optional[float],
+        stop_sequences: List[str],
+        retry_initial_delay: float,
+        retry_backoff: float,
+        schema: Optional[Dict[str, Any]] = None,
+    ) -> Optional[str]:
+        rate_limit_sleep_time = retry_initial_delay
         for _ in range(max_retries):
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            started = time.perf_counter()
+            served_by.set(None)
             try:
-                async with AsyncAnthropic() as client:
-                    completion = await client.messages.create(
-                        model=model,
-                        max_tokens=max_tokens_to_sample,
-                        temperature=temperature,
-                        messages=[
-                            {
-                                "role": "user",
-                                "content": prompt,
-                            }
-                        ],
+                if schema is None:
+                    text, input_tokens, output_tokens = await self._complete(
+                        prompt,
+                        model,
+                        max_tokens_to_sample,
+                        temperature,
+                        stop_sequences,
+                        timeout,
                     )
-                    return completion.content[0].text
+                else:
+                    output, input_tokens, output_tokens = (
+                        await self._complete_structured(
+                            prompt,
+                            model,
+                            max_tokens_to_sample,
+                            temperature,
+                            timeout,
+                            schema,
+                        )
+                    )
+                    text = json.dumps(output)
+                self._record_usage(input_tokens, output_tokens)
+                self._emit_call(model, started, input_tokens, output_tokens)
+                return text
             except Exception as e:
+                self.usage["errors"] += 1
+                self._emit_call(model, started, 0, 0, e)
                 if hasattr(e, "status_code"):
-                    if e.status_code == 429:  # Anthropic API rate limit exceeded
+                    if e.status_code == 429:  # API rate limit exceeded
                         print_warning(
                             f"Rate limit exceeded. Waiting for {rate_limit_sleep_time} seconds..."
                         )
                         await asyncio.sleep(rate_limit_sleep_time)
-                        rate_limit_sleep_time *= 1.5
+                        rate_limit_sleep_time *= retry_backoff
                     else:
                         handle_http_error(e)
                 else:
@@ -84,21 +460,23 @@ class AnthropicAPI:
         print_error("Max retries exceeded. Failed to generate a response.")
         return None
 
-
-class WriterAPI:
-    def __init__(self, api_key: str):
-        self.api_key = api_key
-
-    async def send_request_to_model(
+    async def stream_request_to_model(
         self,
         prompt: str,
         model: str,
         max_tokens_to_sample: int = 4000,
         temperature: float = 0,
         max_retries: int = 10,
-    ) -> Optional[str]:
+        timeout: Optional[float] = None,
+        stop_sequences: Optional[List[str]] = None,
+        retry_initial_delay: float = 0.5,
+        retry_backoff: float = 1.5,
+    ) -> AsyncIterator[str]:
         """
-        Sends a request to the Writer API to generate a response based on the given prompt.
+        Streams a response from the provider chunk by chunk.
+
+        Rate-limited requests are retried until the first chunk arrives; errors after
+        that end the stream.
 
         Args:
             prompt (str): The prompt for generating the response.
@@ -106,36 +484,441 @@ class WriterAPI:
             max_tokens_to_sample (int, optional): The maximum number of tokens to sample. Defaults to 4000.
             temperature (float, optional): The temperature parameter for controlling the randomness of the generated response. Defaults to 0.
             max_retries (int, optional): The maximum number of retries in case of an error. Defaults to 10.
+            timeout (Optional[float], optional): Request timeout in seconds. Defaults to the client default.
+            stop_sequences (Optional[List[str]], optional): Sequences that end generation. Defaults to None.
+            retry_initial_delay (float, optional): Seconds to wait after the first rate-limit error. Defaults to 0.5.
+            retry_backoff (float, optional): Multiplier applied to the wait after each rate-limit error. Defaults to 1.5.
 
-        Returns:
-            Optional[str]: The generated response from the Writer API, or None if an error occurred.
+        Yields:
+            str: The next chunk of the response.
         """
-
-        rate_limit_sleep_time = 0.5
+        rate_limit_sleep_time = retry_initial_delay
         for _ in range(max_retries):
-            async with AsyncWriter() as client:
-                try:
-                    completion = await client.completions.create(
-                        model=model,
-                        prompt=prompt,
-                        stream=False,
-                        temperature=temperature,
-                        max_tokens=max_tokens_to_sample,
-                        stop=[],
+            chunks_sent, output_tokens = 0, 0
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            started = time.perf_counter()
+            served_by.set(None)
+            try:
+                async for chunk in self._stream(
+                    prompt,
+                    model,
+                    max_tokens_to_sample,
+                    temperature,
+                    stop_sequences or [],
+                    timeout,
+                ):
+                    chunks_sent += 1
+                    output_tokens += estimate_tokens(chunk)
+                    yield chunk
+                self._emit_call(model, started, estimate_tokens(prompt), output_tokens)
+                return
+            except Exception as e:
+                self.usage["errors"] += 1
+                self._emit_call(model, started, 0, output_tokens, e)
+                if chunks_sent == 0 and getattr(e, "status_code", None) == 429:
+                    print_warning(
+                        f"Rate limit exceeded. Waiting for {rate_limit_sleep_time} seconds..."
                     )
-                    return completion.choices[0].text
-                except Exception as e:
-                    if hasattr(e, "status_code"):
-                        if e.status_code == 429:  # Writer API rate limit exceeded
-                            print_warning(
-                                f"Rate limit exceeded. Waiting for {rate_limit_sleep_time} seconds..."
-                            )
-                            await asyncio.sleep(rate_limit_sleep_time)
-                            rate_limit_sleep_time *= 1.5
-                        else:
-                            handle_http_error(e)
-                    else:
-                        print_error(f"An unexpected error occurred: {e}")
-                        return None
+                    await asyncio.sleep(rate_limit_sleep_time)
+                    rate_limit_sleep_time *= retry_backoff
+                    continue
+                if hasattr(e, "status_code"):
+                    handle_http_error(e)
+                else:
+                    print_error(f"An unexpected error occurred: {e}")
+                return
         print_error("Max retries exceeded. Failed to generate a response.")
+
+    async def send_batch(self, requests: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        Sends several requests concurrently.
+
+        Args:
+            requests (List[Dict[str, Any]]): Keyword arguments for `send_request_to_model`, one dict per request.
+
+        Returns:
+            List[Optional[str]]: The responses, in the same order as the requests.
+        """
+        return await asyncio.gather(
+            *(self.send_request_to_model(**request) for request in requests)
+        )
+
+    async def close(self) -> None:
+        """
+        Closes the underlying client, if one was created.
+
+        Returns:
+            None
+        """
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+class AnthropicAPI(LLMBackend):
+    provider_name = "Anthropic"
+    sdk_modules = ("anthropic",)
+    supports_structured_output = True
+
+    @staticmethod
+    def _request_options(
+        stop_sequences: List[str], timeout: Optional[float]
+    ) -> Dict[str, Any]:
+        options: Dict[str, Any] = {}
+        if stop_sequences:
+            options["stop_sequences"] = stop_sequences
+        if timeout is not None:
+            options["timeout"] = timeout
+        return options
+
+    def get_client(self) -> Any:
+        if self._client is None:
+            from anthropic import AsyncAnthropic
+
+            self._client = AsyncAnthropic(api_key=self.api_key)
+        return self._client
+
+    async def _complete(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        stop_sequences: List[str],
+        timeout: Optional[float],
+    ) -> Tuple[str, int, int]:
+        completion = await self.get_client().messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt,
+                }
+            ],
+            **self._request_options(stop_sequences, timeout),
+        )
+        return (
+            completion.content[0].text,
+            completion.usage.input_tokens,
+            completion.usage.output_tokens,
+        )
+
+    async def _complete_structured(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        timeout: Optional[float],
+        schema: Dict[str, Any],
+    ) -> Tuple[Dict[str, Any], int, int]:
+        # Forcing a single tool makes its input the structured output
+        completion = await self.get_client().messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=[{"role": "user", "content": prompt}],
+            tools=[
+                {
+                    "name": schema["name"],
+                    "description": schema["description"],
+                    "input_schema": schema["parameters"],
+                }
+            ],
+            tool_choice={"type": "tool", "name": schema["name"]},
+            **self._request_options([], timeout),
+        )
+        output = next(
+            block.input for block in completion.content if block.type == "tool_use"
+        )
+        return (
+            output,
+            completion.usage.input_tokens,
+            completion.usage.output_tokens,
+        )
+
+    async def _stream(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        stop_sequences: List[str],
+        timeout: Optional[float],
+    ) -> AsyncIterator[str]:
+        stream = await self.get_client().messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+            **self._request_options(stop_sequences, timeout),
+        )
+        input_tokens = output_tokens = 0
+        async for event in stream:
+            if event.type == "message_start":
+                input_tokens = event.message.usage.input_tokens
+            elif event.type == "message_delta":
+                output_tokens = event.usage.output_tokens
+            elif (
+                event.type == "content_block_delta" and event.delta.type == "text_delta"
+            ):
+                yield event.delta.text
+        self._record_usage(input_tokens, output_tokens)
+
+
+class WriterAPI(LLMBackend):
+    provider_name = "Writer"
+    sdk_modules = ("writerai",)
+
+    def get_client(self) -> Any:
+        if self._client is None:
+            from writerai import AsyncWriter
+
+            self._client = AsyncWriter(api_key=self.api_key)
+        return self._client
+
+    async def _complete(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        stop_sequences: List[str],
+        timeout: Optional[float],
+    ) -> Tuple[str, int, int]:
+        completion = await self.get_client().completions.create(
+            model=model,
+            prompt=prompt,
+            stream=False,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stop=stop_sequences,
+            **({"timeout": timeout} if timeout is not None else {}),
+        )
+        text = completion.choices[0].text
+        # The completions API does not report usage, so token counts are estimated
+        return text, estimate_tokens(prompt), estimate_tokens(text)
+
+    async def _stream(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        stop_sequences: List[str],
+        timeout: Optional[float],
+    ) -> AsyncIterator[str]:
+        stream = await self.get_client().completions.create(
+            model=model,
+            prompt=prompt,
+            stream=True,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stop=stop_sequences,
+            **({"timeout": timeout} if timeout is not None else {}),
+        )
+        output_tokens = 0
+        async for chunk in stream:
+            output_tokens += estimate_tokens(chunk.value)
+            yield chunk.value
+        self._record_usage(estimate_tokens(prompt), output_tokens)
+
+
+class OpenAICompatibleAPI(LLMBackend):
+    """
+    Backend for a local server exposing the OpenAI chat completions API, such as
+    llama.cpp's server or vLLM.
+    """
+
+    provider_name = "Local"
+    sdk_modules = ("httpx",)
+    supports_structured_output = True
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: str = "http://localhost:8000/v1",
+        model: Optional[str] = None,
+    ):
+        super().__init__(api_key)
+        self.base_url = base_url.rstrip("/")
+        self.model = model  # Overrides the placeholder model name from model_selector
+
+    def get_client(self) -> Any:
+        if self._client is None:
+            import httpx
+
+            headers = (
+                {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            )
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, headers=headers, timeout=600
+            )
+        return self._client
+
+    def _build_payload(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        stop_sequences: List[str],
+    ) -> Dict[str, Any]:
+        payload = {
+            "model": self.model or model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        if stop_sequences:
+            payload["stop"] = stop_sequences
+        return payload
+
+    async def _complete(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        stop_sequences: List[str],
+        timeout: Optional[float],
+    ) -> Tuple[str, int, int]:
+        return await self._post_completion(
+            self._build_payload(prompt, model, max_tokens, temperature, stop_sequences),
+            prompt,
+            timeout,
+        )
+
+    async def _complete_structured(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        timeout: Optional[float],
+        schema: Dict[str, Any],
+    ) -> Tuple[Dict[str, Any], int, int]:
+        # JSON schema mode, as supported by vLLM and llama.cpp's server
+        payload = self._build_payload(prompt, model, max_tokens, temperature, [])
+        payload["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {"name": schema["name"], "schema": schema["parameters"]},
+        }
+        text, input_tokens, output_tokens = await self._post_completion(
+            payload, prompt, timeout
+        )
+        return json.loads(text), input_tokens, output_tokens
+
+    async def _post_completion(
+        self, payload: Dict[str, Any], prompt: str, timeout: Optional[float]
+    ) -> Tuple[str, int, int]:
+        response = await self.get_client().post(
+            "/chat/completions",
+            json=payload,
+            **({"timeout": timeout} if timeout is not None else {}),
+        )
+        if response.status_code >= 400:
+            raise APIStatusError(response.status_code, response.text)
+        body = response.json()
+        text = body["choices"][0]["message"]["content"]
+        usage = body.get("usage") or {}
+        return (
+            text,
+            usage.get("prompt_tokens", estimate_tokens(prompt)),
+            usage.get("completion_tokens", estimate_tokens(text)),
+        )
+
+    async def _stream(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        stop_sequences: List[str],
+        timeout: Optional[float],
+    ) -> AsyncIterator[str]:
+        payload = self._build_payload(
+            prompt, model, max_tokens, temperature, stop_sequences
+        )
+        payload["stream"] = True
+        output_tokens = 0
+        async with self.get_client().stream(
+            "POST",
+            "/chat/completions",
+            json=payload,
+            **({"timeout": timeout} if timeout is not None else {}),
+        ) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                raise APIStatusError(response.status_code, response.text)
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:") :].strip()
+                if data == "[DONE]":
+                    break
+                delta = json.loads(data)["choices"][0].get("delta", {})
+                if delta.get("content"):
+                    output_tokens += estimate_tokens(delta["content"])
+                    yield delta["content"]
+        self._record_usage(estimate_tokens(prompt), output_tokens)
+
+    async def warm_up(self) -> None:
+        try:
+            await self.get_client().get("/models")
+        except Exception:
+            pass
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Backends keyed by the provider name returned by get_provider()
+BACKEND_REGISTRY: Dict[str, Type[LLMBackend]] = {
+    AnthropicAPI.provider_name: AnthropicAPI,
+    WriterAPI.provider_name: WriterAPI,
+    OpenAICompatibleAPI.provider_name: OpenAICompatibleAPI,
+}
+
+
+def get_api_client(provider: str, config: Dict[str, str]) -> Optional[LLMBackend]:
+    """
+    Creates the API client for the given provider from the backend registry.
+
+    The provider SDK is not imported until the client sends its first request.
+
+    Args:
+        provider (str): The name of the LLM provider.
+        config (Dict[str, str]): The provider configuration returned by `load_configuration`.
+
+    Returns:
+        Optional[LLMBackend]: The API client, or None if the provider is not registered.
+    """
+    backend_cls = BACKEND_REGISTRY.get(provider)
+    if backend_cls is None:
         return None
+    return backend_cls(**config)
+
+
+def preload_backends() -> None:
+    """
+    Imports the SDK of every registered backend, skipping any that are not installed.
+
+    Meant to run in a background thread while the user is still answering prompts, so that
+    creating the client later does not pay the import cost.
+
+    Returns:
+        None
+    """
+    for backend_cls in BACKEND_REGISTRY.values():
+        for module in backend_cls.sdk_modules:
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                pass
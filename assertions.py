@@ -0,0 +1,187 @@
+import json
+import re
+from typing import Any, Dict, List
+
+from utils import print_warning
+
+# Assertion types and the fields each requires. "regex" patterns must occur, "not_regex"
+# patterns (e.g. an unredacted phone number) must not, and "json" may set a "schema".
+# Every assertion may also set "tag" to check only the text inside <TAG></TAG>.
+ASSERTION_FIELDS = {
+    "regex": ("pattern",),
+    "not_regex": ("pattern",),
+    "json": (),
+    "required_tags": ("tags",),
+    "max_length": ("chars",),
+    "min_length": ("chars",),
+}
+# Prompt section asking for assertions, appended to the test case generation prompt
+ASSERTIONS_PROMPT = """
+# ASSERTIONS #
+Write deterministic checks that every correct response to the PROMPT must pass, whatever the input, as a JSON list within <ASSERTIONS></ASSERTIONS> XML tags. Supported checks:
+- {"type": "regex", "pattern": "..."}: the response must contain a match for the Python regex
+- {"type": "not_regex", "pattern": "..."}: the response must not contain a match, e.g. an unredacted phone number
+- {"type": "json", "schema": {...}}: the response must be valid JSON, optionally matching a JSON schema (type, required, properties, items, enum)
+- {"type": "required_tags", "tags": ["..."]}: the response must contain these XML tags
+- {"type": "max_length", "chars": N} or {"type": "min_length", "chars": N}: limits on the response length
+Add "tag": "NAME" to a check to apply it only to the text inside <NAME></NAME> XML tags. Only write checks that follow directly from explicit instructions in the PROMPT; a wrong check fails correct responses. Write <ASSERTIONS>[]</ASSERTIONS> if none apply.
+"""
+JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+    "null": type(None),
+}
+
+
+def parse_assertions(response: str) -> List[Dict[str, Any]]:
+    """
+    Extracts the assertions from a test case generation response.
+
+    Assertions are a JSON list inside <ASSERTIONS></ASSERTIONS> tags. Malformed assertions
+    are dropped with a warning, since a wrong assertion would fail correct responses.
+
+    Args:
+        response (str): The test case generation response.
+
+    Returns:
+        List[Dict[str, Any]]: The valid assertions, with regexes compiled.
+    """
+    match = re.search(r"<ASSERTIONS>(.*?)</ASSERTIONS>", response, re.DOTALL | re.I)
+    if not match:
+        return []
+    try:
+        candidates = json.loads(match.group(1))
+    except json.JSONDecodeError as e:
+        print_warning(f"Ignoring assertions: invalid JSON ({e}).")
+        return []
+    assertions = []
+    for candidate in candidates if isinstance(candidates, list) else []:
+        if (
+            not isinstance(candidate, dict)
+            or candidate.get("type") not in ASSERTION_FIELDS
+        ):
+            print_warning(f"Ignoring unknown assertion: {candidate}")
+            continue
+        if any(field not in candidate for field in ASSERTION_FIELDS[candidate["type"]]):
+            print_warning(f"Ignoring incomplete assertion: {candidate}")
+            continue
+        if "pattern" in candidate:
+            try:
+                candidate["compiled"] = re.compile(candidate["pattern"], re.DOTALL)
+            except re.error as e:
+                print_warning(f"Ignoring assertion with invalid regex: {e}")
+                continue
+        assertions.append(candidate)
+    return assertions
+
+
+def schema_errors(value: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    # Supports the subset of JSON Schema needed for output format checks: type, enum,
+    # required, properties and items
+    expected = schema.get("type")
+    if expected in JSON_TYPES and (
+        not isinstance(value, JSON_TYPES[expected])
+        or (isinstance(value, bool) and expected in ("number", "integer"))
+    ):
+        return [f"{path} is not of type {expected}"]
+    if "enum" in schema and value not in schema["enum"]:
+        return [f"{path} is not one of {schema['enum']}"]
+    errors = []
+    if isinstance(value, dict):
+        errors += [
+            f"{path} is missing required key '{key}'"
+            for key in schema.get("required", [])
+            if key not in value
+        ]
+        for key, subschema in schema.get("properties", {}).items():
+            if key in value:
+                errors += schema_errors(value[key], subschema, f"{path}.{key}")
+    if isinstance(value, list) and isinstance(schema.get("items"), dict):
+        for index, item in enumerate(value):
+            errors += schema_errors(item, schema["items"], f"{path}[{index}]")
+    return errors
+
+
+def check_response(response: str, assertions: List[Dict[str, Any]]) -> List[str]:
+    """
+    Runs the assertions against a response.
+
+    Args:
+        response (str): The model response.
+        assertions (List[Dict[str, Any]]): The assertions from `parse_assertions`.
+
+    Returns:
+        List[str]: A description of each failed assertion; empty if all passed.
+    """
+    failures = []
+    for assertion in assertions:
+        text = response
+        if assertion.get("tag"):
+            tag = re.escape(assertion["tag"])
+            match = re.search(rf"<{tag}>(.*?)</{tag}>", response, re.DOTALL | re.I)
+            if not match:
+                failures.append(f"The response has no <{assertion['tag']}> tags.")
+                continue
+            text = match.group(1).strip()
+        kind = assertion["type"]
+        if kind == "regex" and not assertion["compiled"].search(text):
+            failures.append(f"The response does not match /{assertion['pattern']}/.")
+        elif kind == "not_regex":
+            found = assertion["compiled"].search(text)
+            if found:
+                failures.append(
+                    f"The response contains '{found.group(0)}', which matches "
+                    f"/{assertion['pattern']}/ and is not allowed."
+                )
+        elif kind == "json":
+            try:
+                value = json.loads(text)
+            except json.JSONDecodeError as e:
+                failures.append(f"The response is not valid JSON: {e}.")
+                continue
+            failures += [
+                f"The JSON does not match the schema: {error}."
+                for error in schema_errors(value, assertion.get("schema") or {})
+            ]
+        elif kind == "required_tags":
+            failures += [
+                f"The response is missing <{tag}></{tag}> tags."
+                for tag in assertion["tags"]
+                if not re.search(
+                    rf"<{re.escape(tag)}>.*?</{re.escape(tag)}>", text, re.DOTALL | re.I
+                )
+            ]
+        elif kind == "max_length" and len(text) > assertion["chars"]:
+            failures.append(
+                f"The response is {len(text)} characters long; the limit is "
+                f"{assertion['chars']}."
+            )
+        elif kind == "min_length" and len(text) < assertion["chars"]:
+            failures.append(
+                f"The response is {len(text)} characters long; at least "
+                f"{assertion['chars']} are required."
+            )
+    return failures
+
+
+def failure_evaluation(failures: List[str]) -> str:
+    """
+    Writes failed assertions as an evaluation in the judge's format, so they are reported
+    and fed back to prompt generation like any other failed evaluation.
+
+    Args:
+        failures (List[str]): The failed assertions from `check_response`.
+
+    Returns:
+        str: The evaluation.
+    """
+    reasons = "\n".join(f"- {failure}" for failure in failures)
+    return (
+        "<EVALUATION_SCRATCHPAD>\nThe response failed deterministic checks:\n"
+        f"{reasons}\n</EVALUATION_SCRATCHPAD>\n"
+        "<EVALUATION_RESULT>FAIL</EVALUATION_RESULT>"
+    )
@@ -0,0 +1,154 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+# Inputs shorter than this are parsed inline: handing them to a worker thread costs more
+# than the parsing itself
+OFFLOAD_MIN_CHARS = 16_000
+
+# Lag above this counts as a stall in the lag report
+STALL_THRESHOLD_SECONDS = 0.1
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_offload_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="parse"
+        )
+    return _executor
+
+
+async def offload(
+    func: Callable[..., Any], *args: Any, size: Optional[int] = None, **kwargs: Any
+) -> Any:
+    """
+    Runs CPU-bound work (response parsing, result assembly) in a worker thread so it does
+    not stall network I/O for the other in-flight requests.
+
+    Args:
+        func (Callable[..., Any]): The function to run.
+        *args (Any): Positional arguments for `func`.
+        size (Optional[int]): The size of the input in characters. If given and below
+            OFFLOAD_MIN_CHARS, `func` runs inline instead.
+        **kwargs (Any): Keyword arguments for `func`.
+
+    Returns:
+        Any: The return value of `func`.
+    """
+    if size is not None and size < OFFLOAD_MIN_CHARS:
+        return func(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_offload_executor(), partial(func, *args, **kwargs)
+    )
+
+
+async def run_in_daemon_thread(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Runs a blocking call, such as input(), in a daemon thread so the event loop keeps
+    running in the meantime.
+
+    Unlike an executor thread, a daemon thread does not keep the process alive if the run
+    is interrupted while the call is still blocked.
+
+    Args:
+        func (Callable[..., Any]): The function to run.
+        *args (Any): Positional arguments for `func`.
+
+    Returns:
+        Any: The return value of `func`.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def settle(setter: Callable[[Any], None], value: Any) -> None:
+        if not future.done():
+            setter(value)
+
+    def target() -> None:
+        try:
+            result = func(*args)
+        except BaseException as e:
+            loop.call_soon_threadsafe(settle, future.set_exception, e)
+        else:
+            loop.call_soon_threadsafe(settle, future.set_result, result)
+
+    threading.Thread(target=target, daemon=True).start()
+    return await future
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: how much later than scheduled a task sleeping for a fixed
+    interval wakes up. Sustained lag means something is blocking the loop.
+    """
+
+    def __init__(self, interval: float = 0.05, window: int = 10_000):
+        self.interval = interval
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._recent = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """
+        Starts sampling. Must be called from a running event loop.
+
+        Returns:
+            None
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stops sampling.
+
+        Returns:
+            None
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.samples += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+            self.stalls += lag >= STALL_THRESHOLD_SECONDS
+            self._recent.append(lag)
+
+    def report(self) -> Dict[str, float]:
+        """
+        Summarizes the lag measured so far.
+
+        Returns:
+            Dict[str, float]: The sample count, mean, p99 and max lag in milliseconds, and the
+            number of stalls.
+        """
+        recent = sorted(self._recent)
+        p99 = recent[min(len(recent) - 1, int(len(recent) * 0.99))] if recent else 0.0
+        return {
+            "samples": self.samples,
+            "mean_lag_ms": (
+                round(self.total_lag / self.samples * 1000, 2) if self.samples else 0.0
+            ),
+            "p99_lag_ms": round(p99 * 1000, 2),
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "stalls": self.stalls,
+        }
@@ -0,0 +1,387 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+from model_selector import load_task_profiles
+from rate_limiter import SharedRateLimiter, feed_tokens
+from run_history import DEFAULT_HISTORY_DB
+from service import PromptGenerationService
+from utils import (
+    QUIET,
+    add_output_arguments,
+    close_log_sink,
+    configure_output,
+    open_log_sink,
+    output_settings,
+    print_error,
+    print_info,
+    print_success,
+    print_warning,
+    set_verbosity,
+    to_json,
+)
+
+SUMMARY_FILENAME = "batch_summary.jsonl"
+
+
+def iter_batch_file(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Reads job requests from a JSONL batch file.
+
+    Each line is an object with "goal" and optionally "num_test_cases", "provider" and "id"
+    (as accepted by `PromptGenerationService.submit`). Lines without an "id" are named
+    "goal_<line number>"; lines repeating an earlier "id" are skipped.
+
+    Args:
+        path (str): The batch file.
+
+    Yields:
+        Dict[str, Any]: The next job request.
+    """
+    seen_ids = set()
+    with open(path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                payload = json.loads(line)
+            except json.JSONDecodeError as e:
+                print_warning(f"Skipping invalid JSON on line {line_number}: {e}")
+                continue
+            if not isinstance(payload, dict):
+                print_warning(f"Skipping line {line_number}: expected an object.")
+                continue
+            payload.setdefault("id", f"goal_{line_number}")
+            if payload["id"] in seen_ids:
+                print_warning(f"Skipping line {line_number}: duplicate id.")
+                continue
+            seen_ids.add(payload["id"])
+            yield payload
+
+
+async def run_goals(
+    payloads: List[Dict[str, Any]],
+    concurrency: int,
+    results_dir: str,
+    history_db: Optional[str],
+    requests_per_minute: Optional[float] = None,
+    rate_limiters: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Runs goals in this process's event loop, several at a time.
+
+    Args:
+        payloads (List[Dict[str, Any]]): The job requests.
+        concurrency (int): The number of goals run at once.
+        results_dir (str): The directory the results files are written to.
+        history_db (Optional[str]): The run history database, or None to not record runs.
+        requests_per_minute (Optional[float]): Request rate limit per provider.
+        rate_limiters (Optional[Dict[str, Any]]): Per-provider limiters shared with other
+            processes, used instead of `requests_per_minute`.
+
+    Returns:
+        List[Dict[str, Any]]: A summary of each goal, in the order of `payloads`.
+    """
+    service = PromptGenerationService(
+        workers=concurrency,
+        max_queued_jobs=0,
+        results_dir=results_dir,
+        history_db=history_db,
+        requests_per_minute=requests_per_minute,
+        rate_limiters=rate_limiters,
+    )
+    jobs = []
+    service.start()
+    try:
+        for payload in payloads:
+            try:
+                jobs.append(service.submit(payload))
+            except ValueError as e:
+                print_warning(f"Skipping goal {payload['id']}: {e}")
+                jobs.append(
+                    {"job_id": payload["id"], "status": "invalid", "error": str(e)}
+                )
+        await service.queue.join()
+    finally:
+        await service.close()
+    return [job if isinstance(job, dict) else job.to_dict() for job in jobs]
+
+
+_shard_rate_limiters: Dict[str, SharedRateLimiter] = {}
+
+
+def shard_log_path(log_path: str, shard: int) -> str:
+    # Each worker process writes its own JSON log, e.g. log.jsonl -> log.shard1.jsonl,
+    # so lines from different processes cannot interleave
+    root, extension = os.path.splitext(log_path)
+    return f"{root}.shard{shard}{extension}"
+
+
+def _init_shard(
+    tokens: Dict[str, Any], verbosity: int, log_path: Optional[str]
+) -> None:
+    set_verbosity(verbosity)
+    if log_path:
+        open_log_sink(log_path)
+    for provider, provider_tokens in tokens.items():
+        _shard_rate_limiters[provider] = SharedRateLimiter(provider_tokens)
+
+
+def _run_shard(
+    payloads: List[Dict[str, Any]],
+    concurrency: int,
+    results_dir: str,
+    history_db: Optional[str],
+) -> List[Dict[str, Any]]:
+    load_task_profiles()
+    try:
+        return asyncio.run(
+            run_goals(
+                payloads,
+                concurrency,
+                results_dir,
+                history_db,
+                rate_limiters=_shard_rate_limiters,
+            )
+        )
+    finally:
+        # Pool workers exit without running atexit handlers
+        sys.stdout.flush()
+        close_log_sink()
+
+
+async def run_sharded(
+    payloads: List[Dict[str, Any]],
+    processes: int,
+    concurrency: int,
+    results_dir: str,
+    history_db: Optional[str],
+    requests_per_minute: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Splits goals round-robin across worker processes, each running its own event loop.
+
+    The parent process holds the request rate budget: it refills one token queue per
+    provider that every worker draws from, so each provider's limit applies to the batch as
+    a whole, as it does when the batch runs in one process. If a worker process dies, its
+    goals are reported as failed and the other shards' results are kept.
+
+    Args:
+        payloads (List[Dict[str, Any]]): The job requests.
+        processes (int): The number of worker processes.
+        concurrency (int): The number of goals each process runs at once.
+        results_dir (str): The directory the results files are written to.
+        history_db (Optional[str]): The run history database, or None to not record runs.
+        requests_per_minute (Optional[float]): Request rate limit per provider.
+
+    Returns:
+        List[Dict[str, Any]]: A summary of each goal, in the order of `payloads`.
+    """
+    shards = [list(enumerate(payloads))[i::processes] for i in range(processes)]
+    shards = [shard for shard in shards if shard]
+    tokens, stop_feeding, feeders = {}, threading.Event(), []
+    if requests_per_minute:
+        providers = {payload.get("provider", "Anthropic") for payload in payloads}
+        for provider in providers:
+            if not isinstance(provider, str):
+                continue  # Rejected when the goal is submitted
+            tokens[provider] = multiprocessing.Queue(
+                maxsize=max(1, int(requests_per_minute / 60))
+            )
+            feeder = threading.Thread(
+                target=feed_tokens,
+                args=(tokens[provider], requests_per_minute, stop_feeding),
+                daemon=True,
+            )
+            feeder.start()
+            feeders.append(feeder)
+
+    # Forked workers would otherwise inherit and repeat anything still buffered
+    sys.stdout.flush()
+    verbosity, log_path = output_settings()
+    close_log_sink()
+    loop = asyncio.get_running_loop()
+    try:
+        # One single-process pool per shard, so a worker that dies only breaks its own pool
+        with contextlib.ExitStack() as stack:
+            pools = [
+                stack.enter_context(
+                    ProcessPoolExecutor(
+                        1,
+                        initializer=_init_shard,
+                        initargs=(
+                            tokens,
+                            verbosity,
+                            shard_log_path(log_path, shard) if log_path else None,
+                        ),
+                    )
+                )
+                for shard in range(1, len(shards) + 1)
+            ]
+            shard_summaries = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        pool,
+                        _run_shard,
+                        [payload for _, payload in shard],
+                        concurrency,
+                        results_dir,
+                        history_db,
+                    )
+                    for pool, shard in zip(pools, shards)
+                ),
+                return_exceptions=True,
+            )
+    finally:
+        if log_path:
+            open_log_sink(log_path)
+        stop_feeding.set()
+        for feeder in feeders:
+            feeder.join()
+
+    merged: List[Optional[Dict[str, Any]]] = [None] * len(payloads)
+    for shard, summaries in zip(shards, shard_summaries):
+        if isinstance(summaries, BaseException):
+            error = f"Worker process failed: {type(summaries).__name__}: {summaries}"
+            print_error(f"{error} ({len(shard)} goals)")
+            summaries = [
+                {"job_id": payload["id"], "status": "failed", "error": error}
+                for _, payload in shard
+            ]
+        for (index, _), summary in zip(shard, summaries):
+            merged[index] = summary
+    return merged
+
+
+async def run_batch(
+    path: str,
+    concurrency: int = 8,
+    results_dir: str = "batch_results",
+    history_db: Optional[str] = DEFAULT_HISTORY_DB,
+    requests_per_minute: Optional[float] = None,
+    processes: int = 1,
+) -> Dict[str, int]:
+    """
+    Runs every goal in a batch file, several at a time, and writes one results file per goal.
+
+    Goals for the same provider share one client, the task concurrency caps and the request
+    rate limit, so throughput is bounded by the provider limits rather than by `concurrency`.
+    With several processes, goals are sharded across them and each provider's rate limit is
+    still shared by the whole batch. A summary line per goal is written to `batch_summary.jsonl` in the
+    results directory.
+
+    Args:
+        path (str): The JSONL batch file.
+        concurrency (int): The number of goals run at once (per process).
+        results_dir (str): The directory the results files are written to.
+        history_db (Optional[str]): The run history database, or None to not record runs.
+        requests_per_minute (Optional[float]): Request rate limit per provider.
+        processes (int): The number of worker processes; 1 runs in this process.
+
+    Returns:
+        Dict[str, int]: The number of completed, failed and invalid goals.
+    """
+    payloads = list(iter_batch_file(path))
+    print_info(
+        f"\n*** Running {len(payloads)} goals, {concurrency} at a time"
+        + (f" in each of {processes} processes" if processes > 1 else "")
+        + "... ***",
+        level=QUIET,
+    )
+    started = time.perf_counter()
+    if processes > 1:
+        summaries = await run_sharded(
+            payloads,
+            processes,
+            concurrency,
+            results_dir,
+            history_db,
+            requests_per_minute,
+        )
+    else:
+        summaries = await run_goals(
+            payloads, concurrency, results_dir, history_db, requests_per_minute
+        )
+
+    counts = {"completed": 0, "failed": 0, "invalid": 0}
+    os.makedirs(results_dir, exist_ok=True)
+    with open(
+        os.path.join(results_dir, SUMMARY_FILENAME), "w", encoding="utf-8"
+    ) as file:
+        for summary in summaries:
+            counts[summary["status"]] += 1
+            file.write(to_json(summary) + "\n")
+    print_success(
+        f"\n*** Batch complete in {time.perf_counter() - started:.1f}s: "
+        f"{counts['completed']} completed, {counts['failed']} failed, "
+        f"{counts['invalid']} invalid. Results in {results_dir}/ ***",
+        level=QUIET,
+    )
+    return counts
+
+
+def main() -> None:
+    """
+    Runs the goals in a batch file without prompting for input.
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(
+        description="Generate and test prompts for every goal in a JSONL file."
+    )
+    parser.add_argument("batch_file", help="JSONL file with one goal per line.")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Goals run at once in each process (default: 8).",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Worker processes the goals are sharded across (default: 1).",
+    )
+    parser.add_argument("--results-dir", default="batch_results")
+    parser.add_argument("--history-db", default=DEFAULT_HISTORY_DB)
+    parser.add_argument("--no-history", action="store_true")
+    parser.add_argument(
+        "--requests-per-minute",
+        type=float,
+        help="Request rate limit per provider, shared by all goals "
+        "(and all processes).",
+    )
+    add_output_arguments(parser, default="normal")
+    args = parser.parse_args()
+    configure_output(args)
+
+    if not os.path.exists(args.batch_file):
+        print_error(f"Batch file not found: {args.batch_file}")
+        exit(1)
+    load_task_profiles()
+    try:
+        asyncio.run(
+            run_batch(
+                args.batch_file,
+                args.concurrency,
+                args.results_dir,
+                None if args.no_history else args.history_db,
+                args.requests_per_minute,
+                args.processes,
+            )
+        )
+    finally:
+        close_log_sink()
+
+
+if __name__ == "__main__":
+    main()
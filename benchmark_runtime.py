@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+import utils
+from fast_runtime import buffered_console, use_orjson
+from result_store import ResultStore
+
+
+def median_time(runs: int, func: Callable[[], None]) -> float:
+    """
+    Times a function over several runs.
+
+    Args:
+        runs (int): The number of runs.
+        func (Callable[[], None]): The function to time.
+
+    Returns:
+        float: The median wall-clock time in seconds.
+    """
+    times: List[float] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+async def _loop_workload(tasks: int, messages: int) -> None:
+    # Many concurrent tasks passing messages, like the per-test-case coroutines of a large run
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def producer() -> None:
+        for i in range(messages):
+            await queue.put(i)
+            await asyncio.sleep(0)
+
+    async def consumer() -> None:
+        for _ in range(messages):
+            await queue.get()
+
+    await asyncio.gather(
+        *(producer() for _ in range(tasks)), *(consumer() for _ in range(tasks))
+    )
+
+
+def bench_event_loop(
+    runs: int, tasks: int, messages: int
+) -> Dict[str, Optional[float]]:
+    default = median_time(runs, lambda: asyncio.run(_loop_workload(tasks, messages)))
+    try:
+        import uvloop
+    except ImportError:
+        return {"default": default, "fast": None}
+
+    def run_uvloop() -> None:
+        loop = uvloop.new_event_loop()
+        try:
+            loop.run_until_complete(_loop_workload(tasks, messages))
+        finally:
+            loop.close()
+
+    return {"default": default, "fast": median_time(runs, run_uvloop)}
+
+
+def bench_jsonl_records(runs: int, entries: int) -> Dict[str, Optional[float]]:
+    store = ResultStore()
+    response = (
+        "<ANSWER>" + "The quick brown fox jumps over the lazy dog. " * 40 + "</ANSWER>"
+    )
+    evaluation = (
+        "<EVALUATION_SCRATCHPAD>"
+        + "The response follows the instructions. " * 30
+        + "</EVALUATION_SCRATCHPAD><EVALUATION_RESULT>PASS</EVALUATION_RESULT>"
+    )
+    for i in range(entries):
+        store.add(
+            f"TEST_CASE_{i}",
+            "Summarize {TEXT}.",
+            {"TEXT": f"input {i}"},
+            response,
+            evaluation,
+        )
+    # Parse once up front so the comparison measures serialization, not XML parsing
+    dicts = list(store.iter_dicts())
+
+    def write_records(path: str) -> None:
+        # Like the dataset results file, one compact record per line
+        with open(path, "w", encoding="utf-8") as file:
+            for entry in dicts:
+                file.write(utils.to_json(entry) + "\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "results.jsonl")
+        default = median_time(runs, lambda: write_records(path))
+        if not use_orjson():
+            return {"default": default, "fast": None}
+        try:
+            fast = median_time(runs, lambda: write_records(path))
+        finally:
+            utils.set_json_serializer(None)
+    return {"default": default, "fast": fast}
+
+
+def bench_console(runs: int, lines: int) -> Dict[str, Optional[float]]:
+    def write_lines(stream: io.TextIOBase) -> None:
+        stdout = sys.stdout
+        sys.stdout = stream
+        try:
+            for i in range(lines):
+                utils.print_info(f"Test Case {i} response: ")
+                print("<ANSWER>ok</ANSWER>")
+            stream.flush()
+        finally:
+            sys.stdout = stdout
+
+    # A terminal is line-buffered, so the default pays one write per line
+    with open(os.devnull, "w", buffering=1) as line_buffered:
+        default = median_time(runs, lambda: write_lines(line_buffered))
+        block_buffered = buffered_console(line_buffered)
+        fast = median_time(runs, lambda: write_lines(block_buffered))
+        block_buffered.flush()
+    return {"default": default, "fast": fast}
+
+
+def print_row(name: str, result: Dict[str, Optional[float]]) -> None:
+    default, fast = result["default"], result["fast"]
+    if fast is None:
+        print(f"  {name:<16} {default * 1000:9.1f} ms   fast: not installed")
+        return
+    print(
+        f"  {name:<16} {default * 1000:9.1f} ms  {fast * 1000:9.1f} ms  "
+        f"{default / fast:5.1f}x"
+    )
+
+
+def main() -> None:
+    """
+    Compares the default runtime with the fast runtime (uvloop, orjson, buffered console).
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the default runtime against --fast."
+    )
+    parser.add_argument("--runs", type=int, default=5, help="Number of runs.")
+    parser.add_argument("--tasks", type=int, default=200, help="Concurrent tasks.")
+    parser.add_argument("--messages", type=int, default=500, help="Messages per task.")
+    parser.add_argument("--entries", type=int, default=2000, help="Results entries.")
+    parser.add_argument("--lines", type=int, default=20000, help="Console lines.")
+    args = parser.parse_args()
+
+    print(f"median of {args.runs} runs      default       fast  speedup")
+    print_row("event loop", bench_event_loop(args.runs, args.tasks, args.messages))
+    print_row("jsonl records", bench_jsonl_records(args.runs, args.entries))
+    print_row("console output", bench_console(args.runs, args.lines))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# The first interactive prompt shown by prompt_user(); reaching it means the
+# tool is ready to accept a goal.
+FIRST_PROMPT_MARKER = "Enter your choice"
+IMPORTTIME_PATTERN = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\S+)")
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_import_time(module: str) -> Tuple[int, Dict[str, int]]:
+    """
+    Imports a module in a fresh interpreter with `-X importtime` and parses the report.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        Tuple[int, Dict[str, int]]: The cumulative import time of the module in microseconds,
+        and the self time spent importing each top-level package.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR,
+        capture_output=True,
+        text=True,
+    )
+    total, packages = 0, {}
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if not match:
+            continue
+        self_time, cumulative, name = (
+            int(match.group(1)),
+            int(match.group(2)),
+            match.group(3),
+        )
+        if name == module:
+            total = cumulative
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0) + self_time
+    return total, packages
+
+
+def measure_time_to_first_prompt(timeout: float = 30.0) -> float:
+    """
+    Launches the CLI and measures the wall-clock time until it asks for user input.
+
+    Args:
+        timeout (float): Seconds to wait before giving up.
+
+    Returns:
+        float: Seconds from process start until the first input prompt is shown.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-u", "prompt_generator.py"],
+        cwd=REPO_DIR,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    try:
+        output = ""
+        while FIRST_PROMPT_MARKER not in output:
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError("CLI did not reach the first prompt in time.")
+            char = process.stdout.read(1)
+            if not char:
+                raise RuntimeError("CLI exited before reaching the first prompt.")
+            output += char
+        return time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+
+
+def main() -> None:
+    """
+    Reports import cost and time-to-first-prompt of the CLI over several runs.
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Benchmark CLI startup time.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of runs.")
+    args = parser.parse_args()
+
+    import_times: List[int] = []
+    packages: Dict[str, int] = {}
+    for _ in range(args.runs):
+        total, packages = measure_import_time("prompt_generator")
+        import_times.append(total)
+    first_prompt_times = [measure_time_to_first_prompt() for _ in range(args.runs)]
+
+    print(f"import prompt_generator (median of {args.runs}):")
+    print(f"  {statistics.median(import_times) / 1000:.1f} ms")
+    print("  heaviest packages by self time (last run):")
+    for name, micros in sorted(packages.items(), key=lambda x: -x[1])[:10]:
+        print(f"    {name:<24} {micros / 1000:8.1f} ms")
+    print(f"time to first prompt (median of {args.runs}):")
+    print(f"  {statistics.median(first_prompt_times) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -36,6 +36,37 @@ def load_writer_configuration() -> Dict[str, str]:
     return {"api_key": api_key}
 
 
+def load_local_configuration() -> Dict[str, str]:
+    """
+    Load the configuration for a local OpenAI-compatible server from environment variables.
+    Returns:
+        A dictionary containing the configuration values.
+    Raises:
+        ValueError: If the server base URL is not found in the environment variables.
+    """
+    base_url = os.getenv("LOCAL_OPENAI_BASE_URL")
+    if not base_url:
+        error_msg = (
+            "No local server URL found. Set LOCAL_OPENAI_BASE_URL in a .env file."
+        )
+        print_error(error_msg)
+        exit(1)
+    # Local servers usually do not require a key
+    return {
+        "api_key": os.getenv("LOCAL_OPENAI_API_KEY"),
+        "base_url": base_url,
+        "model": os.getenv("LOCAL_OPENAI_MODEL"),
+    }
+
+
+# Configuration loaders keyed by provider name, matching BACKEND_REGISTRY
+CONFIG_LOADERS = {
+    "Anthropic": load_anthropic_configuration,
+    "Writer": load_writer_configuration,
+    "Local": load_local_configuration,
+}
+
+
 def load_configuration(provider: str) -> Dict[str, str]:
     """
     Load the configuration from environment variables.
@@ -44,16 +75,13 @@ def load_configuration(provider: str) -> Dict[str, str]:
     Returns:
         A dictionary containing the configuration values.
     Raises:
-        ValueError: If the Anthropic API key is not found in the environment variables.
+        ValueError: If the provider's required settings are not found in the environment variables.
     """
     load_dotenv()
-    if provider == "Anthropic":
-        return load_anthropic_configuration()
-    elif provider == "Writer":
-        return load_writer_configuration()
-    else:
-        error_msg = (
-            f"Invalid provider: {provider}. Please select 'Anthropic' or 'Writer'."
-        )
+    loader = CONFIG_LOADERS.get(provider)
+    if loader is None:
+        providers = ", ".join(f"'{name}'" for name in CONFIG_LOADERS)
+        error_msg = f"Invalid provider: {provider}. Please select one of {providers}."
         print_error(error_msg)
         exit(1)
+    return loader()
@@ -0,0 +1,110 @@
+from typing import Dict, List, Optional, Union
+
+DEFAULT_PATIENCE = 3
+DEFAULT_MIN_GAIN = 0.0
+
+
+class ConvergenceTracker:
+    """
+    Tracks the pass rate of each iteration and decides when further iterations are unlikely
+    to help.
+
+    Counts results through the PromptProcessor result listener interface, so it works the
+    same for generated test cases, datasets and prompts without input variables.
+    """
+
+    def __init__(
+        self, patience: int = DEFAULT_PATIENCE, min_gain: float = DEFAULT_MIN_GAIN
+    ):
+        self.patience = patience
+        self.min_gain = min_gain
+        self.pass_rates: List[float] = []
+        self.best_prompt: Optional[str] = None
+        self.best_pass_rate = -1.0
+        self.best_iteration = 0
+        self._since_improvement = 0
+        self._passed = self._evaluated = 0
+
+    def record_result(
+        self,
+        test_case: Union[str, int],
+        prompt_template: str,
+        test_case_input: Union[Dict[str, str], str],
+        response: str,
+        evaluation: str,
+        failed: bool,
+    ) -> None:
+        """
+        Counts an evaluated test case. Matches the PromptProcessor result listener signature.
+
+        Args:
+            test_case (Union[str, int]): The test case identifier.
+            prompt_template (str): The prompt template used for the test case.
+            test_case_input (Union[Dict[str, str], str]): The input for the test case.
+            response (str): The response for the test case.
+            evaluation (str): The evaluation of the response.
+            failed (bool): Whether the evaluation marked the test case as failed.
+
+        Returns:
+            None
+        """
+        self._evaluated += 1
+        self._passed += not failed
+
+    def end_iteration(self, prompt_template: str) -> Optional[float]:
+        """
+        Closes the current iteration and updates the best prompt.
+
+        An iteration improves on the best so far if its pass rate is higher by more than
+        `min_gain`; the first iteration always counts as an improvement.
+
+        Args:
+            prompt_template (str): The prompt evaluated in this iteration.
+
+        Returns:
+            Optional[float]: The iteration's pass rate, or None if nothing was evaluated.
+        """
+        if not self._evaluated:
+            return None
+        pass_rate = self._passed / self._evaluated
+        self._passed = self._evaluated = 0
+        self.pass_rates.append(pass_rate)
+        if self.best_prompt is None or pass_rate > self.best_pass_rate + self.min_gain:
+            self._since_improvement = 0
+        else:
+            self._since_improvement += 1
+        if pass_rate > self.best_pass_rate:
+            self.best_prompt = prompt_template
+            self.best_pass_rate = pass_rate
+            self.best_iteration = len(self.pass_rates)
+        return pass_rate
+
+    def is_oscillating(self) -> bool:
+        """
+        Whether the pass rate has been flipping between two values for four iterations.
+
+        Returns:
+            bool: True if the last four pass rates follow an A, B, A, B pattern.
+        """
+        if len(self.pass_rates) < 4:
+            return False
+        a, b, c, d = self.pass_rates[-4:]
+        return a == c and b == d and a != b
+
+    def stop_reason(self) -> Optional[str]:
+        """
+        Checks the adaptive stop rule after an iteration.
+
+        Returns:
+            Optional[str]: "all_passed", "plateau" or "oscillation" if iterating should stop,
+            otherwise None.
+        """
+        if not self.pass_rates:
+            return None
+        if self.pass_rates[-1] == 1.0:
+            return "all_passed"
+        if self._since_improvement >= self.patience:
+            return "plateau"
+        if self.is_oscillating():
+            return "oscillation"
+        return None
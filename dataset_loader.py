@@ -0,0 +1,104 @@
+import csv
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils import print_error, print_warning
+
+SUPPORTED_EXTENSIONS = (".jsonl", ".ndjson", ".csv")
+DATASET_RESULTS_PATH = (
+    "dataset_results.jsonl"  # Replaces the results file in dataset mode
+)
+
+
+def resolve_column_mapping(
+    columns: List[str],
+    placeholder_names: List[str],
+    column_map: Optional[Dict[str, str]] = None,
+) -> Optional[Dict[str, str]]:
+    """
+    Maps each prompt placeholder to a dataset column.
+
+    Explicit mappings win; otherwise a column with the same name as the placeholder is used,
+    matching case-insensitively if there is no exact match.
+
+    Args:
+        columns (List[str]): The columns available in the dataset.
+        placeholder_names (List[str]): The placeholders found in the prompt, e.g. ["{TEXT}"].
+        column_map (Optional[Dict[str, str]]): Explicit placeholder-to-column mappings.
+
+    Returns:
+        Optional[Dict[str, str]]: The placeholder-to-column mapping, or None if a placeholder has no column.
+    """
+    column_map = column_map or {}
+    lowercase_columns = {column.lower(): column for column in columns}
+    mapping = {}
+    for placeholder in placeholder_names:
+        name = placeholder.strip("{}")
+        column = column_map.get(name)
+        if column is None:
+            column = name if name in columns else lowercase_columns.get(name.lower())
+        if column is None or column not in columns:
+            print_error(
+                f"No dataset column found for placeholder '{name}'. Available columns: {', '.join(columns)}"
+            )
+            return None
+        mapping[name] = column
+    return mapping
+
+
+def _iter_rows(path: str) -> Iterator[Dict[str, str]]:
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as file:
+            yield from csv.DictReader(file)
+    else:
+        with open(path, encoding="utf-8") as file:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    print_warning(f"Skipping invalid JSON on line {line_number}: {e}")
+
+
+def iter_dataset(
+    path: str,
+    placeholder_names: List[str],
+    column_map: Optional[Dict[str, str]] = None,
+) -> Iterator[Tuple[str, Dict[str, str]]]:
+    """
+    Streams test cases from a JSONL or CSV file, one row at a time.
+
+    Args:
+        path (str): The dataset file.
+        placeholder_names (List[str]): The placeholders found in the prompt, e.g. ["{TEXT}"].
+        column_map (Optional[Dict[str, str]]): Explicit placeholder-to-column mappings.
+
+    Yields:
+        Tuple[str, Dict[str, str]]: The test case name ("ROW_<n>") and its placeholder values.
+    """
+    if not path.endswith(SUPPORTED_EXTENSIONS):
+        print_error(
+            f"Unsupported dataset format: {path}. Use one of {', '.join(SUPPORTED_EXTENSIONS)}."
+        )
+        return
+    if not os.path.exists(path):
+        print_error(f"Dataset not found: {path}")
+        return
+
+    mapping = None
+    for row_number, row in enumerate(_iter_rows(path), start=1):
+        if not isinstance(row, dict):
+            print_warning(f"Skipping row {row_number}: expected an object.")
+            continue
+        if mapping is None:
+            mapping = resolve_column_mapping(list(row), placeholder_names, column_map)
+            if mapping is None:
+                return
+        if any(row.get(column) is None for column in mapping.values()):
+            print_warning(f"Skipping row {row_number}: missing mapped column(s).")
+            continue
+        yield f"ROW_{row_number}", {
+            name: str(row[column]) for name, column in mapping.items()
+        }
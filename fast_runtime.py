@@ -0,0 +1,104 @@
+import asyncio
+import atexit
+import io
+import sys
+from typing import Dict, TextIO
+
+import utils
+
+# Console output is written once this many bytes are buffered, or every FLUSH_INTERVAL seconds
+CONSOLE_BUFFER_BYTES = 64 * 1024
+FLUSH_INTERVAL = 0.1
+
+
+def buffered_console(stream: TextIO) -> io.TextIOWrapper:
+    """
+    Opens a block-buffered text stream on the same file as `stream`.
+
+    Terminals are line-buffered, so every print costs a write system call. This stream
+    collects output in a large buffer instead. The underlying BufferedWriter is locked, so
+    writes from parsing threads are safe.
+
+    Args:
+        stream (TextIO): The stream to replace, usually sys.stdout.
+
+    Returns:
+        io.TextIOWrapper: The buffered stream.
+    """
+    stream.flush()
+    return io.TextIOWrapper(
+        open(stream.fileno(), "wb", buffering=CONSOLE_BUFFER_BYTES, closefd=False),
+        encoding=stream.encoding,
+        errors=stream.errors,
+        line_buffering=False,
+    )
+
+
+async def flush_periodically(stream: TextIO, interval: float = FLUSH_INTERVAL) -> None:
+    """
+    Flushes a buffered stream at a fixed interval so progress stays visible. Runs until
+    cancelled.
+
+    Args:
+        stream (TextIO): The stream to flush.
+        interval (float): Seconds between flushes.
+
+    Returns:
+        None
+    """
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            stream.flush()
+    finally:
+        stream.flush()
+
+
+def use_orjson() -> bool:
+    """
+    Serializes JSONL records (dataset results, reports, logs) with orjson instead of json,
+    if installed. Results files keep using json for their 4-space indentation.
+
+    Returns:
+        bool: Whether orjson is installed and now in use.
+    """
+    try:
+        import orjson
+    except ImportError:
+        return False
+    utils.set_json_serializer(lambda obj: orjson.dumps(obj).decode())
+    return True
+
+
+def enable_fast_runtime() -> Dict[str, bool]:
+    """
+    Switches to the high-throughput runtime: the uvloop event loop (if installed), orjson
+    for JSONL records (if installed) and buffered console output.
+
+    Call before asyncio.run(). The console is flushed by `flush_periodically`, before every
+    input() prompt and at exit.
+
+    Returns:
+        Dict[str, bool]: Which optimizations were enabled.
+    """
+    enabled = {"uvloop": False, "orjson": False}
+    try:
+        import uvloop
+
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        enabled["uvloop"] = True
+    except ImportError:
+        pass
+    enabled["orjson"] = use_orjson()
+    sys.stdout = buffered_console(sys.stdout)
+    atexit.register(sys.stdout.flush)
+    return enabled
+
+
+def describe_fast_runtime(enabled: Dict[str, bool]) -> str:
+    parts = [
+        "uvloop" if enabled["uvloop"] else "asyncio loop (uvloop not installed)",
+        "orjson" if enabled["orjson"] else "json (orjson not installed)",
+        "buffered output",
+    ]
+    return ", ".join(parts)
@@ -0,0 +1,399 @@
+import asyncio
+import inspect
+import json
+import os
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from api_communication import (
+    APIStatusError,
+    BACKEND_REGISTRY,
+    LLMBackend,
+    current_task_name,
+    served_by,
+)
+from model_selector import get_task_profile
+from rate_limiter import RateLimiter
+from utils import print_info, print_warning
+
+DEFAULT_KEY_POOL_FILE = "key_pool.json"
+# Only these tasks are spread across providers; other tasks stay on the primary provider's
+# keys so prompt and test case generation keep using the selected provider's models
+ROUTED_TASKS = ("test-case-execution", "test-case-evaluation")
+# Errors that move a request to another key; other errors (e.g. 400) would fail on any key
+FAILOVER_STATUS_CODES = (429, 500, 502, 503, 504, 529)
+# Keys without max_concurrency count as this many slots when comparing load
+DEFAULT_KEY_CAPACITY = 16
+# A rate-limited key rests for RATE_LIMIT_COOLDOWN seconds, doubling on consecutive 429s
+RATE_LIMIT_COOLDOWN = 2.0
+MAX_COOLDOWN = 60.0
+# A key failing this many times in a row rests for FAILURE_COOLDOWN seconds
+FAILURE_THRESHOLD = 3
+FAILURE_COOLDOWN = 30.0
+# Entry fields used by the pool itself rather than passed to the backend
+POOL_FIELDS = ("provider", "api_key_env", "requests_per_minute", "max_concurrency")
+
+
+def _backend_arguments(provider: str) -> List[str]:
+    # The keyword arguments the provider's backend accepts, e.g. base_url for Local
+    parameters = inspect.signature(BACKEND_REGISTRY[provider].__init__).parameters
+    return [name for name in parameters if name != "self"]
+
+
+def load_key_pool(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Reads additional API keys from a JSON file.
+
+    The file is a list of keys, each with a provider, the key itself ("api_key") or the
+    environment variable holding it ("api_key_env"), and optional "requests_per_minute" and
+    "max_concurrency" limits, e.g.
+    [{"provider": "Anthropic", "api_key_env": "ANTHROPIC_API_KEY_2", "requests_per_minute": 50}].
+
+    Args:
+        path (Optional[str]): The key pool file. Defaults to $KEY_POOL_FILE or key_pool.json;
+            a missing default file is ignored.
+
+    Returns:
+        List[Dict[str, Any]]: The valid key entries.
+    """
+    explicit = path is not None or "KEY_POOL_FILE" in os.environ
+    path = path or os.getenv("KEY_POOL_FILE", DEFAULT_KEY_POOL_FILE)
+    if not os.path.exists(path):
+        if explicit:
+            print_warning(f"Key pool file not found: {path}")
+        return []
+    with open(path) as file:
+        entries = json.load(file)
+    keys = []
+    for index, entry in enumerate(entries, start=1):
+        provider = entry.get("provider")
+        if provider not in BACKEND_REGISTRY:
+            print_warning(f"Ignoring key {index}: unknown provider {provider}")
+            continue
+        api_key = entry.get("api_key") or os.getenv(entry.get("api_key_env", ""))
+        if not api_key and provider != "Local":
+            print_warning(f"Ignoring key {index}: no API key set")
+            continue
+        unknown = set(entry) - set(POOL_FIELDS) - set(_backend_arguments(provider))
+        if unknown:
+            print_warning(
+                f"Ignoring {', '.join(sorted(unknown))} on key {index}: "
+                f"not supported by {provider}"
+            )
+        keys.append({**entry, "api_key": api_key})
+    print_info(f"Loaded {len(keys)} pooled API keys from {path}")
+    return keys
+
+
+class PooledKey:
+    """One backend in a KeyPool, with its own limits and health state."""
+
+    def __init__(
+        self,
+        backend: LLMBackend,
+        requests_per_minute: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+    ):
+        self.backend = backend
+        self.provider = backend.provider_name
+        self.rate_limiter = (
+            RateLimiter(requests_per_minute) if requests_per_minute else None
+        )
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.consecutive_rate_limits = 0
+        self.consecutive_failures = 0
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0}
+        # The backend's own usage already added to the pool; backends record streamed
+        # requests on themselves, so the pool collects the growth after each stream
+        self.reported_usage = {
+            field: backend.usage[field]
+            for field in ("requests", "input_tokens", "output_tokens")
+        }
+
+    @property
+    def load(self) -> float:
+        return self.in_flight / (self.max_concurrency or DEFAULT_KEY_CAPACITY)
+
+    def available(self, now: float) -> bool:
+        return now >= self.cooldown_until and (
+            self.max_concurrency is None or self.in_flight < self.max_concurrency
+        )
+
+    def record_success(self) -> None:
+        self.stats["requests"] += 1
+        self.consecutive_rate_limits = self.consecutive_failures = 0
+
+    def record_failure(self, error: Exception) -> None:
+        self.stats["errors"] += 1
+        if getattr(error, "status_code", None) == 429:
+            self.stats["rate_limited"] += 1
+            self.consecutive_rate_limits += 1
+            self.cooldown_until = time.monotonic() + min(
+                RATE_LIMIT_COOLDOWN * 2 ** (self.consecutive_rate_limits - 1),
+                MAX_COOLDOWN,
+            )
+            return
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= FAILURE_THRESHOLD:
+            self.cooldown_until = time.monotonic() + FAILURE_COOLDOWN
+
+    def take_streamed_usage(self) -> Dict[str, int]:
+        # Cumulative, so concurrent streams on one key are each counted once
+        usage = {
+            field: self.backend.usage[field] - reported
+            for field, reported in self.reported_usage.items()
+        }
+        self.reported_usage = {
+            field: self.backend.usage[field] for field in self.reported_usage
+        }
+        return usage
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider,
+            "key": f"...{self.backend.api_key[-4:]}" if self.backend.api_key else None,
+            "in_flight": self.in_flight,
+            "healthy": time.monotonic() >= self.cooldown_until,
+            **self.stats,
+        }
+
+
+class KeyPool(LLMBackend):
+    """
+    Backend that spreads requests over several API keys, of one or more providers.
+
+    Each request goes to the least-loaded healthy key. A key that is rate-limited or
+    failing cools down and the request moves to the next key; when every key has been
+    tried, the error is raised to the usual retry loop. Test case execution and
+    evaluation may use keys of other providers, with that provider's model for the task.
+    """
+
+    def __init__(self, keys: List[PooledKey]):
+        super().__init__()
+        self.keys = keys
+        self.provider_name = keys[0].provider
+        self._capacity = asyncio.Condition()
+
+    def get_client(self) -> Any:
+        return None
+
+    def _candidates(self, model: str) -> List[Tuple[PooledKey, str]]:
+        # Each key usable for the current task, with the model to request from it
+        task_name = current_task_name.get()
+        candidates = []
+        for key in self.keys:
+            if key.provider == self.provider_name:
+                candidates.append((key, model))
+            elif task_name in ROUTED_TASKS:
+                candidates.append(
+                    (key, get_task_profile(key.provider, task_name)["model"])
+                )
+        return candidates
+
+    async def _acquire(
+        self, candidates: List[Tuple[PooledKey, str]]
+    ) -> Tuple[PooledKey, str]:
+        async with self._capacity:
+            while True:
+                now = time.monotonic()
+                available = [
+                    candidate for candidate in candidates if candidate[0].available(now)
+                ]
+                if available:
+                    key, model = min(available, key=lambda candidate: candidate[0].load)
+                    key.in_flight += 1
+                    break
+                if all(key.cooldown_until > now for key, _ in candidates):
+                    raise APIStatusError(429, "Every pooled key is cooling down.")
+                await self._capacity.wait()
+        return key, model
+
+    async def _release(self, key: PooledKey) -> None:
+        async with self._capacity:
+            key.in_flight -= 1
+            self._capacity.notify_all()
+
+    def _should_fail_over(self, key: PooledKey, error: Exception) -> bool:
+        status_code = getattr(error, "status_code", None)
+        if status_code is None or status_code in FAILOVER_STATUS_CODES:
+            key.record_failure(error)
+            return True
+        key.stats["errors"] += 1
+        return False
+
+    async def _with_failover(
+        self,
+        candidates: List[Tuple[PooledKey, str]],
+        call: Callable[[LLMBackend, str], Awaitable[Any]],
+    ) -> Any:
+        # Runs call(backend, model) on the least-loaded candidate, moving to the next
+        # candidate on rate limits and server errors
+        while True:
+            key, key_model = await self._acquire(candidates)
+            served_by.set((key.provider, key_model))
+            try:
+                if key.rate_limiter is not None:
+                    await key.rate_limiter.acquire()
+                result = await call(key.backend, key_model)
+                key.record_success()
+                return result
+            except Exception as e:
+                candidates = [
+                    candidate for candidate in candidates if candidate[0] is not key
+                ]
+                if not self._should_fail_over(key, e) or not candidates:
+                    raise
+            finally:
+                await self._release(key)
+
+    async def _complete(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        stop_sequences: List[str],
+        timeout: Optional[float],
+    ) -> Tuple[str, int, int]:
+        return await self._with_failover(
+            self._candidates(model),
+            lambda backend, key_model: backend._complete(
+                prompt, key_model, max_tokens, temperature, stop_sequences, timeout
+            ),
+        )
+
+    @property
+    def supports_structured_output(self) -> bool:
+        return self.keys[0].backend.supports_structured_output
+
+    async def _complete_structured(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        timeout: Optional[float],
+        schema: Dict[str, Any],
+    ) -> Tuple[Dict[str, Any], int, int]:
+        # Keys of providers without structured output are skipped
+        return await self._with_failover(
+            [
+                candidate
+                for candidate in self._candidates(model)
+                if candidate[0].backend.supports_structured_output
+            ],
+            lambda backend, key_model: backend._complete_structured(
+                prompt, key_model, max_tokens, temperature, timeout, schema
+            ),
+        )
+
+    async def _stream(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        stop_sequences: List[str],
+        timeout: Optional[float],
+    ) -> AsyncIterator[str]:
+        candidates = self._candidates(model)
+        while True:
+            key, key_model = await self._acquire(candidates)
+            served_by.set((key.provider, key_model))
+            chunks_sent = 0
+            try:
+                if key.rate_limiter is not None:
+                    await key.rate_limiter.acquire()
+                async for chunk in key.backend._stream(
+                    prompt, key_model, max_tokens, temperature, stop_sequences, timeout
+                ):
+                    chunks_sent += 1
+                    yield chunk
+                key.record_success()
+                return
+            except Exception as e:
+                candidates = [
+                    candidate for candidate in candidates if candidate[0] is not key
+                ]
+                # A partly streamed response cannot move to another key
+                if not self._should_fail_over(key, e) or chunks_sent or not candidates:
+                    raise
+            finally:
+                for field, count in key.take_streamed_usage().items():
+                    self.usage[field] += count
+                await self._release(key)
+
+    async def warm_up(self) -> None:
+        """
+        Opens a connection for every key.
+
+        Returns:
+            None
+        """
+        await asyncio.gather(*(key.backend.warm_up() for key in self.keys))
+
+    def get_usage(self) -> Dict[str, Any]:
+        """
+        Reports the usage accumulated by the pool, with the state of each key.
+
+        Returns:
+            Dict[str, Any]: The pool's usage counts, and a "keys" list with each key's
+            provider, masked key, in-flight requests, health and counts.
+        """
+        return {**super().get_usage(), "keys": [key.status() for key in self.keys]}
+
+    async def close(self) -> None:
+        """
+        Closes the clients of every key.
+
+        Returns:
+            None
+        """
+        for key in self.keys:
+            await key.backend.close()
+
+
+def with_key_pool(backend: LLMBackend, entries: List[Dict[str, Any]]) -> LLMBackend:
+    """
+    Pools a backend with additional keys.
+
+    Args:
+        backend (LLMBackend): The backend for the selected provider; it becomes the primary key.
+        entries (List[Dict[str, Any]]): Key entries from `load_key_pool`.
+
+    Returns:
+        LLMBackend: A KeyPool over the backend and the entries, or the backend itself if
+        there are no entries.
+    """
+    if not entries:
+        return backend
+    keys = [PooledKey(backend)]
+    seen = {(backend.provider_name, backend.api_key)}
+    for entry in entries:
+        if (entry["provider"], entry["api_key"]) in seen:
+            continue
+        seen.add((entry["provider"], entry["api_key"]))
+        config = {
+            name: entry[name]
+            for name in _backend_arguments(entry["provider"])
+            if name in entry
+        }
+        keys.append(
+            PooledKey(
+                BACKEND_REGISTRY[entry["provider"]](**config),
+                entry.get("requests_per_minute"),
+                entry.get("max_concurrency"),
+            )
+        )
+    return KeyPool(keys) if len(keys) > 1 else backend
@@ -1,5 +1,45 @@
+import json
+import os
+from typing import Any, Dict, Optional
+
+from utils import print_info, print_warning
+
 # Define a dict that drives model selection
-# Keys are LLM providers, values are dicts with keys for each task
+# Keys are LLM providers, values are dicts with keys for each task.
+# Each task entry is a performance profile; keys not set here fall back to
+# DEFAULT_TASK_PROFILE, and any key can be overridden from a JSON profiles file.
+
+DEFAULT_TASK_PROFILE = {
+    "max_tokens": 4000,
+    "timeout": None,  # Seconds per request; None uses the SDK default
+    "max_concurrency": None,  # Concurrent requests for this task; None is unlimited
+    "stop_sequences": [],
+    "max_retries": 10,
+    "retry_initial_delay": 0.5,  # Seconds to wait after the first rate-limit error
+    "retry_backoff": 1.5,  # Multiplier applied to the delay after each rate-limit error
+    "cache": False,  # Reuse responses to identical requests within a run
+    "stream": False,  # Stream responses, e.g. to avoid timeouts on long outputs
+    "coalesce": True,  # Share one API call between identical in-flight requests at temperature 0
+    # Prompt generation, test case generation and evaluation: request the answer as structured
+    # output (tool use on Anthropic, JSON schema mode on Local) instead of parsing XML tags
+    "structured_output": False,
+    # Prompt generation only: size limits for the failed test case feedback
+    "feedback_token_budget": 8000,
+    "feedback_field_tokens": 1000,
+    # Prompt generation only: "patch" asks for an edit list against the current prompt
+    # instead of a full rewrite, falling back to "rewrite" if the edits do not apply
+    "refinement": "rewrite",
+    # Test case generation only: similarity above which test cases are dropped as near-duplicates (None disables)
+    "dedup_threshold": 0.9,
+    # Test case generation only: also generate deterministic checks (regexes, JSON schemas,
+    # required tags, length limits) that responses must pass before the LLM judge is called
+    "assertions": False,
+}
+DEFAULT_PROFILES_FILE = "task_profiles.json"
+
+# Local OpenAI-compatible servers serve whichever model they were started with;
+# set LOCAL_OPENAI_MODEL to override the placeholder model name below
+LOCAL_MODEL = "local-model"
 
 model_selector = {
     "Anthropic": {
@@ -23,4 +63,66 @@ model_selector = {
         "test-case-execution": {"model": "palmyra-x-32k", "temperature": 0.0},
         "test-case-evaluation": {"model": "palmyra-x-32k", "temperature": 0.0},
     },
+    "Local": {
+        "prompt-generation": {"model": LOCAL_MODEL, "temperature": 0.1},
+        "test-case-generation": {"model": LOCAL_MODEL, "temperature": 0.2},
+        "test-case-execution": {"model": LOCAL_MODEL, "temperature": 0.0},
+        "test-case-evaluation": {"model": LOCAL_MODEL, "temperature": 0.0},
+    },
 }
+
+
+def get_task_profile(provider: str, task_name: str) -> Dict[str, Any]:
+    """
+    Returns the performance profile for a task, filled in with defaults.
+
+    Args:
+        provider (str): The name of the LLM provider.
+        task_name (str): The task, e.g. "test-case-execution".
+
+    Returns:
+        Dict[str, Any]: The complete task profile.
+    """
+    return {**DEFAULT_TASK_PROFILE, **model_selector[provider][task_name]}
+
+
+def load_task_profiles(path: Optional[str] = None) -> None:
+    """
+    Merges task profile overrides from a JSON file into model_selector.
+
+    The file mirrors model_selector, e.g.
+    {"Anthropic": {"test-case-execution": {"max_concurrency": 8, "max_tokens": 1000}}}.
+
+    Args:
+        path (Optional[str]): The profiles file. Defaults to $TASK_PROFILES_FILE or task_profiles.json;
+            a missing default file is ignored.
+
+    Returns:
+        None
+    """
+    explicit = path is not None or "TASK_PROFILES_FILE" in os.environ
+    path = path or os.getenv("TASK_PROFILES_FILE", DEFAULT_PROFILES_FILE)
+    if not os.path.exists(path):
+        if explicit:
+            print_warning(f"Task profiles file not found: {path}")
+        return
+    with open(path) as file:
+        overrides = json.load(file)
+    for provider, tasks in overrides.items():
+        if provider not in model_selector:
+            print_warning(f"Ignoring profiles for unknown provider: {provider}")
+            continue
+        for task_name, profile in tasks.items():
+            if task_name not in model_selector[provider]:
+                print_warning(f"Ignoring profile for unknown task: {task_name}")
+                continue
+            allowed = set(DEFAULT_TASK_PROFILE) | {"model", "temperature"}
+            unknown = set(profile) - allowed
+            if unknown:
+                print_warning(
+                    f"Ignoring unknown profile keys for {task_name}: {', '.join(sorted(unknown))}"
+                )
+            model_selector[provider][task_name].update(
+                {key: value for key, value in profile.items() if key in allowed}
+            )
+    print_info(f"Loaded task profiles from {path}")
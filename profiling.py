@@ -0,0 +1,219 @@
+import inspect
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from types import FrameType
+from typing import Any, Dict, List, Optional
+
+from async_utils import LoopLagMonitor
+from utils import QUIET, print_info, to_json
+
+# Pseudo-frame appended to event-loop samples taken while the loop is idle, i.e. while
+# every task is waiting on the network
+IO_WAIT_FRAME = "[waiting for I/O]"
+PARSE_THREAD_PREFIX = "parse"
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame: Optional[FrameType]) -> List[str]:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def _loop_driver_frame(frame: Optional[FrameType]) -> Optional[FrameType]:
+    # The Python frame that runs the event loop: the caller of the outermost coroutine
+    driver = None
+    while frame is not None:
+        if frame.f_code.co_flags & inspect.CO_COROUTINE:
+            driver = frame.f_back
+        frame = frame.f_back
+    return driver
+
+
+class RunProfiler:
+    """
+    Sampling profiler for a whole run.
+
+    A background thread samples the stacks of the event-loop thread and the parsing
+    threads. Because every asyncio task runs on the loop thread, the samples cover all tasks:
+    each stack ends in whichever coroutine was running, or in IO_WAIT_FRAME when the loop was
+    idle waiting for responses. The stock loop is idle in selectors' select(); uvloop waits
+    in C, so its samples are idle when the frame that started the loop is on top of the stack.
+    Also records wall-clock and CPU time, event-loop lag and tracemalloc peaks.
+    """
+
+    def __init__(
+        self,
+        output_prefix: str = "profile",
+        interval: float = 0.005,
+        top_n: int = 20,
+        lag_monitor: Optional[LoopLagMonitor] = None,
+    ):
+        self.output_prefix = output_prefix
+        self.interval = interval
+        self.top_n = top_n
+        self.lag_monitor = lag_monitor or LoopLagMonitor()
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._loop_thread_id = 0
+        self._loop_driver: Optional[FrameType] = None
+        self._started_wall = self._started_cpu = 0.0
+
+    def start(self) -> None:
+        """
+        Starts profiling. Must be called from the running event loop's thread.
+
+        Returns:
+            None
+        """
+        self._loop_thread_id = threading.get_ident()
+        self._loop_driver = _loop_driver_frame(sys._getframe())
+        self._started_wall = time.perf_counter()
+        self._started_cpu = time.process_time()
+        tracemalloc.start()
+        self.lag_monitor.start()
+        self._sampler = threading.Thread(
+            target=self._sample, name="profiler", daemon=True
+        )
+        self._sampler.start()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            parse_threads = {
+                thread.ident: thread.name
+                for thread in threading.enumerate()
+                if thread.name.startswith(PARSE_THREAD_PREFIX)
+            }
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self._loop_thread_id:
+                    stack = _stack(frame)
+                    if frame.f_code.co_name == "select" or frame is self._loop_driver:
+                        stack.append(IO_WAIT_FRAME)
+                    self.stacks[";".join(["event-loop"] + stack)] += 1
+                elif thread_id in parse_threads:
+                    # Idle pool workers block in _worker on the work queue
+                    if frame.f_code.co_name != "_worker":
+                        stack = _stack(frame)
+                        self.stacks[";".join(["parse-thread"] + stack)] += 1
+
+    async def stop(self) -> Dict[str, Any]:
+        """
+        Stops profiling, writes `<prefix>.folded` (collapsed stacks for flamegraph.pl,
+        speedscope or inferno) and `<prefix>.json`, and prints a summary.
+
+        Returns:
+            Dict[str, Any]: The summary.
+        """
+        self._stop.set()
+        self._sampler.join()
+        # Without the frame, uvloop's idle time cannot be told apart from running code
+        io_wait_known = self._loop_driver is not None
+        self._loop_driver = None
+        await self.lag_monitor.stop()
+        wall = time.perf_counter() - self._started_wall
+        cpu = time.process_time() - self._started_cpu
+        current_memory, peak_memory = tracemalloc.get_traced_memory()
+        allocation_sites = tracemalloc.take_snapshot().statistics("lineno")[:5]
+        tracemalloc.stop()
+
+        loop_samples = {
+            stack: count
+            for stack, count in self.stacks.items()
+            if stack.startswith("event-loop;")
+        }
+        total_loop = sum(loop_samples.values()) or 1
+        io_wait = sum(
+            count
+            for stack, count in loop_samples.items()
+            if stack.endswith(IO_WAIT_FRAME)
+        )
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if frames[-1] == IO_WAIT_FRAME:
+                continue
+            self_counts[frames[-1]] += count
+            for frame in set(frames):
+                total_counts[frame] += count
+        all_samples = sum(self.stacks.values()) or 1
+
+        summary = {
+            "wall_seconds": round(wall, 3),
+            "cpu_seconds": round(cpu, 3),
+            "cpu_utilization": round(cpu / wall, 3) if wall else 0.0,
+            "event_loop_io_wait_fraction": (
+                round(io_wait / total_loop, 3) if io_wait_known else None
+            ),
+            "samples": sum(self.stacks.values()),
+            "loop_lag": self.lag_monitor.report(),
+            "memory_peak_mb": round(peak_memory / 2**20, 2),
+            "memory_current_mb": round(current_memory / 2**20, 2),
+            "top_allocations": [
+                {
+                    "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_kb": round(stat.size / 1024, 1),
+                    "count": stat.count,
+                }
+                for stat in allocation_sites
+            ],
+            "hotspots": [
+                {
+                    "function": function,
+                    "self_percent": round(count / all_samples * 100, 1),
+                    "total_percent": round(
+                        total_counts[function] / all_samples * 100, 1
+                    ),
+                }
+                for function, count in self_counts.most_common(self.top_n)
+            ],
+        }
+
+        with open(f"{self.output_prefix}.folded", "w") as file:
+            for stack, count in self.stacks.items():
+                file.write(f"{stack} {count}\n")
+        with open(f"{self.output_prefix}.json", "w") as file:
+            file.write(to_json(summary, pretty=True))
+        self._print_summary(summary)
+        return summary
+
+    def _print_summary(self, summary: Dict[str, Any]) -> None:
+        lag = summary["loop_lag"]
+        io_wait = summary["event_loop_io_wait_fraction"]
+        print_info(
+            f"\n*** Profile: {summary['wall_seconds']}s wall, {summary['cpu_seconds']}s CPU "
+            f"({summary['cpu_utilization']:.0%} utilization); event loop waiting on I/O "
+            + (f"{io_wait:.0%} of the time" if io_wait is not None else "unavailable")
+            + " ***",
+            level=QUIET,
+        )
+        print_info(
+            f"Event loop lag: mean {lag['mean_lag_ms']} ms, p99 {lag['p99_lag_ms']} ms, "
+            f"max {lag['max_lag_ms']} ms. Memory peak: {summary['memory_peak_mb']} MB",
+            level=QUIET,
+        )
+        print_info(f"Top {self.top_n} hotspots (self% / total%):", level=QUIET)
+        for hotspot in summary["hotspots"]:
+            print_info(
+                f"  {hotspot['self_percent']:5.1f}% {hotspot['total_percent']:5.1f}%  "
+                f"{hotspot['function']}",
+                level=QUIET,
+            )
+        print_info(
+            f"Flamegraph stacks written to {self.output_prefix}.folded, "
+            f"summary to {self.output_prefix}.json",
+            level=QUIET,
+        )
@@ -1,114 +1,482 @@
+import argparse
 import re
 import asyncio
+import sys
+from typing import Any, Callable, Dict, Optional, Tuple
 from utils import (
+    QUIET,
+    add_output_arguments,
+    close_log_sink,
+    configure_output,
     print_success,
     print_info,
     print_warning,
     print_final_results,
+    save_final_prompt,
     save_results_to_json,
 )
 from config import load_configuration
-from api_communication import AnthropicAPI, WriterAPI
+from dataset_loader import DATASET_RESULTS_PATH
+from convergence import DEFAULT_MIN_GAIN, DEFAULT_PATIENCE, ConvergenceTracker
+from model_selector import load_task_profiles
+from api_communication import get_api_client, preload_backends
+from async_utils import LoopLagMonitor, offload, run_in_daemon_thread
+from key_pool import load_key_pool, with_key_pool
+from fast_runtime import (
+    describe_fast_runtime,
+    enable_fast_runtime,
+    flush_periodically,
+)
+from profiling import RunProfiler
+from prompt_library import DEFAULT_LIBRARY_DB, LibraryMatch, PromptLibrary
 from prompt_processing import PromptProcessor
+from result_store import ResultStore
+from run_history import DEFAULT_HISTORY_DB, RunHistory
 from user_input import prompt_user, get_test_cases_count, get_provider
 
-
 MAX_ITERATIONS = 10
 
 
-async def main() -> None:
+def parse_args() -> argparse.Namespace:
+    """
+    Parses the command-line options.
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Generate and test LLM prompts.")
+    parser.add_argument(
+        "--dataset",
+        help="JSONL or CSV file of test inputs to evaluate instead of generated test cases.",
+    )
+    parser.add_argument(
+        "--column-map",
+        action="append",
+        default=[],
+        metavar="PLACEHOLDER=COLUMN",
+        help="Map a prompt placeholder to a dataset column (repeatable).",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        help="Dataset rows processed concurrently (default: execution max_concurrency or 16).",
+    )
+    parser.add_argument(
+        "--history-db",
+        default=DEFAULT_HISTORY_DB,
+        help=f"SQLite database runs are recorded in (default: {DEFAULT_HISTORY_DB}).",
+    )
+    parser.add_argument(
+        "--no-history", action="store_true", help="Do not record the run history."
+    )
+    parser.add_argument(
+        "--max-iterations",
+        type=int,
+        default=MAX_ITERATIONS,
+        help=f"Maximum number of iterations (default: {MAX_ITERATIONS}).",
+    )
+    parser.add_argument(
+        "--patience",
+        type=int,
+        default=DEFAULT_PATIENCE,
+        help="Stop after this many iterations without a pass-rate improvement "
+        f"(default: {DEFAULT_PATIENCE}).",
+    )
+    parser.add_argument(
+        "--min-gain",
+        type=float,
+        default=DEFAULT_MIN_GAIN,
+        help="Pass-rate increase (0-1) that counts as an improvement "
+        f"(default: {DEFAULT_MIN_GAIN}).",
+    )
+    parser.add_argument(
+        "--library-db",
+        default=DEFAULT_LIBRARY_DB,
+        help="SQLite library of converged prompts to warm-start from "
+        f"(default: {DEFAULT_LIBRARY_DB}).",
+    )
+    parser.add_argument(
+        "--no-library",
+        action="store_true",
+        help="Start from scratch and do not add the prompt to the library.",
+    )
+    parser.add_argument(
+        "--key-pool",
+        metavar="PATH",
+        help="JSON file of additional API keys to spread requests over "
+        "(default: $KEY_POOL_FILE or key_pool.json, if present).",
+    )
+    parser.add_argument(
+        "--fast",
+        action="store_true",
+        help="Use uvloop and orjson if installed, and buffer console output.",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile",
+        metavar="PREFIX",
+        help="Profile the run; writes PREFIX.folded (flamegraph stacks) and PREFIX.json "
+        "(default prefix: profile).",
+    )
+    add_output_arguments(parser)
+    return parser.parse_args()
+
+
+async def main(args: argparse.Namespace) -> None:
     """
     Main function that generates prompts, processes test cases, and prints results.
 
+    Args:
+        args (argparse.Namespace): The parsed command-line options.
+
     Returns:
         None
     """
-    goal = prompt_user()
-    num_test_cases = get_test_cases_count()
-    provider = get_provider()
+    column_map = dict(mapping.split("=", 1) for mapping in args.column_map)
+    # The prompts block in daemon threads so the SDKs load, and the provider connection
+    # opens, while the user is typing
+    preload = asyncio.create_task(run_in_daemon_thread(preload_backends))
+    goal = await run_in_daemon_thread(prompt_user)
+    provider = await run_in_daemon_thread(get_provider)
     config = load_configuration(provider)
-    api_key = config.get("api_key")
+    load_task_profiles()
 
-    if provider == "Anthropic":
-        api_client = AnthropicAPI(api_key)
-    elif provider == "Writer":
-        api_client = WriterAPI(api_key)
-    else:
+    api_client = get_api_client(provider, config)
+    if api_client is None:
         print_warning("Invalid provider. Exiting...")
         return
+    api_client = with_key_pool(api_client, load_key_pool(args.key_pool))
+    warm_up = asyncio.create_task(api_client.warm_up())
+    num_test_cases = (
+        await run_in_daemon_thread(get_test_cases_count) if not args.dataset else None
+    )
+    await preload
 
     prompt_processor = PromptProcessor(api_client, provider)
+    history = None
+    if not args.no_history:
+        history = RunHistory(goal, provider, args.history_db)
+        prompt_processor.result_listeners.append(history.record_result)
+        api_client.call_listeners.append(history.record_api_call)
+    library = None if args.no_library else PromptLibrary(args.library_db)
+    final_prompt = None
+    lag_monitor = LoopLagMonitor()
+    profiler = (
+        RunProfiler(args.profile, lag_monitor=lag_monitor) if args.profile else None
+    )
+    if profiler:
+        profiler.start()
+    else:
+        lag_monitor.start()
+    flush_task = (
+        asyncio.create_task(flush_periodically(sys.stdout)) if args.fast else None
+    )
+    try:
+        final_prompt = await run_iterations(
+            prompt_processor,
+            goal,
+            num_test_cases,
+            args.dataset,
+            column_map,
+            args.max_in_flight,
+            history,
+            max_iterations=args.max_iterations,
+            patience=args.patience,
+            min_gain=args.min_gain,
+            library=library,
+        )
+    finally:
+        if profiler:
+            await profiler.stop()
+        else:
+            await lag_monitor.stop()
+        if flush_task:
+            flush_task.cancel()
+        warm_up.cancel()
+        await api_client.close()
+        if history:
+            history.finish(final_prompt)
+        if library:
+            library.close()
+    lag = lag_monitor.report()
+    print_info(
+        f"*** Event loop lag: mean {lag['mean_lag_ms']} ms, p99 {lag['p99_lag_ms']} ms, "
+        f"max {lag['max_lag_ms']} ms, {lag['stalls']} stalls ***"
+    )
+
+
+async def run_iterations(
+    prompt_processor: PromptProcessor,
+    goal: str,
+    num_test_cases: Optional[int],
+    dataset_path: Optional[str] = None,
+    column_map: Optional[Dict[str, str]] = None,
+    max_in_flight: Optional[int] = None,
+    history: Optional[RunHistory] = None,
+    results_path: str = "results.json",
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    max_iterations: int = MAX_ITERATIONS,
+    patience: int = DEFAULT_PATIENCE,
+    min_gain: float = DEFAULT_MIN_GAIN,
+    library: Optional[PromptLibrary] = None,
+) -> Optional[str]:
+    """
+    Runs the generate/evaluate loop until all test cases pass, the pass rate stops improving,
+    or the iteration limit is reached.
 
-    combined_results, test_results = [], {}
-    test_cases, first_iteration = None, True
+    Args:
+        prompt_processor (PromptProcessor): The processor bound to the selected provider.
+        goal (str): The prompt description entered by the user.
+        num_test_cases (Optional[int]): The number of test cases to generate; unused with a dataset.
+        dataset_path (Optional[str]): A JSONL or CSV dataset to evaluate instead of generated test cases.
+        column_map (Optional[Dict[str, str]]): Explicit placeholder-to-column mappings for the dataset.
+        max_in_flight (Optional[int]): Dataset rows processed concurrently.
+        history (Optional[RunHistory]): Where to record each iteration, if anywhere.
+        results_path (str): The JSON file the combined results are written to; unused with a
+            dataset, whose rows are written to dataset_results.jsonl instead.
+        on_event (Optional[Callable[[Dict[str, Any]], None]]): Receives a progress event dict at
+            the start and end of each iteration, when a prompt is generated and when the loop
+            stops.
+        max_iterations (int): The maximum number of iterations.
+        patience (int): Stop after this many iterations without a pass-rate improvement.
+        min_gain (float): The pass-rate increase that counts as an improvement.
+        library (Optional[PromptLibrary]): Converged prompts to warm-start from, and to add
+            this run's prompt to if all test cases pass.
 
-    for _ in range(MAX_ITERATIONS):
-        prompt_template = await prompt_processor.generate_prompt_handler(
-            goal, test_results
+    Returns:
+        Optional[str]: The prompt with the best pass rate, or None if generation or evaluation failed.
+    """
+    emit = on_event or (lambda event: None)
+    seed = library.lookup(goal) if library else None
+    if seed and not seed.exact:
+        print_info(
+            f"\n*** Starting from the library prompt for a similar goal "
+            f"({seed.similarity:.0%} similar): {seed.goal} ***"
+        )
+    tracker = ConvergenceTracker(patience, min_gain)
+    prompt_processor.result_listeners.append(tracker.record_result)
+    try:
+        prompt_template, stop_reason, combined_results, test_cases = await _iterate(
+            prompt_processor,
+            goal,
+            num_test_cases,
+            dataset_path,
+            column_map,
+            max_in_flight,
+            history,
+            emit,
+            max_iterations,
+            tracker,
+            seed,
+        )
+    finally:
+        prompt_processor.result_listeners.remove(tracker.record_result)
+    if prompt_template is None:
+        return None
+    emit({"event": "stopped", "reason": stop_reason, "pass_rates": tracker.pass_rates})
+
+    if dataset_path:
+        results_path = DATASET_RESULTS_PATH  # The dataset rows replace the results file
+    else:
+        await offload(save_results_to_json, combined_results.iter_dicts(), results_path)
+    if stop_reason in ("plateau", "oscillation"):
+        print_warning(
+            f"\n*** Stopping: pass rate {'plateaued' if stop_reason == 'plateau' else 'oscillating'} "
+            f"({', '.join(f'{rate:.0%}' for rate in tracker.pass_rates)}). ***",
+            level=QUIET,
+        )
+    elif stop_reason == "placeholders_changed":
+        print_warning(
+            "\n*** Stopping: the prompt no longer matches the dataset. ***",
+            level=QUIET,
         )
+    elif stop_reason == "max_iterations":
+        print_warning("\n*** Max iterations reached. ***", level=QUIET)
+    elif stop_reason == "all_passed" and library:
+        library.add(goal, prompt_template, test_cases, 1.0, prompt_processor.provider)
+    if tracker.best_prompt is not None and tracker.best_prompt != prompt_template:
+        print_info(
+            f"\n*** Returning the best prompt: iteration {tracker.best_iteration} "
+            f"({tracker.best_pass_rate:.0%} passed). ***",
+            level=QUIET,
+        )
+        prompt_template = tracker.best_prompt
+    if not dataset_path:
+        await offload(save_final_prompt, prompt_template, results_path)
+    print_final_results(prompt_template, results_path)
+    return prompt_template
+
+
+async def _iterate(
+    prompt_processor: PromptProcessor,
+    goal: str,
+    num_test_cases: Optional[int],
+    dataset_path: Optional[str],
+    column_map: Optional[Dict[str, str]],
+    max_in_flight: Optional[int],
+    history: Optional[RunHistory],
+    emit: Callable[[Dict[str, Any]], None],
+    max_iterations: int,
+    tracker: ConvergenceTracker,
+    seed: Optional[LibraryMatch],
+) -> Tuple[
+    Optional[str], Optional[str], ResultStore, Optional[Dict[str, Dict[str, str]]]
+]:
+    # Returns the last prompt (None on failure), why iterating stopped, all results and the
+    # test suite
+    combined_results, test_results = ResultStore(), {}
+    # Results of the best prompt so far: after a plateau or a regression, the next prompt
+    # is generated from the best prompt's failures rather than the last prompt's
+    best_results = {}
+    test_cases, first_iteration, stored_test_cases = None, True, False
+    # The dataset columns are mapped to the placeholders of the first evaluated prompt
+    previous_prompt, dataset_placeholders = None, None
+
+    for iteration in range(1, max_iterations + 1):
+        emit({"event": "iteration_started", "iteration": iteration})
+        print_info(f"\n*** Iteration {iteration}/{max_iterations} ***", level=QUIET)
+        if history:
+            history.start_iteration()
+        if first_iteration and seed and seed.exact:
+            print_info(
+                f"\n*** Verifying the library prompt for this goal "
+                f"({seed.pass_rate:.0%} passed when stored)... ***"
+            )
+            prompt_template = seed.prompt
+            test_cases = seed.test_cases or None
+            stored_test_cases = test_cases is not None
+        else:
+            prompt_template = await prompt_processor.generate_prompt_handler(
+                goal,
+                best_results or test_results,
+                seed.prompt if first_iteration and seed else None,
+            )
         if prompt_template is None:
-            return None  # Prompt generation failed
-        if num_test_cases == 0:
-            print_info("\n*** No test cases to evaluate. ***")
-            break
+            return None, None, combined_results, test_cases  # Prompt generation failed
         placeholders = re.findall(r"{\w+}", prompt_template)
+        if (
+            dataset_placeholders is not None
+            and set(placeholders) != dataset_placeholders
+        ):
+            print_warning(
+                f"The regenerated prompt uses placeholders {', '.join(sorted(set(placeholders)))} "
+                f"instead of {', '.join(sorted(dataset_placeholders))}, which the dataset "
+                "columns are mapped to. Keeping the previous prompt."
+            )
+            return (
+                previous_prompt,
+                "placeholders_changed",
+                combined_results,
+                test_cases,
+            )
+        emit(
+            {
+                "event": "prompt_generated",
+                "iteration": iteration,
+                "prompt": prompt_template,
+            }
+        )
+        if history:
+            history.record_prompt_version(prompt_template)
+        if num_test_cases == 0 and not dataset_path:
+            print_info("\n*** No test cases to evaluate. ***")
+            return prompt_template, None, combined_results, test_cases
 
         input_vars_detected = bool(placeholders)
-        if first_iteration and input_vars_detected:
-            test_cases = await prompt_processor.setup_test_cases(
-                num_test_cases, prompt_template, placeholders
+        if input_vars_detected and dataset_path:
+            test_results, _, failed = await prompt_processor.process_dataset(
+                dataset_path, prompt_template, placeholders, column_map, max_in_flight
             )
+            if test_results is None:
+                return (
+                    None,
+                    None,
+                    combined_results,
+                    test_cases,
+                )  # No dataset row could be evaluated
+            dataset_placeholders = set(placeholders)
+            passed_message = "\n*** All dataset rows passed! ***"
+        elif input_vars_detected:
+            if stored_test_cases:
+                test_cases = await prompt_processor.check_stored_test_cases(
+                    test_cases, num_test_cases, placeholders
+                )
+                stored_test_cases = False
             if not test_cases:
-                return None  # Test case generation failed
-
-        if input_vars_detected and not first_iteration:
-            print_info("\n*** Re-evaluating test cases... ***")
-
-        if input_vars_detected:
+                test_cases = await prompt_processor.setup_test_cases(
+                    num_test_cases, prompt_template, placeholders
+                )
+                if not test_cases:
+                    return (
+                        None,
+                        None,
+                        combined_results,
+                        test_cases,
+                    )  # Test case generation failed
+                test_cases = await prompt_processor.remove_duplicate_test_cases(
+                    test_cases
+                )
+            else:
+                print_info("\n*** Re-evaluating test cases... ***")
             # Skip processing if no test cases are defined
             if not test_cases:
                 print_warning("No test cases available.")
-                break
+                return prompt_template, None, combined_results, test_cases
             (
                 test_results,
                 combined_results,
-                failed_tests,
+                failed,
             ) = await prompt_processor.process_test_cases(
                 test_cases, prompt_template, combined_results, test_results
             )
-            if not test_results and not combined_results and not failed_tests:
-                return None  # Prompt Execution or Evaluation failed
-
-            if not failed_tests:
-                print_success("\n*** All test cases passed! ***")
-                break
+            if not test_results and not combined_results and not failed:
+                # Prompt Execution or Evaluation failed
+                return None, None, combined_results, test_cases
+            passed_message = "\n*** All test cases passed! ***"
         else:
             (
                 test_results,
                 combined_results,
-                failed_evaluation,
+                failed,
             ) = await prompt_processor.process_no_input_var_case(
                 prompt_template, combined_results, test_results
             )
-            if (
-                test_results is None
-                and combined_results is None
-                and failed_evaluation is None
-            ):
-                return  # Prompt Execution or Evaluation failed
-            if not failed_evaluation:
-                print_success(
-                    "\n*** Evaluation passed! No input variables detected. ***"
-                )
-                break
+            if test_results is None and combined_results is None and failed is None:
+                # Prompt Execution or Evaluation failed
+                return None, None, ResultStore(), test_cases
+            passed_message = "\n*** Evaluation passed! No input variables detected. ***"
 
-        first_iteration = False
+        pass_rate = tracker.end_iteration(prompt_template)
+        if pass_rate is not None and tracker.best_iteration == len(tracker.pass_rates):
+            best_results = dict(test_results)  # test_results is updated in place
+        emit(
+            {
+                "event": "iteration_finished",
+                "iteration": iteration,
+                "failed": failed,
+                "pass_rate": pass_rate,
+            }
+        )
+        if not failed:
+            print_success(passed_message, level=QUIET)
+            return prompt_template, "all_passed", combined_results, test_cases
+        stop_reason = tracker.stop_reason()
+        if stop_reason:
+            return prompt_template, stop_reason, combined_results, test_cases
+        first_iteration, previous_prompt = False, prompt_template
 
-    save_results_to_json(combined_results)
-    print_final_results(prompt_template)
-    if _ == MAX_ITERATIONS - 1:
-        print_warning("\n*** Max iterations reached. ***")
+    return prompt_template, "max_iterations", combined_results, test_cases
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = parse_args()
+    configure_output(args)
+    if args.fast:
+        print_info(
+            f"*** Fast runtime: {describe_fast_runtime(enable_fast_runtime())} ***"
+        )
+    try:
+        asyncio.run(main(args))
+    finally:
+        close_log_sink()
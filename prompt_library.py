@@ -0,0 +1,191 @@
+import json
+import math
+import re
+import sqlite3
+import time
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from run_history import goal_hash
+
+DEFAULT_LIBRARY_DB = "prompt_library.db"
+# Goals less similar than this to every stored goal start from scratch
+DEFAULT_MIN_SIMILARITY = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prompts (
+    goal_hash TEXT PRIMARY KEY,
+    goal TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    test_cases TEXT NOT NULL,
+    pass_rate REAL NOT NULL,
+    provider TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+class LibraryMatch(NamedTuple):
+    """A stored prompt found for a goal."""
+
+    goal: str
+    prompt: str
+    test_cases: Dict[str, Dict[str, str]]
+    pass_rate: float
+    similarity: float
+    exact: bool
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+class GoalIndex:
+    """
+    TF-IDF index over stored goals, compared by cosine similarity.
+
+    Goals are short, so the whole index is rebuilt in memory when the library changes.
+    """
+
+    def __init__(self, goals: List[Tuple[str, str]]):
+        # goals: (goal_hash, goal) pairs
+        self.hashes = [key for key, _ in goals]
+        counts = [Counter(tokenize(goal)) for _, goal in goals]
+        document_frequency: Counter = Counter()
+        for count in counts:
+            document_frequency.update(count.keys())
+        total = len(goals)
+        self.idf = {
+            term: math.log((1 + total) / (1 + frequency)) + 1
+            for term, frequency in document_frequency.items()
+        }
+        self.vectors = [self._vector(count) for count in counts]
+
+    def _vector(self, counts: Counter) -> Dict[str, float]:
+        vector = {
+            term: count * self.idf[term]
+            for term, count in counts.items()
+            if term in self.idf
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {term: weight / norm for term, weight in vector.items()}
+
+    def nearest(self, goal: str) -> Optional[Tuple[str, float]]:
+        """
+        Finds the stored goal most similar to `goal`.
+
+        Args:
+            goal (str): The goal to look up.
+
+        Returns:
+            Optional[Tuple[str, float]]: The goal hash and cosine similarity of the nearest
+            goal, or None if the index is empty or nothing shares a term.
+        """
+        query = self._vector(Counter(tokenize(goal)))
+        best = None
+        for key, vector in zip(self.hashes, self.vectors):
+            similarity = sum(
+                weight * vector.get(term, 0.0) for term, weight in query.items()
+            )
+            if similarity > 0 and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+
+
+class PromptLibrary:
+    """
+    Local library of converged prompts, keyed by goal, with their test suites and pass rates.
+
+    Used to warm-start new runs: an exact goal match reuses the stored prompt and test suite,
+    and a similar goal passes the stored prompt to the first prompt generation as a reference.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_LIBRARY_DB,
+        min_similarity: float = DEFAULT_MIN_SIMILARITY,
+    ):
+        self.min_similarity = min_similarity
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        self._index: Optional[GoalIndex] = None
+
+    def add(
+        self,
+        goal: str,
+        prompt: str,
+        test_cases: Optional[Dict[str, Dict[str, str]]],
+        pass_rate: float,
+        provider: str,
+    ) -> None:
+        """
+        Stores a converged prompt, replacing any earlier entry for the same goal.
+
+        Args:
+            goal (str): The prompt description.
+            prompt (str): The converged prompt.
+            test_cases (Optional[Dict[str, Dict[str, str]]]): The test suite it passed, if any.
+            pass_rate (float): Its pass rate on the suite.
+            provider (str): The provider it was generated with.
+
+        Returns:
+            None
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO prompts VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                goal_hash(goal),
+                goal,
+                prompt,
+                json.dumps(test_cases or {}),
+                pass_rate,
+                provider,
+                time.time(),
+            ),
+        )
+        self.connection.commit()
+        self._index = None
+
+    def lookup(self, goal: str) -> Optional[LibraryMatch]:
+        """
+        Finds the stored prompt for the same goal, or for the most similar one.
+
+        Args:
+            goal (str): The prompt description.
+
+        Returns:
+            Optional[LibraryMatch]: The match, or None if no stored goal reaches
+            `min_similarity`.
+        """
+        key, similarity = goal_hash(goal), 1.0
+        row = self._row(key)
+        if row is None or row[0] != goal:
+            if self._index is None:
+                self._index = GoalIndex(
+                    self.connection.execute(
+                        "SELECT goal_hash, goal FROM prompts"
+                    ).fetchall()
+                )
+            nearest = self._index.nearest(goal)
+            if nearest is None or nearest[1] < self.min_similarity:
+                return None
+            key, similarity = nearest
+            row = self._row(key)
+        stored_goal, prompt, test_cases, pass_rate = row
+        return LibraryMatch(
+            goal=stored_goal,
+            prompt=prompt,
+            test_cases=json.loads(test_cases),
+            pass_rate=pass_rate,
+            similarity=similarity,
+            exact=stored_goal == goal,
+        )
+
+    def _row(self, key: str) -> Optional[Tuple[str, str, str, float]]:
+        return self.connection.execute(
+            "SELECT goal, prompt, test_cases, pass_rate FROM prompts WHERE goal_hash = ?",
+            (key,),
+        ).fetchone()
+
+    def close(self) -> None:
+        self.connection.close()
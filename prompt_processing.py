@@ -1,33 +1,199 @@
 import asyncio
-from typing import Any, Dict, List, Optional, Tuple, Union
-from utils import print_success, print_info, print_warning, print_error
+import contextlib
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from utils import (
+    print_success,
+    print_info,
+    print_warning,
+    print_error,
+    print_detail,
+    to_json,
+    QUIET,
+    VERBOSE,
+)
 from prompt_processing_utils import (
     extract_generated_prompt,
+    extract_prompt_edits,
+    apply_prompt_edits,
     extract_test_cases,
     update_variable_names,
     load_prompt,
     extract_eval_result,
     handle_eval_result,
     update_test_results,
-    store_results_for_file,
-    parse_results_for_file,
+    compact_failure_feedback,
+)
+from model_selector import get_task_profile
+from api_communication import current_task_name, current_test_case
+from assertions import (
+    ASSERTIONS_PROMPT,
+    check_response,
+    failure_evaluation,
+    parse_assertions,
+)
+from async_utils import offload
+from test_case_dedup import find_near_duplicates
+from dataset_loader import DATASET_RESULTS_PATH, iter_dataset
+from structured_output import (
+    EVALUATION_SCHEMA,
+    GENERATED_PROMPT_SCHEMA,
+    parse_structured_output,
+    structured_output_instructions,
+    test_case_schema,
+    to_evaluation,
+    to_test_cases,
 )
-from model_selector import model_selector
+from result_store import ResultStore, TestCaseResult
 
 
 class PromptProcessor:
-    def __init__(self, api_client: Any, provider: str):
+    def __init__(
+        self,
+        api_client: Any,
+        provider: str,
+        task_semaphores: Optional[Dict[str, asyncio.Semaphore]] = None,
+    ):
         self.provider = provider
         self.api = api_client
+        # Pass a shared dict to apply the task concurrency caps across several processors
+        self.task_semaphores: Dict[str, asyncio.Semaphore] = (
+            task_semaphores if task_semaphores is not None else {}
+        )
+        # Callables receiving (test_case, prompt_template, input, response, evaluation, failed)
+        # for every evaluated test case
+        self.result_listeners: List[Callable[..., None]] = []
+        # Per test case: failure count, whether the last run failed, and the last latency;
+        # used to start likely failures and slow test cases first
+        self.test_case_history: Dict[str, Dict[str, float]] = {}
+        # Deterministic checks from test case generation, run before the LLM judge, and
+        # the prompt template they were written for
+        self.assertions: List[Dict[str, Any]] = []
+        self.assertions_prompt: Optional[str] = None
+
+    def notify_result(
+        self,
+        test_case: Union[str, int],
+        prompt_template: str,
+        test_case_input: Union[Dict[str, str], str],
+        response: str,
+        evaluation: str,
+        failed: bool,
+    ) -> None:
+        """
+        Passes an evaluated test case to every registered result listener.
+
+        Args:
+            test_case (Union[str, int]): The test case identifier.
+            prompt_template (str): The prompt template used for the test case.
+            test_case_input (Union[Dict[str, str], str]): The input for the test case.
+            response (str): The response for the test case.
+            evaluation (str): The evaluation of the response.
+            failed (bool): Whether the evaluation marked the test case as failed.
+
+        Returns:
+            None
+        """
+        for listener in self.result_listeners:
+            listener(
+                test_case,
+                prompt_template,
+                test_case_input,
+                response,
+                evaluation,
+                failed,
+            )
+
+    async def send_task_request(
+        self,
+        task_name: str,
+        prompt: str,
+        schema: Optional[Dict[str, Any]] = None,
+    ) -> Optional[str]:
+        """
+        Sends a request using the model and performance profile configured for the task.
+
+        Args:
+            task_name (str): The task, e.g. "test-case-execution".
+            prompt (str): The prompt to send.
+            schema (Optional[Dict[str, Any]]): Requests structured output following this
+                schema, returned as JSON.
+
+        Returns:
+            Optional[str]: The response from the model, or None if the request failed.
+        """
+        profile = get_task_profile(self.provider, task_name)
+        if profile["max_concurrency"] and task_name not in self.task_semaphores:
+            self.task_semaphores[task_name] = asyncio.Semaphore(
+                profile["max_concurrency"]
+            )
+        semaphore = self.task_semaphores.get(task_name) or contextlib.nullcontext()
+        token = current_task_name.set(task_name)
+        try:
+            async with semaphore:
+                return await self.api.send_request_to_model(
+                    prompt=prompt,
+                    model=profile["model"],
+                    max_tokens_to_sample=profile["max_tokens"],
+                    temperature=profile["temperature"],
+                    max_retries=profile["max_retries"],
+                    timeout=profile["timeout"],
+                    stop_sequences=profile["stop_sequences"],
+                    retry_initial_delay=profile["retry_initial_delay"],
+                    retry_backoff=profile["retry_backoff"],
+                    cache=profile["cache"],
+                    stream=profile["stream"],
+                    coalesce=profile["coalesce"],
+                    schema=schema,
+                )
+        finally:
+            current_task_name.reset(token)
+
+    async def request_structured(
+        self, task_name: str, prompt: str, schema: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Sends a request for structured output if the task profile enables it and the
+        provider supports it, so the answer needs no XML parsing.
+
+        Args:
+            task_name (str): The task, e.g. "test-case-evaluation".
+            prompt (str): The prompt, written for an answer in XML tags.
+            schema (Dict[str, Any]): The output schema, from `structured_output`.
+
+        Returns:
+            Optional[Dict[str, Any]]: The validated output, or None if structured output is
+            not enabled or the request failed, in which case the caller falls back to XML tags.
+        """
+        profile = get_task_profile(self.provider, task_name)
+        if not profile["structured_output"] or not self.api.supports_structured_output:
+            return None
+        response = await self.send_task_request(
+            task_name, prompt + structured_output_instructions(schema), schema
+        )
+        output = None
+        if response:
+            output = await offload(
+                parse_structured_output, response, schema, size=len(response)
+            )
+        if output is None:
+            print_warning("Structured output failed. Falling back to XML tags...")
+        return output
 
     async def generate_prompt(
-        self, prompt_description: str, eval_results: Dict[str, str]
+        self,
+        prompt_description: str,
+        eval_results: Dict[str, str],
+        reference_prompt: Optional[str] = None,
     ) -> Optional[str]:
         """
         Generates a prompt based on the given prompt description and failed evaluation results.
         Args:
             prompt_description (str): The description of the prompt.
             eval_results (Dict[str, str]): A dictionary containing the evaluation results.
+            reference_prompt (Optional[str]): A converged prompt for a similar description to
+                start the initial prompt from.
         Returns:
             Optional[str]: The generated prompt or None if prompt generation failed.
         """
@@ -35,16 +201,21 @@ class PromptProcessor:
         if eval_results:
             print_warning(f"\n*** Iterating prompt due to failed test case(s)... ***")
             # If there are failed evaluation results, build string that includes them
-            eval_prompt = eval_inputs = eval_responses = eval_evaluations = []
-            test_cases_and_evaluations = ""
-            for i, failed_eval in enumerate(eval_results):
-                eval_prompt.append(eval_results[failed_eval]["prompt"])
-                eval_inputs.append(eval_results[failed_eval]["input"])
-                eval_responses.append(eval_results[failed_eval]["response"])
-                eval_evaluations.append(eval_results[failed_eval]["evaluation"])
-                if i == 0:
-                    test_cases_and_evaluations += f"<Original_Prompt>\n{eval_results[failed_eval]['prompt']}\n</Original_Prompt>\n"
-                test_cases_and_evaluations += f"<TEST_CASE_{i+1}>\n<Input{i+1}>\n{eval_results[failed_eval]['input']}\n</Input{i+1}>\n<Response_{i+1}>\n{eval_results[failed_eval]['response']}\n</Response_{i+1}>\n<Evaluation_{i+1}>\n{eval_results[failed_eval]['evaluation']}\n</Evaluation_{i+1}>\n</TEST_CASE_{i+1}>"
+            profile = get_task_profile(self.provider, task_name)
+            test_cases_and_evaluations = await offload(
+                compact_failure_feedback,
+                eval_results,
+                profile["feedback_token_budget"],
+                profile["feedback_field_tokens"],
+            )
+            if profile["refinement"] == "patch":
+                current_prompt = next(iter(eval_results.values()))["prompt"]
+                refined_prompt = await self.refine_prompt(
+                    prompt_description, current_prompt, test_cases_and_evaluations
+                )
+                if refined_prompt:
+                    return refined_prompt
+                print_warning("Falling back to a full prompt rewrite...")
 
             prompt_generation_prompt = f"""
 # CONTEXT #
@@ -159,26 +330,106 @@ Generate a prompt based on the following prompt description. Read it carefully:
 <PROMPT_DESCRIPTION>
 {prompt_description}
 </PROMPT_DESCRIPTION>
+"""
+            if reference_prompt:
+                prompt_generation_prompt += f"""
+# REFERENCE PROMPT #
+Here is a prompt that was tested successfully for a similar prompt description. Use it as a starting point, adapting it wherever the prompt description above differs:
+<REFERENCE_PROMPT>
+{reference_prompt}
+</REFERENCE_PROMPT>
 """
 
-        prompt_generation_response = await self.api.send_request_to_model(
-            prompt=prompt_generation_prompt,
-            model=model_selector[self.provider][task_name]["model"],
-            temperature=model_selector[self.provider][task_name]["temperature"],
+        output = await self.request_structured(
+            task_name, prompt_generation_prompt, GENERATED_PROMPT_SCHEMA
         )
-        if prompt_generation_response:
-            generated_prompt = extract_generated_prompt(prompt_generation_response)
-            if not generated_prompt:
+        if output is not None:
+            generated_prompt = output["generated_prompt"].strip()
+        else:
+            prompt_generation_response = await self.send_task_request(
+                task_name, prompt_generation_prompt
+            )
+            if not prompt_generation_response:  # Prompt generation failed
+                print_error("Prompt generation failed.")
                 return None
-            print_success(f"*** Generated prompt. ***")
-            print(generated_prompt)
-            return generated_prompt
-        else:  # Prompt generation failed
-            print_error("Prompt generation failed.")
+            generated_prompt = await offload(
+                extract_generated_prompt,
+                prompt_generation_response,
+                size=len(prompt_generation_response),
+            )
+        if not generated_prompt:
+            return None
+        print_success(f"*** Generated prompt. ***")
+        print_detail(generated_prompt)
+        return generated_prompt
+
+    async def refine_prompt(
+        self,
+        prompt_description: str,
+        current_prompt: str,
+        test_cases_and_evaluations: str,
+    ) -> Optional[str]:
+        """
+        Improves a prompt by asking for an edit list instead of a full rewrite, which needs
+        far fewer output tokens for long prompts, and applies the edits locally.
+
+        Args:
+            prompt_description (str): The description of the prompt.
+            current_prompt (str): The prompt template the test cases ran against.
+            test_cases_and_evaluations (str): The failure feedback from `compact_failure_feedback`.
+
+        Returns:
+            Optional[str]: The edited prompt, or None if the request failed or the edits did
+            not apply.
+        """
+        prompt_refinement_prompt = f"""
+# CONTEXT #
+You are an experienced prompt engineer. Your task is to improve an existing LLM prompt in order to elicit an LLM to achieve the specified goal and/or assumes the specified role.
+You will be provided with the existing prompt (as <Original_Prompt>), test cases, and evaluations for those test cases. Rather than rewriting the prompt, you will write a list of targeted edits that address the failed test cases and evaluations.
+
+# PROMPT DESCRIPTION #
+Here is the prompt description that drives the prompt.
+<PROMPT_DESCRIPTION>
+{prompt_description}
+</PROMPT_DESCRIPTION>
+
+# TEST CASES AND EVALUATIONS #
+Here are the test cases and evaluations. Read them carefully:
+<test_cases_and_evaluations>
+{test_cases_and_evaluations}
+</test_cases_and_evaluations>
+
+# INSTRUCTIONS #
+Follow this procedure to improve the prompt:
+1. Read the failed inputs, responses, and evaluations carefully. Document your understanding of them in <LESSONS_LEARNED></LESSONS_LEARNED> XML tags.
+2. Decide on the smallest changes to the prompt that incorporate your lessons learned, following prompt engineering best practices.
+3. Write the changes as a JSON edit list within <PROMPT_EDITS></PROMPT_EDITS> XML tags, e.g. <PROMPT_EDITS>[{{"find": "exact text from the prompt", "replace": "new text"}}]</PROMPT_EDITS>. Each "find" must be copied exactly from the original prompt and occur in it only once; to add text, include the neighboring text in "find" and "replace". Edits are applied in order.
+4. Keep every input variable in curly braces exactly as it is; do not add or remove any.
+"""
+        response = await self.send_task_request(
+            "prompt-generation", prompt_refinement_prompt
+        )
+        if not response:
+            return None
+        edits = await offload(extract_prompt_edits, response, size=len(response))
+        if edits is None:
+            print_warning("Prompt refinement returned no valid edit list.")
+            return None
+        refined_prompt, reason = await offload(
+            apply_prompt_edits, current_prompt, edits, size=len(current_prompt)
+        )
+        if refined_prompt is None:
+            print_warning(f"Prompt edits could not be applied: {reason}.")
             return None
+        print_success(f"*** Refined prompt with {len(edits)} edit(s). ***")
+        print_detail(refined_prompt)
+        return refined_prompt
 
     async def generate_prompt_handler(
-        self, goal: str, test_results: Dict[str, str]
+        self,
+        goal: str,
+        test_results: Dict[str, str],
+        reference_prompt: Optional[str] = None,
     ) -> Optional[str]:
         """
         Generates and cleans a prompt based on the given goal and test results.
@@ -186,13 +437,58 @@ Generate a prompt based on the following prompt description. Read it carefully:
         Args:
             goal (str): The goal for generating the prompt.
             test_results (Dict[str, str]): A dictionary containing the test results.
+            reference_prompt (Optional[str]): A converged prompt for a similar goal, used by
+                the initial generation.
 
         Returns:
             Optional[str]: The generated and cleaned prompt, or None if prompt generation fails.
         """
-        prompt_template = await self.generate_prompt(goal, test_results)
-        # If prompt generation fails, return None
-        return prompt_template if prompt_template else None
+        prompt_template = await self.generate_prompt(
+            goal, test_results, reference_prompt
+        )
+        if not prompt_template:  # If prompt generation fails, return None
+            return None
+        if (
+            self.assertions_prompt is not None
+            and prompt_template != self.assertions_prompt
+        ):
+            await self.generate_assertions(prompt_template)
+        return prompt_template
+
+    async def generate_assertions(self, prompt_template: str) -> None:
+        """
+        Rewrites the deterministic checks for a new prompt template, since checks written
+        for an earlier template (e.g. a renamed tag) would fail correct responses. If the
+        request fails, the checks are cleared and every response goes to the LLM judge.
+
+        Args:
+            prompt_template (str): The new prompt template.
+
+        Returns:
+            None
+        """
+        assertions_generation_prompt = f"""
+# CONTEXT #
+You are an experienced prompt engineer. Your task is to write deterministic checks for the responses to a given LLM prompt.
+
+# PROMPT #
+Here is the prompt. Read it carefully:
+<PROMPT>
+{prompt_template}
+</PROMPT>
+{ASSERTIONS_PROMPT}"""
+        response = await self.send_task_request(
+            "test-case-generation", assertions_generation_prompt
+        )
+        self.assertions = (
+            await offload(parse_assertions, response, size=len(response))
+            if response
+            else []
+        )
+        self.assertions_prompt = prompt_template
+        print_info(
+            f"*** Rewrote {len(self.assertions)} deterministic check(s) for the new prompt. ***"
+        )
 
     async def generate_test_cases(
         self, num_test_cases: int, prompt: str, var_names: List[str]
@@ -373,20 +669,43 @@ Remember to match the format of the example exactly. Ensure the XML tags you use
 In this case, the variable name(s) are exactly: "{var_names}", which must be reflected in your XML tags.
 Do not be lazy when generating test cases. You must generate exactly {num_test_cases} unique test cases. Think step by step and double check your test cases against the procedure and examples before you answer.
 """
-
-        test_cases_response = await self.api.send_request_to_model(
-            prompt=test_case_generation_prompt,
-            model=model_selector[self.provider][task_name]["model"],
-            temperature=model_selector[self.provider][task_name]["temperature"],
+        profile = get_task_profile(self.provider, task_name)
+        if profile["assertions"]:
+            test_case_generation_prompt += ASSERTIONS_PROMPT
+
+        output = await self.request_structured(
+            task_name,
+            test_case_generation_prompt,
+            test_case_schema(var_names, profile["assertions"]),
         )
-        if test_cases_response:
-            test_cases = extract_test_cases(test_cases_response)
-            if not test_cases:
-                return None
-            return test_cases
+        if output is not None and output["test_cases"]:
+            test_cases = to_test_cases(output)
+            # Parsed like the tagged assertions so malformed checks are dropped the same way
+            assertions_text = (
+                f"<ASSERTIONS>{json.dumps(output.get('assertions', []))}</ASSERTIONS>"
+            )
         else:
-            print_error("Test case generation failed.")
+            test_cases_response = await self.send_task_request(
+                task_name, test_case_generation_prompt
+            )
+            if not test_cases_response:
+                print_error("Test case generation failed.")
+                return None
+            test_cases = await offload(
+                extract_test_cases, test_cases_response, size=len(test_cases_response)
+            )
+            assertions_text = test_cases_response
+        if not test_cases:
             return None
+        if profile["assertions"]:
+            self.assertions = await offload(
+                parse_assertions, assertions_text, size=len(assertions_text)
+            )
+            self.assertions_prompt = prompt
+            print_info(
+                f"*** Generated {len(self.assertions)} deterministic check(s). ***"
+            )
+        return test_cases
 
     async def setup_test_cases(
         self,
@@ -412,13 +731,13 @@ Do not be lazy when generating test cases. You must generate exactly {num_test_c
             test_cases = await self.generate_test_cases(
                 num_tc, prompt_template, placeholder_names
             )
+            if test_cases is None:
+                return None
             if any(["parsing failed" in test_cases[key] for key in test_cases]):
                 print_warning(
                     "Test Case parsing failed. Retrying test case generation..."
                 )
                 continue
-            if test_cases is None:
-                return None
             test_cases, test_case_retry = update_variable_names(
                 test_cases, placeholder_names
             )
@@ -428,6 +747,82 @@ Do not be lazy when generating test cases. You must generate exactly {num_test_c
         print_error("Test case generation failed after multiple retries.")
         return None
 
+    async def check_stored_test_cases(
+        self,
+        test_cases: Dict[str, Dict[str, str]],
+        num_tc: Optional[int],
+        placeholder_names: List[str],
+    ) -> Optional[Dict[str, Dict[str, str]]]:
+        """
+        Checks test cases stored in the prompt library the way generated ones are checked.
+
+        Args:
+            test_cases (Dict[str, Dict[str, str]]): The stored test cases.
+            num_tc (Optional[int]): The number of test cases requested for this run.
+            placeholder_names (List[str]): The list of placeholder names.
+
+        Returns:
+            Optional[Dict[str, Dict[str, str]]]: The test cases without near-duplicates, or
+                None if new test cases must be generated.
+        """
+        if num_tc is not None and len(test_cases) != num_tc:
+            print_info(
+                f"*** The library has {len(test_cases)} test cases for this goal, but "
+                f"{num_tc} were requested. Generating new test cases... ***"
+            )
+            return None
+        if "TEST_CASE_1" not in test_cases or not all(
+            isinstance(test_case, dict) for test_case in test_cases.values()
+        ):
+            print_warning("Stored test cases are malformed. Generating new ones...")
+            return None
+        test_cases, test_case_retry = update_variable_names(
+            {name: dict(test_case) for name, test_case in test_cases.items()},
+            placeholder_names,
+        )
+        names = {name.strip("{}") for name in placeholder_names}
+        if test_case_retry or any(
+            set(test_case) != names for test_case in test_cases.values()
+        ):
+            print_warning(
+                "Stored test cases do not match the prompt's placeholders. "
+                "Generating new ones..."
+            )
+            return None
+        return await self.remove_duplicate_test_cases(test_cases)
+
+    async def remove_duplicate_test_cases(
+        self, test_cases: Dict[str, Dict[str, str]]
+    ) -> Dict[str, Dict[str, str]]:
+        """
+        Drops test cases whose inputs are near-duplicates of an earlier test case.
+
+        Args:
+            test_cases (Dict[str, Dict[str, str]]): The test cases to deduplicate.
+
+        Returns:
+            Dict[str, Dict[str, str]]: The test cases without near-duplicates.
+        """
+        threshold = get_task_profile(self.provider, "test-case-generation")[
+            "dedup_threshold"
+        ]
+        if not threshold:
+            return test_cases
+        duplicates = await offload(find_near_duplicates, test_cases, threshold)
+        for duplicate, original in duplicates.items():
+            print_warning(
+                f"Dropping {duplicate.title().replace('_', ' ')}: near-duplicate of {original.title().replace('_', ' ')}."
+            )
+        if duplicates:
+            print_success(
+                f"*** Kept {len(test_cases) - len(duplicates)} unique test cases. ***"
+            )
+        return {
+            name: test_case
+            for name, test_case in test_cases.items()
+            if name not in duplicates
+        }
+
     async def evaluate_response(
         self, prompt_to_eval: str, response_to_eval: str
     ) -> Optional[str]:
@@ -466,11 +861,12 @@ Follow this procedure to perform your evaluation:
 
 Remember, the prompt you are evaluating was asked of another LLM, and the response was created by that same other LLM. Your job is to evaluate the performance. Think step by step before you answer.
 """
-        evaluation_response = await self.api.send_request_to_model(
-            prompt=evaluation_prompt,
-            model=model_selector[self.provider][task_name]["model"],
-            temperature=model_selector[self.provider][task_name]["temperature"],
+        output = await self.request_structured(
+            task_name, evaluation_prompt, EVALUATION_SCHEMA
         )
+        if output is not None:
+            return to_evaluation(output)
+        evaluation_response = await self.send_task_request(task_name, evaluation_prompt)
         if evaluation_response:
             return evaluation_response
         else:
@@ -494,19 +890,39 @@ Remember, the prompt you are evaluating was asked of another LLM, and the respon
                 If the prompt execution fails or the evaluation is not available, None is returned for both values.
         """
         task_name = "test-case-execution"
-        response = await self.api.send_request_to_model(
-            prompt=prompt,
-            model=model_selector[self.provider][task_name]["model"],
-            temperature=model_selector[self.provider][task_name]["temperature"],
-        )
+        response = await self.send_task_request(task_name, prompt)
         if response is None:
             print_error("Prompt execution failed.")
             return None, None
+        if self.assertions:
+            failures = await offload(
+                check_response, response, self.assertions, size=len(response)
+            )
+            if failures:
+                # A deterministic failure settles the test case without the judge
+                print_warning(f"Deterministic checks failed: {' '.join(failures)}")
+                return response, failure_evaluation(failures)
         evaluation = await self.evaluate_response(prompt, response)
         if evaluation is None:
             return None, None
         return response, evaluation
 
+    def test_case_priority(self, test_case: str) -> Tuple[float, float, float]:
+        """
+        Sort key that puts test cases that failed last time first, then those that failed
+        most often, then the slowest. Test cases without history keep their order.
+
+        Args:
+            test_case (str): The name of the test case.
+
+        Returns:
+            Tuple[float, float, float]: The sort key; lower runs first.
+        """
+        history = self.test_case_history.get(test_case)
+        if history is None:
+            return 0.0, 0.0, 0.0
+        return -history["last_failed"], -history["failures"], -history["latency"]
+
     async def handle_test_case(
         self, test_case: str, test_case_data: Dict[str, str], prompt_template: str
     ) -> Tuple[bool, Optional[str], Optional[str]]:
@@ -537,8 +953,12 @@ Remember, the prompt you are evaluating was asked of another LLM, and the respon
         if skip_test_case:
             return True, None, None
 
-        loaded_prompt = load_prompt(prompt_template, test_case_data)
-        response, evaluation = await self.execute_prompt(loaded_prompt)
+        token = current_test_case.set(test_case)
+        try:
+            loaded_prompt = load_prompt(prompt_template, test_case_data)
+            response, evaluation = await self.execute_prompt(loaded_prompt)
+        finally:
+            current_test_case.reset(token)
         if response is None and evaluation is None:
             return False, None, None
         return False, response, evaluation
@@ -547,99 +967,279 @@ Remember, the prompt you are evaluating was asked of another LLM, and the respon
         self,
         test_cases: Dict[str, str],
         prompt_template: str,
-        combined_results: List[Dict[str, Union[str, Dict[str, str]]]],
-        test_results: Dict[str, Union[str, Dict[str, str]]],
-    ) -> Tuple[
-        Dict[str, Union[str, Dict[str, str]]],
-        List[Dict[str, Union[str, Dict[str, str]]]],
-        bool,
-    ]:
+        combined_results: ResultStore,
+        test_results: Dict[str, TestCaseResult],
+    ) -> Tuple[Dict[str, TestCaseResult], ResultStore, bool]:
         """
         Processes the test cases by executing the prompt and evaluating the responses.
 
+        Test cases start in `test_case_priority` order, so when the task concurrency caps
+        queue them, earlier failures and slow test cases are not left waiting behind the rest.
+
         Args:
             test_cases (Dict[str, str]): A dictionary containing the test cases.
             prompt_template (str): The template for the prompt.
-            combined_results (List[Dict[str, Union[str, Dict[str, str]]]]): A list of combined results.
-            test_results (Dict[str, Union[str, Dict[str, str]]]): A dictionary containing the test results.
+            combined_results (ResultStore): The results of every iteration so far.
+            test_results (Dict[str, TestCaseResult]): The latest result of each test case.
 
         Returns:
-            test_results (Dict[str, Union[str, Dict[str, str]]]): A dictionary containing the test results.
-            combined_results (List[Dict[str, Union[str, Dict[str, str]]]]): A list of combined results.
+            test_results (Dict[str, TestCaseResult]): The latest result of each test case.
+            combined_results (ResultStore): The results of every iteration so far.
             failed_test_cases (bool): A boolean indicating whether any test cases failed.
         """
-        results, failed_test_cases = {}, False
+        failed_test_cases = False
+        passed_count = evaluated_count = 0
         print_info(f"*** Beginning self-evaluation... ***\n")
-        test_case_handling_tasks = [
-            asyncio.create_task(
-                self.handle_test_case(test_case, test_cases[test_case], prompt_template)
+
+        # History is kept only for generated suites, which are small and rerun every
+        # iteration; dataset rows are streamed and not remembered
+        async def run_test_case(
+            test_case: str,
+        ) -> Tuple[bool, Optional[str], Optional[str]]:
+            started = time.perf_counter()
+            result = await self.handle_test_case(
+                test_case, test_cases[test_case], prompt_template
             )
-            for test_case in test_cases
-        ]
-        test_case_results = await asyncio.gather(*test_case_handling_tasks)
+            history = self.test_case_history.setdefault(
+                test_case, {"failures": 0, "last_failed": 0, "latency": 0.0}
+            )
+            history["latency"] = time.perf_counter() - started
+            return result
+
+        # Tasks reach the concurrency caps in creation order
+        test_case_handling_tasks = {
+            test_case: asyncio.create_task(run_test_case(test_case))
+            for test_case in sorted(test_cases, key=self.test_case_priority)
+        }
+        test_case_results = await asyncio.gather(
+            *(test_case_handling_tasks[test_case] for test_case in test_cases)
+        )
         for test_case, (skip_test_case, response, evaluation) in zip(
             test_cases.keys(), test_case_results
         ):
             if not response or not evaluation:
                 skip_test_case = True
             if response:
-                print_info(f"{test_case.title().replace('_', ' ')} input(s): ")
-                print(f"{test_cases[test_case]}")
-                print_info(f"{test_case.title().replace('_', ' ')} response: ")
-                print(f"{response}")
+                print_info(
+                    f"{test_case.title().replace('_', ' ')} input(s): ", level=VERBOSE
+                )
+                print_detail(f"{test_cases[test_case]}")
+                print_info(
+                    f"{test_case.title().replace('_', ' ')} response: ", level=VERBOSE
+                )
+                print_detail(f"{response}")
             if skip_test_case:
                 continue
 
-            eval_result = extract_eval_result(evaluation)
+            eval_result = await offload(
+                extract_eval_result, evaluation, size=len(evaluation)
+            )
             test_case_failed = handle_eval_result(test_case, eval_result)
             failed_test_cases = (
                 failed_test_cases or test_case_failed
             )  # Update only if a failure is detected
+            evaluated_count += 1
+            passed_count += not test_case_failed
+            history = self.test_case_history[test_case]
+            history["failures"] += test_case_failed
+            history["last_failed"] = int(test_case_failed)
+            self.notify_result(
+                test_case,
+                prompt_template,
+                test_cases[test_case],
+                response,
+                evaluation,
+                test_case_failed,
+            )
 
-            test_result = update_test_results(
+            test_results[test_case] = combined_results.add(
                 test_case,
                 prompt_template,
                 test_cases[test_case],
                 response,
                 evaluation,
             )
-            test_results.update(test_result)
 
-            result_for_file = store_results_for_file(test_case, response, evaluation)
-            results.update(result_for_file)
+        print_info(
+            f"*** {passed_count}/{evaluated_count} test cases passed. ***",
+            level=QUIET,
+        )
+        return test_results, combined_results, failed_test_cases
+
+    async def process_dataset(
+        self,
+        dataset_path: str,
+        prompt_template: str,
+        placeholder_names: List[str],
+        column_map: Optional[Dict[str, str]] = None,
+        max_in_flight: Optional[int] = None,
+        max_feedback_cases: int = 20,
+        output_path: str = DATASET_RESULTS_PATH,
+        progress_interval: float = 5.0,
+    ) -> Tuple[Optional[Dict[str, Dict[str, str]]], Dict[str, float], bool]:
+        """
+        Executes and evaluates the prompt against every row of a JSONL or CSV dataset.
+
+        Rows are streamed from disk and at most `max_in_flight` are processed at once. Each
+        result is appended to `output_path` as it completes, and only a bounded sample of
+        failures is kept in memory for prompt regeneration.
+
+        Args:
+            dataset_path (str): The JSONL or CSV file with one test case per row.
+            prompt_template (str): The template for the prompt.
+            placeholder_names (List[str]): The placeholders found in the prompt.
+            column_map (Optional[Dict[str, str]]): Explicit placeholder-to-column mappings.
+            max_in_flight (Optional[int]): Rows processed concurrently. Defaults to the execution
+                profile's max_concurrency, or 16.
+            max_feedback_cases (int): Failed rows kept for prompt regeneration feedback.
+            output_path (str): The JSONL file results are written to.
+            progress_interval (float): Seconds between progress reports.
 
-            parsed_results = parse_results_for_file(
-                results, test_case, prompt_template, response
+        Returns:
+            Tuple[Optional[Dict[str, Dict[str, str]]], Dict[str, float], bool]:
+                - A sample of failed test results, or None if no row could be processed.
+                - Throughput statistics for the run.
+                - A boolean indicating whether any row failed.
+        """
+        max_in_flight = (
+            max_in_flight
+            or get_task_profile(self.provider, "test-case-execution")["max_concurrency"]
+            or 16
+        )
+        stats = {"rows": 0, "passed": 0, "failed": 0, "errors": 0, "skipped": 0}
+        test_results, latency_total, latency_max = {}, 0.0, 0.0
+        start = last_report = time.perf_counter()
+        print_info(f"*** Evaluating dataset {dataset_path}... ***\n")
+
+        async def run_row(name: str, data: Dict[str, str]) -> Tuple:
+            row_start = time.perf_counter()
+            skip, response, evaluation = await self.handle_test_case(
+                name, data, prompt_template
+            )
+            latency = time.perf_counter() - row_start
+            failed = None
+            if evaluation is not None:
+                # The same verdict rules as generated test cases in process_test_cases
+                eval_result = await offload(
+                    extract_eval_result, evaluation, size=len(evaluation)
+                )
+                failed = handle_eval_result(name, eval_result)
+            return name, data, skip, response, evaluation, failed, latency
+
+        def record(result: Tuple) -> None:
+            nonlocal latency_total, latency_max, last_report
+            name, data, skip, response, evaluation, failed, latency = result
+            stats["rows"] += 1
+            if skip:
+                stats["skipped"] += 1
+                return
+            if response is None or evaluation is None:
+                stats["errors"] += 1
+                return
+            latency_total += latency
+            latency_max = max(latency_max, latency)
+            stats["failed" if failed else "passed"] += 1
+            self.notify_result(
+                name, prompt_template, data, response, evaluation, failed
+            )
+            if failed and len(test_results) < max_feedback_cases:
+                test_results.update(
+                    update_test_results(
+                        name, prompt_template, data, response, evaluation
+                    )
+                )
+            output_file.write(
+                to_json(
+                    {
+                        "test_case": name,
+                        "input": data,
+                        "response": response,
+                        "evaluation": evaluation,
+                        "result": "FAIL" if failed else "PASS",
+                        "latency": round(latency, 3),
+                    }
+                )
+                + "\n"
             )
-            combined_results.append(parsed_results)
+            now = time.perf_counter()
+            if now - last_report >= progress_interval:
+                last_report = now
+                print_info(
+                    f"Processed {stats['rows']} rows: {stats['passed']} passed, "
+                    f"{stats['failed']} failed, {stats['errors']} errors "
+                    f"({stats['rows'] / (now - start):.1f} rows/s)",
+                    level=QUIET,
+                )
 
-        return test_results, combined_results, failed_test_cases
+        pending = set()
+        with open(output_path, "w", encoding="utf-8") as output_file:
+            for name, data in iter_dataset(dataset_path, placeholder_names, column_map):
+                if len(pending) >= max_in_flight:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        record(task.result())
+                pending.add(asyncio.create_task(run_row(name, data)))
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    record(task.result())
+
+        elapsed = time.perf_counter() - start
+        evaluated = stats["passed"] + stats["failed"]
+        stats.update(
+            {
+                "elapsed_seconds": round(elapsed, 2),
+                "rows_per_second": round(stats["rows"] / elapsed, 2) if elapsed else 0,
+                "mean_latency_seconds": (
+                    round(latency_total / evaluated, 2) if evaluated else 0
+                ),
+                "max_latency_seconds": round(latency_max, 2),
+            }
+        )
+        print_success(
+            f"\n*** Dataset evaluated: {stats['passed']}/{evaluated} passed, "
+            f"{stats['errors']} errors, {stats['skipped']} skipped in {stats['elapsed_seconds']}s "
+            f"({stats['rows_per_second']} rows/s, mean latency {stats['mean_latency_seconds']}s). "
+            f"Results written to {output_path} ***",
+            level=QUIET,
+        )
+        if evaluated == 0:
+            print_error("No dataset rows could be evaluated.")
+            return None, stats, False
+        return test_results, stats, stats["failed"] > 0
 
     async def process_no_input_var_case(
-        self, prompt_template: str, combined_results: List, test_results: Dict[str, str]
-    ) -> Union[Dict[str, str], List, bool]:
+        self,
+        prompt_template: str,
+        combined_results: ResultStore,
+        test_results: Dict[str, TestCaseResult],
+    ) -> Union[Dict[str, TestCaseResult], ResultStore, bool]:
         """
         Process the case when there is no input variable.
 
         Args:
             prompt_template (str): The template for the prompt.
-            combined_results (List): The combined results.
-            test_results (Dict[str, str]): The test results.
+            combined_results (ResultStore): The results of every iteration so far.
+            test_results (Dict[str, TestCaseResult]): The test results.
 
         Returns:
             Union[Dict[str, str], List, bool]: The processed test results, combined results, and evaluation status.
         """
-        results = {}
         response, evaluation = await self.execute_prompt(prompt_template)
         if response is None and evaluation is None:
             return None, None, None
-        eval_result = extract_eval_result(evaluation)
+        eval_result = await offload(
+            extract_eval_result, evaluation, size=len(evaluation)
+        )
         eval_failed = handle_eval_result("", eval_result)
-        test_results = update_test_results(
-            0, prompt_template, "None", response, evaluation
+        self.notify_result(
+            0, prompt_template, "None", response, evaluation, eval_failed
         )
-        result_for_file = store_results_for_file(0, response, evaluation)
-        results.update(result_for_file)
-        parsed_results = parse_results_for_file(results, 0, prompt_template, response)
-        combined_results.append(parsed_results)
+        test_results = {
+            0: combined_results.add(0, prompt_template, "None", response, evaluation)
+        }
         return test_results, combined_results, eval_failed
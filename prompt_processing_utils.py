@@ -1,8 +1,15 @@
+import json
 import re
 from typing import Dict, List, Optional, Union, Tuple
 import xml.etree.ElementTree as ET
 
-from utils import print_error, print_warning, print_info, print_success
+from utils import (
+    estimate_tokens,
+    print_error,
+    print_warning,
+    print_info,
+    print_success,
+)
 
 
 def extract_generated_prompt(response: str) -> Optional[str]:
@@ -26,6 +33,69 @@ def extract_generated_prompt(response: str) -> Optional[str]:
     return None
 
 
+def extract_prompt_edits(response: str) -> Optional[List[Dict[str, str]]]:
+    """
+    Extracts the edit list from a prompt refinement response.
+
+    Args:
+        response (str): The response containing a JSON list of {"find", "replace"} edits
+            within <PROMPT_EDITS></PROMPT_EDITS> tags.
+
+    Returns:
+        Optional[List[Dict[str, str]]]: The edits, or None if they are missing or malformed.
+    """
+    match = re.search(
+        r"<PROMPT_EDITS>(.*?)</PROMPT_EDITS>", response, re.DOTALL | re.IGNORECASE
+    )
+    if not match:
+        return None
+    try:
+        edits = json.loads(match.group(1))
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(edits, list) or not all(
+        isinstance(edit, dict)
+        and isinstance(edit.get("find"), str)
+        and isinstance(edit.get("replace"), str)
+        for edit in edits
+    ):
+        return None
+    return edits
+
+
+def apply_prompt_edits(
+    prompt_template: str, edits: List[Dict[str, str]]
+) -> Tuple[Optional[str], str]:
+    """
+    Applies find/replace edits to a prompt template, in order, and validates the result.
+
+    Each "find" must occur exactly once in the template as edited so far, the edits must
+    change the template, and the result must keep the template's placeholders.
+
+    Args:
+        prompt_template (str): The current prompt template.
+        edits (List[Dict[str, str]]): The edits from `extract_prompt_edits`.
+
+    Returns:
+        Tuple[Optional[str], str]: The edited template, or None and the reason the edits
+        could not be applied.
+    """
+    edited = prompt_template
+    for number, edit in enumerate(edits, start=1):
+        occurrences = edited.count(edit["find"]) if edit["find"] else 0
+        if occurrences != 1:
+            return None, (
+                f"edit {number} matches the prompt {occurrences} times instead of once"
+            )
+        edited = edited.replace(edit["find"], edit["replace"])
+    edited = edited.strip()
+    if edited == prompt_template.strip():
+        return None, "the edits do not change the prompt"
+    if set(re.findall(r"{\w+}", edited)) != set(re.findall(r"{\w+}", prompt_template)):
+        return None, "the edits change the prompt's placeholders"
+    return edited, ""
+
+
 def preprocess_tags(xml_string: str) -> str:
     """
     Preprocesses the XML string by replacing spaces in tag names with a unique placeholder.
@@ -343,51 +413,124 @@ def update_test_results(
     return test_result
 
 
-def store_results_for_file(
-    test_case: str, response: str, evaluation: str
-) -> Dict[str, Dict[str, str]]:
+def truncate_middle(text: str, max_tokens: int) -> str:
     """
-    Store the results for a file.
+    Shortens text to roughly `max_tokens` tokens, keeping its beginning and end.
 
     Args:
-        test_case (str): The test case identifier.
-        response (str): The response for the test case.
-        evaluation (str): The evaluation result for the test case.
+        text (str): The text to shorten.
+        max_tokens (int): The approximate token limit.
 
     Returns:
-        Dict[str, Dict[str, str]]: A dictionary containing the stored results.
+        str: The text, with its middle replaced by a marker if it was too long.
     """
-    results = {}
-    results[test_case] = {"response": response, "evaluation": evaluation}
-    return results
+    text = str(text)
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    head, tail = text[: max_chars // 2], text[-(max_chars // 2) :]
+    return f"{head} ...[{len(text) - len(head) - len(tail)} characters truncated]... {tail}"
 
 
-def parse_results_for_file(
-    results: Dict[str, Dict[str, str]],
-    test_case: str,
-    prompt_template: str,
-    response: str,
-) -> Dict[str, Union[str, Dict[str, str]]]:
+def extract_evaluation_feedback(evaluation: str) -> Tuple[bool, str]:
     """
-    Parses the results for a file.
+    Extracts the verdict and the reasoning from an evaluation.
 
     Args:
-        results (Dict[str, Dict[str, str]]): A dictionary containing the results for each test case.
-        test_case (str): The test case for which to parse the results.
-        prompt_template (str): The prompt template used for the test case.
-        response (str): The response for the test case.
+        evaluation (str): The raw evaluation response.
 
     Returns:
-        Dict[str, Any]: A dictionary containing the parsed results, including the prompt template,
-        raw response, parsed response, and parsed evaluation.
+        Tuple[bool, str]: Whether the test case failed, and the evaluation scratchpad
+        (or the whole evaluation if the scratchpad is missing).
     """
-    parsed_response = parse_xml_content(results[test_case]["response"])
-    parsed_evaluation = parse_xml_content(
-        results[test_case]["evaluation"], ["EVALUATION_SCRATCHPAD", "EVALUATION_RESULT"]
+    result = re.search(
+        r"<EVALUATION_RESULT>(.*?)</EVALUATION_RESULT>", evaluation, re.DOTALL | re.I
     )
-    return {
-        "prompt_template": prompt_template,
-        "raw_response": response,
-        "parsed_response": parsed_response,
-        "parsed_evaluation": parsed_evaluation,
-    }
+    # Only an exact FAIL verdict counts, as in handle_eval_result
+    failed = bool(result) and result.group(1).strip() == "FAIL"
+    scratchpad = re.search(
+        r"<EVALUATION_SCRATCHPAD>(.*?)</EVALUATION_SCRATCHPAD>",
+        evaluation,
+        re.DOTALL | re.IGNORECASE,
+    )
+    return failed, (scratchpad.group(1) if scratchpad else evaluation).strip()
+
+
+def compact_failure_feedback(
+    eval_results: Dict[str, Dict[str, Union[str, Dict[str, str]]]],
+    token_budget: int,
+    max_field_tokens: int,
+) -> str:
+    """
+    Builds the test case feedback for prompt generation within a token budget.
+
+    The shared prompt template is included once. Failed test cases come before passed ones,
+    and within each group the case whose evaluation adds the most new information is picked
+    next, so near-identical failures do not crowd out distinct ones. Inputs, responses and
+    evaluations longer than `max_field_tokens` are truncated. Cases that do not fit in the
+    budget are left out and counted.
+
+    Args:
+        eval_results (Dict[str, Dict[str, Union[str, Dict[str, str]]]]): The test results keyed by test case.
+        token_budget (int): The approximate token budget for the whole feedback.
+        max_field_tokens (int): The approximate token limit for each input, response and evaluation.
+
+    Returns:
+        str: The feedback to embed in the prompt generation prompt.
+    """
+    first_result = next(iter(eval_results.values()))
+    feedback = f"<Original_Prompt>\n{first_result['prompt']}\n</Original_Prompt>\n"
+    remaining_budget = token_budget - estimate_tokens(feedback)
+
+    candidates, seen_inputs = [], set()
+    for test_case, result in eval_results.items():
+        input_key = repr(result["input"])
+        if input_key in seen_inputs:
+            continue  # Identical inputs carry no extra signal
+        seen_inputs.add(input_key)
+        failed, reasoning = extract_evaluation_feedback(result["evaluation"])
+        candidates.append(
+            {
+                "result": result,
+                "failed": failed,
+                "reasoning": reasoning,
+                "words": set(reasoning.lower().split()),
+            }
+        )
+
+    selected, covered_words = [], set()
+    while candidates:
+        # Failures first; then the evaluation contributing the most unseen words
+        best = max(
+            candidates,
+            key=lambda c: (c["failed"], len(c["words"] - covered_words)),
+        )
+        candidates.remove(best)
+        i = len(selected) + 1
+        test_input = best["result"]["input"]
+        if isinstance(test_input, dict):
+            test_input = {
+                key: truncate_middle(value, max_field_tokens)
+                for key, value in test_input.items()
+            }
+        block = (
+            f"<TEST_CASE_{i}>\n<Input{i}>\n{test_input}\n</Input{i}>\n"
+            f"<Response_{i}>\n{truncate_middle(best['result']['response'], max_field_tokens)}\n</Response_{i}>\n"
+            f"<Evaluation_{i}>\n{truncate_middle(best['reasoning'], max_field_tokens)}\n"
+            f"<EVALUATION_RESULT>{'FAIL' if best['failed'] else 'PASS'}</EVALUATION_RESULT>\n</Evaluation_{i}>\n"
+            f"</TEST_CASE_{i}>"
+        )
+        block_tokens = estimate_tokens(block)
+        if selected and block_tokens > remaining_budget:
+            candidates.append(best)
+            break
+        selected.append(block)
+        covered_words |= best["words"]
+        remaining_budget -= block_tokens
+
+    feedback += "".join(selected)
+    if candidates:
+        feedback += (
+            f"\n({len(candidates)} more test case(s) omitted to fit the token budget.)"
+        )
+    return feedback
@@ -0,0 +1,96 @@
+import asyncio
+import queue
+import threading
+import time
+from typing import Any
+
+
+class RateLimiter:
+    """
+    Token bucket limiting how many requests start per minute.
+
+    Allows bursts of up to `burst` requests (default: one second's worth) and then spaces
+    requests evenly. Shared by every task that uses the same backend.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: int = 0):
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive.")
+        self.rate = requests_per_minute / 60
+        self.capacity = burst or max(1, int(self.rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """
+        Waits until a request may start.
+
+        Returns:
+            None
+        """
+        # Waiters queue on the lock, so requests start in arrival order
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._updated = time.monotonic()
+                self._tokens = 0
+            else:
+                self._tokens -= 1
+
+
+class SharedRateLimiter:
+    """
+    Rate limiter for worker processes, drawing from a token queue that the parent process
+    refills with `feed_tokens`.
+
+    The queue is polled from the event loop rather than waited on in an executor thread, so
+    waiters do not tie up the default executor that `offload` also uses.
+    """
+
+    def __init__(self, tokens: Any, poll_interval: float = 0.05):
+        self._tokens = tokens
+        self.poll_interval = poll_interval
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """
+        Waits until a token is available.
+
+        Returns:
+            None
+        """
+        # Waiters queue on the lock, so only one of them polls and tokens go out in arrival order
+        async with self._lock:
+            while True:
+                try:
+                    return self._tokens.get_nowait()
+                except queue.Empty:
+                    await asyncio.sleep(self.poll_interval)
+
+
+def feed_tokens(tokens: Any, requests_per_minute: float, stop: threading.Event) -> None:
+    """
+    Adds tokens to a bounded queue at the given rate until stopped. The queue size is the
+    burst capacity: no tokens are added while it is full.
+
+    Args:
+        tokens (Any): A multiprocessing queue shared with the worker processes.
+        requests_per_minute (float): The request rate for all workers combined.
+        stop (threading.Event): Set to stop feeding.
+
+    Returns:
+        None
+    """
+    interval = 60 / requests_per_minute
+    while not stop.is_set():
+        try:
+            tokens.put(None, timeout=interval)
+        except queue.Full:
+            continue
+        stop.wait(interval)
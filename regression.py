@@ -0,0 +1,429 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from api_communication import LLMBackend, get_api_client
+from config import load_configuration
+from key_pool import load_key_pool, with_key_pool
+from model_selector import load_task_profiles
+from prompt_processing import PromptProcessor
+from rate_limiter import RateLimiter
+from result_store import ResultStore
+from utils import (
+    QUIET,
+    add_output_arguments,
+    close_log_sink,
+    configure_output,
+    final_prompt_path,
+    print_error,
+    print_info,
+    print_success,
+    print_warning,
+    save_results_to_json,
+    to_json,
+)
+
+REPORT_FILENAME = "regression_report.jsonl"
+RESULTS_FILENAME = "regression_results.json"
+
+# Names the suite being evaluated, so API calls can be attributed to it
+current_suite: ContextVar[Optional[str]] = ContextVar("current_suite", default=None)
+
+
+def load_suite(path: str) -> Tuple[Dict[str, Dict[str, str]], Optional[str]]:
+    """
+    Reads a saved test suite.
+
+    Accepts a suite file, a JSON object mapping test case names to their inputs, or a
+    results file written by an earlier run, whose test cases and returned prompt are used.
+    The returned prompt is read from the file saved next to the results; results files
+    without one fall back to their last prompt.
+
+    Args:
+        path (str): The suite or results file.
+
+    Returns:
+        Tuple[Dict[str, Dict[str, str]], Optional[str]]: The test cases, and the run's
+        prompt if the file is a results file.
+    """
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+    if isinstance(data, dict):
+        return data, None
+    test_cases, prompt_template = {}, None
+    for entry in data:
+        prompt_template = entry.get("prompt_template", prompt_template)
+        # Results files from before test cases were recorded carry no inputs
+        if isinstance(entry.get("input"), dict):
+            test_cases[str(entry["test_case"])] = entry["input"]
+    if os.path.exists(final_prompt_path(path)):
+        with open(final_prompt_path(path), encoding="utf-8") as file:
+            prompt_template = file.read()
+    return test_cases, prompt_template
+
+
+def check_suite(test_cases: Dict[str, Dict[str, str]], prompt_template: str) -> None:
+    """
+    Checks that a suite can run against a prompt, so a mismatch is reported as invalid
+    instead of sending the prompt with unfilled placeholders.
+
+    Args:
+        test_cases (Dict[str, Dict[str, str]]): The suite's test cases.
+        prompt_template (str): The prompt to evaluate.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If the prompt has placeholders but the suite has no test cases, or a
+            test case's inputs differ from the placeholders.
+    """
+    placeholders = {name[1:-1] for name in re.findall(r"{\w+}", prompt_template)}
+    if not placeholders:
+        return
+    if not test_cases:
+        raise ValueError("the suite has no test cases")
+    for name, inputs in test_cases.items():
+        if not isinstance(inputs, dict) or set(inputs) != placeholders:
+            found = sorted(inputs) if isinstance(inputs, dict) else inputs
+            raise ValueError(
+                f"test case {name} has inputs {found}, but the prompt's placeholders "
+                f"are {sorted(placeholders)}"
+            )
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class SuiteStats:
+    """Pass/fail counts of one suite's test cases and latency and token totals of its API calls."""
+
+    def __init__(self):
+        self.passed = self.failed = 0
+        self.latencies: List[float] = []
+        self.input_tokens = self.output_tokens = self.api_errors = 0
+
+    def record_result(
+        self,
+        test_case: Union[str, int],
+        prompt_template: str,
+        test_case_input: Union[Dict[str, str], str],
+        response: str,
+        evaluation: str,
+        failed: bool,
+    ) -> None:
+        # Matches the PromptProcessor result listener signature
+        self.failed += failed
+        self.passed += not failed
+
+    def record_call(self, metrics: Dict[str, Any]) -> None:
+        self.latencies.append(metrics["latency"])
+        self.input_tokens += metrics["input_tokens"]
+        self.output_tokens += metrics["output_tokens"]
+        self.api_errors += not metrics["success"]
+
+    def to_dict(self, total: int) -> Dict[str, Any]:
+        return {
+            "test_cases": total,
+            "passed": self.passed,
+            "failed": self.failed,
+            "errored": total - self.passed - self.failed,
+            "pass_rate": round(self.passed / total, 3) if total else 0.0,
+            "api_calls": len(self.latencies),
+            "api_errors": self.api_errors,
+            "latency_p50": round(percentile(self.latencies, 0.5), 3),
+            "latency_p95": round(percentile(self.latencies, 0.95), 3),
+            "latency_max": round(max(self.latencies, default=0.0), 3),
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+        }
+
+
+class RegressionRunner:
+    """
+    Evaluates existing prompts against saved suites, without generating prompts or test cases.
+
+    Suites for the same provider share one backend and one set of task concurrency caps, so
+    many suites can run at once within the provider limits.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None):
+        self.requests_per_minute = requests_per_minute
+        self.backends: Dict[str, LLMBackend] = {}
+        self.task_semaphores: Dict[str, Dict[str, asyncio.Semaphore]] = {}
+        self.stats: Dict[str, SuiteStats] = {}
+        self.key_pool = load_key_pool()
+        self.results = ResultStore()
+
+    def get_backend(self, provider: str) -> LLMBackend:
+        if provider not in self.backends:
+            backend = with_key_pool(
+                get_api_client(provider, load_configuration(provider)), self.key_pool
+            )
+            if self.requests_per_minute:
+                backend.rate_limiter = RateLimiter(self.requests_per_minute)
+            backend.call_listeners.append(self.record_call)
+            self.backends[provider] = backend
+        return self.backends[provider]
+
+    def record_call(self, metrics: Dict[str, Any]) -> None:
+        suite_id = current_suite.get()
+        if suite_id in self.stats:
+            self.stats[suite_id].record_call(metrics)
+
+    async def run_suite(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Evaluates one prompt against its suite.
+
+        Args:
+            payload (Dict[str, Any]): "id", "suite" (a suite or results file), and optionally
+                "prompt" or "prompt_file" (default: the prompt a results file's run returned) and
+                "provider" (default "Anthropic").
+
+        Returns:
+            Dict[str, Any]: The report for the suite, with "status" "passed", "failed" or
+            "invalid".
+        """
+        suite_id = payload["id"]
+        report = {"id": suite_id, "suite": payload.get("suite")}
+        try:
+            test_cases, results_prompt = load_suite(payload["suite"])
+            prompt_template = payload.get("prompt")
+            if prompt_template is None and payload.get("prompt_file"):
+                with open(payload["prompt_file"], encoding="utf-8") as file:
+                    prompt_template = file.read()
+            prompt_template = prompt_template or results_prompt
+            if not prompt_template:
+                raise ValueError("no prompt given and the suite is not a results file")
+            check_suite(test_cases, prompt_template)
+            backend = self.get_backend(payload.get("provider", "Anthropic"))
+        except (KeyError, OSError, ValueError, SystemExit) as e:
+            reason = "provider not configured" if isinstance(e, SystemExit) else e
+            print_warning(f"Skipping suite {suite_id}: {reason}")
+            return {**report, "status": "invalid", "error": str(reason)}
+
+        stats = self.stats[suite_id] = SuiteStats()
+        processor = PromptProcessor(
+            backend,
+            backend.provider_name,
+            self.task_semaphores.setdefault(backend.provider_name, {}),
+        )
+        processor.result_listeners.append(stats.record_result)
+        token = current_suite.set(suite_id)
+        started = time.perf_counter()
+        try:
+            if re.findall(r"{\w+}", prompt_template):
+                await processor.process_test_cases(
+                    test_cases, prompt_template, self.results, {}
+                )
+                total = len(test_cases)
+            else:
+                await processor.process_no_input_var_case(
+                    prompt_template, self.results, {}
+                )
+                total = 1
+        finally:
+            current_suite.reset(token)
+        report.update(stats.to_dict(total))
+        report["wall_seconds"] = round(time.perf_counter() - started, 3)
+        report["status"] = "passed" if report["passed"] == total else "failed"
+        return report
+
+    async def run(
+        self, payloads: List[Dict[str, Any]], concurrency: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Evaluates several suites at once.
+
+        Args:
+            payloads (List[Dict[str, Any]]): The suites, as accepted by `run_suite`.
+            concurrency (int): The number of suites evaluated at once.
+
+        Returns:
+            List[Dict[str, Any]]: The report for each suite, in the order of `payloads`.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run_one(payload: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.run_suite(payload)
+
+        try:
+            return await asyncio.gather(*(run_one(payload) for payload in payloads))
+        finally:
+            for backend in self.backends.values():
+                await backend.close()
+
+
+def read_manifest(path: str) -> List[Dict[str, Any]]:
+    """
+    Reads the suites to evaluate from a JSONL manifest, one object per line as accepted by
+    `RegressionRunner.run_suite`. Lines without an "id" are named "suite_<line number>";
+    lines repeating an earlier "id" are skipped.
+
+    Args:
+        path (str): The manifest file.
+
+    Returns:
+        List[Dict[str, Any]]: The suites.
+    """
+    payloads = []
+    seen_ids = set()
+    with open(path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                payload = json.loads(line)
+            except json.JSONDecodeError as e:
+                print_warning(f"Skipping invalid JSON on line {line_number}: {e}")
+                continue
+            if not isinstance(payload, dict):
+                print_warning(f"Skipping line {line_number}: expected an object.")
+                continue
+            payload.setdefault("id", f"suite_{line_number}")
+            if payload["id"] in seen_ids:
+                print_warning(f"Skipping line {line_number}: duplicate id.")
+                continue
+            seen_ids.add(payload["id"])
+            payloads.append(payload)
+    return payloads
+
+
+async def run_regression(
+    payloads: List[Dict[str, Any]],
+    concurrency: int = 16,
+    output_dir: str = "regression_results",
+    requests_per_minute: Optional[float] = None,
+) -> Dict[str, int]:
+    """
+    Evaluates every suite and writes a report line per suite to `regression_report.jsonl`,
+    and every response and evaluation to `regression_results.json`, in the output directory.
+
+    Args:
+        payloads (List[Dict[str, Any]]): The suites.
+        concurrency (int): The number of suites evaluated at once.
+        output_dir (str): The directory the report and results are written to.
+        requests_per_minute (Optional[float]): Request rate limit per provider.
+
+    Returns:
+        Dict[str, int]: The number of passed, failed and invalid suites.
+    """
+    print_info(
+        f"\n*** Evaluating {len(payloads)} prompts, {concurrency} at a time... ***",
+        level=QUIET,
+    )
+    started = time.perf_counter()
+    runner = RegressionRunner(requests_per_minute)
+    reports = await runner.run(payloads, concurrency)
+
+    counts = {"passed": 0, "failed": 0, "invalid": 0}
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, REPORT_FILENAME), "w", encoding="utf-8") as file:
+        for report in reports:
+            counts[report["status"]] += 1
+            file.write(to_json(report) + "\n")
+    save_results_to_json(
+        runner.results.iter_dicts(), os.path.join(output_dir, RESULTS_FILENAME)
+    )
+
+    for report in reports:
+        if report["status"] == "failed":
+            print_error(
+                f"{report['id']}: {report['passed']}/{report['test_cases']} passed "
+                f"({report['failed']} failed, {report['errored']} errored)"
+            )
+    latencies = [report["latency_p95"] for report in reports if "latency_p95" in report]
+    tokens = sum(
+        report.get("input_tokens", 0) + report.get("output_tokens", 0)
+        for report in reports
+    )
+    print_success(
+        f"\n*** Regression run complete in {time.perf_counter() - started:.1f}s: "
+        f"{counts['passed']} passed, {counts['failed']} failed, {counts['invalid']} invalid; "
+        f"worst p95 latency {max(latencies, default=0.0)}s, {tokens} tokens. "
+        f"Report in {output_dir}/{REPORT_FILENAME} ***",
+        level=QUIET,
+    )
+    return counts
+
+
+def main() -> None:
+    """
+    Evaluates existing prompts against saved suites, for regression runs.
+
+    Exits with status 1 if any prompt fails a test case or cannot be evaluated.
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(
+        description="Evaluate existing prompts against saved test suites."
+    )
+    parser.add_argument(
+        "manifest",
+        nargs="?",
+        help='JSONL file with one {"id", "suite", "prompt_file", "provider"} per line.',
+    )
+    parser.add_argument(
+        "--suite", help="Suite or results file to evaluate (instead of a manifest)."
+    )
+    parser.add_argument(
+        "--prompt-file",
+        help="Prompt template for --suite (default: the prompt a results file's run returned).",
+    )
+    parser.add_argument("--provider", default="Anthropic")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=16,
+        help="Prompts evaluated at once (default: 16).",
+    )
+    parser.add_argument("--output-dir", default="regression_results")
+    parser.add_argument(
+        "--requests-per-minute",
+        type=float,
+        help="Request rate limit per provider, shared by all prompts.",
+    )
+    add_output_arguments(parser, default="quiet")
+    args = parser.parse_args()
+    configure_output(args)
+
+    if args.suite:
+        payloads = [
+            {
+                "id": os.path.splitext(os.path.basename(args.suite))[0],
+                "suite": args.suite,
+                "prompt_file": args.prompt_file,
+                "provider": args.provider,
+            }
+        ]
+    elif args.manifest and os.path.exists(args.manifest):
+        payloads = read_manifest(args.manifest)
+    else:
+        print_error("Pass a manifest file or --suite.")
+        exit(1)
+    load_task_profiles()
+    try:
+        counts = asyncio.run(
+            run_regression(
+                payloads, args.concurrency, args.output_dir, args.requests_per_minute
+            )
+        )
+    finally:
+        close_log_sink()
+    if counts["failed"] or counts["invalid"]:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
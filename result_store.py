@@ -0,0 +1,165 @@
+import hashlib
+from typing import Dict, Iterator, Union
+
+from prompt_processing_utils import parse_xml_content
+
+
+class PromptVersions:
+    """Interns prompt templates so each version is stored once and referenced by ID."""
+
+    __slots__ = ("_templates",)
+
+    def __init__(self):
+        self._templates: Dict[str, str] = {}
+
+    @staticmethod
+    def prompt_id(prompt_template: str) -> str:
+        return hashlib.sha256(prompt_template.encode()).hexdigest()[:16]
+
+    def intern(self, prompt_template: str) -> str:
+        """
+        Stores a prompt template if it is new and returns its ID.
+
+        Args:
+            prompt_template (str): The prompt template.
+
+        Returns:
+            str: The ID of the prompt version.
+        """
+        prompt_id = self.prompt_id(prompt_template)
+        self._templates.setdefault(prompt_id, prompt_template)
+        return prompt_id
+
+    def get(self, prompt_id: str) -> str:
+        return self._templates[prompt_id]
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+
+class TestCaseResult:
+    """
+    The outcome of one test case against one prompt version.
+
+    Supports item access with the keys of the former test result dicts ("prompt", "input",
+    "response", "evaluation"). Parsed responses and evaluations are computed on demand
+    rather than stored.
+    """
+
+    __slots__ = (
+        "test_case",
+        "prompt_id",
+        "input",
+        "response",
+        "evaluation",
+        "_versions",
+    )
+
+    def __init__(
+        self,
+        test_case: Union[str, int],
+        prompt_id: str,
+        test_case_input: Union[Dict[str, str], str],
+        response: str,
+        evaluation: str,
+        versions: PromptVersions,
+    ):
+        self.test_case = test_case
+        self.prompt_id = prompt_id
+        self.input = test_case_input
+        self.response = response
+        self.evaluation = evaluation
+        self._versions = versions
+
+    @property
+    def prompt(self) -> str:
+        return self._versions.get(self.prompt_id)
+
+    @property
+    def parsed_response(self) -> Union[Dict[str, str], str]:
+        return parse_xml_content(self.response)
+
+    @property
+    def parsed_evaluation(self) -> Union[Dict[str, str], str]:
+        return parse_xml_content(
+            self.evaluation, ["EVALUATION_SCRATCHPAD", "EVALUATION_RESULT"]
+        )
+
+    def __getitem__(self, key: str) -> Union[str, Dict[str, str]]:
+        if key not in ("prompt", "input", "response", "evaluation"):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def to_dict(self) -> Dict[str, Union[str, Dict[str, str]]]:
+        """
+        Builds the entry written to the results file.
+
+        Returns:
+            Dict[str, Union[str, Dict[str, str]]]: The test case, its input, the prompt template, raw response, parsed response, and parsed evaluation.
+        """
+        return {
+            "test_case": self.test_case,
+            "input": self.input,
+            "prompt_template": self.prompt,
+            "raw_response": self.response,
+            "parsed_response": self.parsed_response,
+            "parsed_evaluation": self.parsed_evaluation,
+        }
+
+
+class ResultStore:
+    """Holds the results of every iteration, sharing one copy of each prompt version."""
+
+    __slots__ = ("versions", "_records")
+
+    def __init__(self):
+        self.versions = PromptVersions()
+        self._records = []
+
+    def add(
+        self,
+        test_case: Union[str, int],
+        prompt_template: str,
+        test_case_input: Union[Dict[str, str], str],
+        response: str,
+        evaluation: str,
+    ) -> TestCaseResult:
+        """
+        Records the result of a test case.
+
+        Args:
+            test_case (Union[str, int]): The test case identifier.
+            prompt_template (str): The prompt template used for the test case.
+            test_case_input (Union[Dict[str, str], str]): The input for the test case.
+            response (str): The response for the test case.
+            evaluation (str): The evaluation of the response.
+
+        Returns:
+            TestCaseResult: The stored record.
+        """
+        record = TestCaseResult(
+            test_case,
+            self.versions.intern(prompt_template),
+            test_case_input,
+            response,
+            evaluation,
+            self.versions,
+        )
+        self._records.append(record)
+        return record
+
+    def iter_dicts(self) -> Iterator[Dict[str, Union[str, Dict[str, str]]]]:
+        """
+        Yields the results file entries one at a time.
+
+        Yields:
+            Dict[str, Union[str, Dict[str, str]]]: The next results file entry.
+        """
+        for record in self._records:
+            yield record.to_dict()
+
+    def __iter__(self) -> Iterator[TestCaseResult]:
+        return iter(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
@@ -0,0 +1,415 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from result_store import PromptVersions
+
+DEFAULT_HISTORY_DB = "run_history.db"
+# Seconds a write waits for another process (a batch worker, the service, another CLI
+# run) to release the database before failing with "database is locked"
+BUSY_TIMEOUT = 30.0
+# Buffered rows at which a run writes early, so large dataset iterations stay bounded
+FLUSH_ROWS = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    goal_hash TEXT NOT NULL,
+    goal TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    iterations INTEGER NOT NULL DEFAULT 0,
+    final_prompt_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS prompt_versions (
+    prompt_hash TEXT PRIMARY KEY,
+    template TEXT NOT NULL,
+    first_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    iteration INTEGER NOT NULL,
+    prompt_hash TEXT NOT NULL REFERENCES prompt_versions(prompt_hash),
+    test_case TEXT NOT NULL,
+    input TEXT NOT NULL,
+    response TEXT NOT NULL,
+    evaluation TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS api_calls (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    iteration INTEGER NOT NULL,
+    provider TEXT,
+    task TEXT,
+    test_case TEXT,
+    model TEXT,
+    latency REAL NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    success INTEGER NOT NULL,
+    status_code INTEGER,
+    created_at REAL NOT NULL,
+    coalesced INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_runs_goal_hash ON runs(goal_hash, started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_started_at ON runs(started_at);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results(run_id, iteration);
+CREATE INDEX IF NOT EXISTS idx_results_prompt_hash ON results(prompt_hash);
+CREATE INDEX IF NOT EXISTS idx_results_test_case ON results(test_case);
+CREATE INDEX IF NOT EXISTS idx_results_created_at ON results(created_at);
+CREATE INDEX IF NOT EXISTS idx_api_calls_run ON api_calls(run_id, test_case);
+CREATE INDEX IF NOT EXISTS idx_api_calls_created_at ON api_calls(created_at);
+"""
+
+
+def goal_hash(goal: str) -> str:
+    return hashlib.sha256(goal.encode()).hexdigest()[:16]
+
+
+def connect(path: str = DEFAULT_HISTORY_DB) -> sqlite3.Connection:
+    """
+    Opens the history database, creating the schema if needed.
+
+    Args:
+        path (str): The SQLite database file.
+
+    Returns:
+        sqlite3.Connection: The open connection.
+    """
+    connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+    connection.execute(f"PRAGMA busy_timeout={int(BUSY_TIMEOUT * 1000)}")
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    # Databases created before coalesced requests were recorded lack the column
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(api_calls)")]
+    if "coalesced" not in columns:
+        try:
+            connection.execute(
+                "ALTER TABLE api_calls ADD COLUMN coalesced INTEGER NOT NULL DEFAULT 0"
+            )
+        except sqlite3.OperationalError as e:
+            # Another process (e.g. a batch worker) added it first
+            if "duplicate column" not in str(e):
+                raise
+    return connection
+
+
+class RunHistory:
+    """
+    Records one run (its prompt versions, test results and API calls) in the history database.
+
+    Rows are buffered in memory and written in one short transaction per iteration (or
+    every FLUSH_ROWS rows), so no write transaction is held open while the run awaits the
+    API and other processes sharing the database are not locked out.
+    """
+
+    def __init__(
+        self,
+        goal: str,
+        provider: str,
+        path: str = DEFAULT_HISTORY_DB,
+        connection: Optional[sqlite3.Connection] = None,
+    ):
+        # Runs in one process can share a connection, which then stays open after finish()
+        self.owns_connection = connection is None
+        self.connection = connection or connect(path)
+        self.iteration = 0
+        self.prompt_versions: List[Tuple[Any, ...]] = []
+        self.results: List[Tuple[Any, ...]] = []
+        self.api_calls: List[Tuple[Any, ...]] = []
+        with self.connection:
+            self.run_id = self.connection.execute(
+                "INSERT INTO runs (goal_hash, goal, provider, started_at) VALUES (?, ?, ?, ?)",
+                (goal_hash(goal), goal, provider, time.time()),
+            ).lastrowid
+
+    def flush(self) -> None:
+        """
+        Writes the buffered rows in one transaction.
+
+        Returns:
+            None
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO prompt_versions (prompt_hash, template, first_seen) "
+                "VALUES (?, ?, ?)",
+                self.prompt_versions,
+            )
+            self.connection.executemany(
+                "INSERT INTO results (run_id, iteration, prompt_hash, test_case, input, response, "
+                "evaluation, passed, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self.results,
+            )
+            self.connection.executemany(
+                "INSERT INTO api_calls (run_id, iteration, provider, task, test_case, model, "
+                "latency, input_tokens, output_tokens, success, status_code, created_at, "
+                "coalesced) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self.api_calls,
+            )
+        self.prompt_versions.clear()
+        self.results.clear()
+        self.api_calls.clear()
+
+    def _flush_if_full(self) -> None:
+        if len(self.results) + len(self.api_calls) >= FLUSH_ROWS:
+            self.flush()
+
+    def start_iteration(self) -> None:
+        """
+        Writes the previous iteration and begins a new one.
+
+        Returns:
+            None
+        """
+        self.flush()
+        self.iteration += 1
+
+    def record_prompt_version(self, prompt_template: str) -> None:
+        """
+        Records a prompt version if it has not been seen before.
+
+        Args:
+            prompt_template (str): The prompt template.
+
+        Returns:
+            None
+        """
+        self.prompt_versions.append(
+            (PromptVersions.prompt_id(prompt_template), prompt_template, time.time())
+        )
+
+    def record_result(
+        self,
+        test_case: Union[str, int],
+        prompt_template: str,
+        test_case_input: Union[Dict[str, str], str],
+        response: str,
+        evaluation: str,
+        failed: bool,
+    ) -> None:
+        """
+        Records an evaluated test case. Matches the PromptProcessor result listener signature.
+
+        Args:
+            test_case (Union[str, int]): The test case identifier.
+            prompt_template (str): The prompt template used for the test case.
+            test_case_input (Union[Dict[str, str], str]): The input for the test case.
+            response (str): The response for the test case.
+            evaluation (str): The evaluation of the response.
+            failed (bool): Whether the evaluation marked the test case as failed.
+
+        Returns:
+            None
+        """
+        self.results.append(
+            (
+                self.run_id,
+                self.iteration,
+                PromptVersions.prompt_id(prompt_template),
+                str(test_case),
+                json.dumps(test_case_input),
+                response,
+                evaluation,
+                int(not failed),
+                time.time(),
+            ),
+        )
+        self._flush_if_full()
+
+    def record_api_call(self, metrics: Dict[str, Any]) -> None:
+        """
+        Records an API call attempt. Matches the LLMBackend call listener signature.
+
+        Calls tagged with another run's ID (when several runs share a backend) are ignored.
+
+        Args:
+            metrics (Dict[str, Any]): The call metrics emitted by the backend.
+
+        Returns:
+            None
+        """
+        if metrics.get("run_id") not in (None, self.run_id):
+            return
+        self.api_calls.append(
+            (
+                self.run_id,
+                self.iteration,
+                metrics["provider"],
+                metrics["task"],
+                None if metrics["test_case"] is None else str(metrics["test_case"]),
+                metrics["model"],
+                metrics["latency"],
+                metrics["input_tokens"],
+                metrics["output_tokens"],
+                int(metrics["success"]),
+                metrics["status_code"],
+                time.time(),
+                int(metrics.get("coalesced", False)),
+            ),
+        )
+        self._flush_if_full()
+
+    def finish(self, final_prompt: Optional[str]) -> None:
+        """
+        Writes the last iteration, marks the run as finished and closes the database.
+
+        Args:
+            final_prompt (Optional[str]): The prompt the run ended with, if any.
+
+        Returns:
+            None
+        """
+        self.flush()
+        with self.connection:
+            self.connection.execute(
+                "UPDATE runs SET finished_at = ?, iterations = ?, final_prompt_hash = ? WHERE id = ?",
+                (
+                    time.time(),
+                    self.iteration,
+                    PromptVersions.prompt_id(final_prompt) if final_prompt else None,
+                    self.run_id,
+                ),
+            )
+        if self.owns_connection:
+            self.connection.close()
+
+
+def _print_rows(cursor: sqlite3.Cursor) -> None:
+    columns = [description[0] for description in cursor.description]
+    rows = [
+        [
+            (
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(value))
+                if column.endswith("_at") and value
+                else value
+            )
+            for column, value in zip(columns, row)
+        ]
+        for row in cursor
+    ]
+    widths = [
+        max([len(column)] + [len(str(row[i])) for row in rows])
+        for i, column in enumerate(columns)
+    ]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(value).ljust(width) for value, width in zip(row, widths)))
+
+
+def query_trends(
+    connection: sqlite3.Connection, goal: Optional[str], limit: int
+) -> sqlite3.Cursor:
+    """
+    Pass rate of each run's first and last iteration, most recent runs first.
+
+    Args:
+        connection (sqlite3.Connection): The history database.
+        goal (Optional[str]): Restrict to runs with this exact goal (matched by hash).
+        limit (int): The maximum number of runs.
+
+    Returns:
+        sqlite3.Cursor: The result rows.
+    """
+    where, params = "", []
+    if goal:
+        where, params = "WHERE r.goal_hash = ?", [goal_hash(goal)]
+    return connection.execute(
+        f"""
+        WITH per_iteration AS (
+            SELECT run_id, iteration, AVG(passed) AS pass_rate, COUNT(*) AS cases
+            FROM results GROUP BY run_id, iteration
+        )
+        SELECT r.id AS run, r.started_at, r.goal_hash, r.provider, r.iterations,
+               ROUND(first.pass_rate, 2) AS first_pass_rate,
+               ROUND(last.pass_rate, 2) AS final_pass_rate, last.cases
+        FROM runs r
+        LEFT JOIN per_iteration first ON first.run_id = r.id AND first.iteration = 1
+        LEFT JOIN per_iteration last ON last.run_id = r.id
+            AND last.iteration = (SELECT MAX(iteration) FROM per_iteration WHERE run_id = r.id)
+        {where}
+        ORDER BY r.started_at DESC LIMIT ?
+        """,
+        params + [limit],
+    )
+
+
+def query_cases(
+    connection: sqlite3.Connection,
+    order_by: str,
+    since_days: Optional[float],
+    limit: int,
+) -> sqlite3.Cursor:
+    """
+    Test cases ranked by total API latency or tokens across their calls.
+
+    Args:
+        connection (sqlite3.Connection): The history database.
+        order_by (str): "latency" or "tokens".
+        since_days (Optional[float]): Only consider calls from the last N days.
+        limit (int): The maximum number of test cases.
+
+    Returns:
+        sqlite3.Cursor: The result rows.
+    """
+    where, params = "WHERE c.test_case IS NOT NULL", []
+    if since_days:
+        where += " AND c.created_at >= ?"
+        params.append(time.time() - since_days * 86400)
+    order = "total_latency" if order_by == "latency" else "total_tokens"
+    return connection.execute(
+        f"""
+        SELECT c.run_id AS run, c.iteration, c.test_case, r.goal_hash,
+               SUM(1 - c.coalesced) AS calls, ROUND(SUM(c.latency), 2) AS total_latency,
+               SUM(c.input_tokens) AS input_tokens, SUM(c.output_tokens) AS output_tokens,
+               SUM(c.input_tokens + c.output_tokens) AS total_tokens
+        FROM api_calls c JOIN runs r ON r.id = c.run_id
+        {where}
+        GROUP BY c.run_id, c.iteration, c.test_case
+        ORDER BY {order} DESC LIMIT ?
+        """,
+        params + [limit],
+    )
+
+
+def main() -> None:
+    """
+    Command-line queries over the run history database.
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Query prompt generation run history.")
+    parser.add_argument("--db", default=DEFAULT_HISTORY_DB, help="History database.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    trends = subparsers.add_parser("trends", help="Pass-rate trend per run.")
+    trends.add_argument("--goal", help="Only runs with this exact goal.")
+    trends.add_argument("--limit", type=int, default=20)
+    for name, help_text in (
+        ("slowest", "Test cases with the highest total API latency."),
+        ("expensive", "Test cases with the most tokens."),
+    ):
+        cases = subparsers.add_parser(name, help=help_text)
+        cases.add_argument("--days", type=float, help="Only the last N days.")
+        cases.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    connection = connect(args.db)
+    if args.command == "trends":
+        _print_rows(query_trends(connection, args.goal, args.limit))
+    else:
+        order_by = "latency" if args.command == "slowest" else "tokens"
+        _print_rows(query_cases(connection, order_by, args.days, args.limit))
+    connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,586 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from api_communication import (
+    BACKEND_REGISTRY,
+    LLMBackend,
+    current_run_id,
+    get_api_client,
+)
+from async_utils import LoopLagMonitor
+from config import load_configuration
+from key_pool import load_key_pool, with_key_pool
+from model_selector import load_task_profiles
+from prompt_generator import run_iterations
+from prompt_processing import PromptProcessor
+from rate_limiter import RateLimiter
+from run_history import DEFAULT_HISTORY_DB, RunHistory, connect
+from user_input import GOAL_PREFIX, MAX_TEST_CASES
+from utils import (
+    QUIET,
+    add_output_arguments,
+    close_log_sink,
+    configure_output,
+    print_error,
+    print_info,
+    print_success,
+)
+
+MAX_BODY_BYTES = 1 << 20
+JOB_ID_PATTERN = re.compile(r"[\w-]{1,64}", re.ASCII)
+STATUS_TEXT = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    503: "Service Unavailable",
+}
+
+
+class Job:
+    """A prompt generation request and the progress events it has produced."""
+
+    def __init__(
+        self,
+        goal: str,
+        num_test_cases: int,
+        provider: str,
+        job_id: Optional[str] = None,
+    ):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.goal = goal
+        self.num_test_cases = num_test_cases
+        self.provider = provider
+        self.status = "queued"
+        self.final_prompt: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.events: List[Dict[str, Any]] = []
+        self._subscribers: List[asyncio.Queue] = []
+
+    def add_event(self, event: Dict[str, Any]) -> None:
+        """
+        Records a progress event and forwards it to every open event stream.
+
+        Args:
+            event (Dict[str, Any]): The event.
+
+        Returns:
+            None
+        """
+        event = {**event, "job_id": self.id, "time": round(time.time(), 3)}
+        self.events.append(event)
+        for subscriber in self._subscribers:
+            subscriber.put_nowait(event)
+
+    def subscribe(self) -> asyncio.Queue:
+        subscriber = asyncio.Queue()
+        self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: asyncio.Queue) -> None:
+        self._subscribers.remove(subscriber)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "goal": self.goal,
+            "num_test_cases": self.num_test_cases,
+            "provider": self.provider,
+            "status": self.status,
+            "final_prompt": self.final_prompt,
+            "error": self.error,
+            "created_at": self.created_at,
+            "events": len(self.events),
+        }
+
+
+class PromptGenerationService:
+    """
+    Runs prompt generation jobs on a bounded pool of workers.
+
+    Jobs for the same provider share one backend (and so its connection pool and response
+    cache), one set of task concurrency caps and, if set, one request rate limit. Finished
+    jobs are kept for `finished_job_ttl` seconds, and at most `max_finished_jobs` of them;
+    their results stay in `results_dir`.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_queued_jobs: int = 1000,
+        results_dir: str = "service_results",
+        history_db: Optional[str] = DEFAULT_HISTORY_DB,
+        requests_per_minute: Optional[float] = None,
+        rate_limiters: Optional[Dict[str, Any]] = None,
+        key_pool_file: Optional[str] = None,
+        max_finished_jobs: int = 1000,
+        finished_job_ttl: Optional[float] = 3600.0,
+    ):
+        self.workers = workers
+        self.max_finished_jobs = max_finished_jobs
+        self.finished_job_ttl = finished_job_ttl
+        self.key_pool = load_key_pool(key_pool_file)
+        self.requests_per_minute = requests_per_minute
+        # Per-provider limiters shared with other processes, used instead of
+        # requests_per_minute
+        self.rate_limiters = rate_limiters or {}
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued_jobs)
+        self.jobs: Dict[str, Job] = {}
+        self.backends: Dict[str, LLMBackend] = {}
+        self.task_semaphores: Dict[str, Dict[str, asyncio.Semaphore]] = {}
+        self.results_dir = results_dir
+        self.history_connection = connect(history_db) if history_db else None
+        self._worker_tasks: List[asyncio.Task] = []
+        self.lag_monitor = LoopLagMonitor()
+
+    def get_backend(self, provider: str) -> LLMBackend:
+        """
+        Returns the shared backend for a provider, creating it on first use.
+
+        Args:
+            provider (str): The name of the LLM provider.
+
+        Returns:
+            LLMBackend: The shared backend.
+
+        Raises:
+            ValueError: If the provider is not configured.
+        """
+        if provider not in self.backends:
+            try:
+                config = load_configuration(provider)
+            except SystemExit:
+                raise ValueError(f"Provider {provider} is not configured.")
+            backend = with_key_pool(get_api_client(provider, config), self.key_pool)
+            if provider in self.rate_limiters:
+                backend.rate_limiter = self.rate_limiters[provider]
+            elif self.requests_per_minute:
+                backend.rate_limiter = RateLimiter(self.requests_per_minute)
+            self.backends[provider] = backend
+        return self.backends[provider]
+
+    def submit(self, payload: Dict[str, Any]) -> Job:
+        """
+        Validates a job request and queues it.
+
+        Args:
+            payload (Dict[str, Any]): The request body with "goal", and optionally
+                "num_test_cases" (default 3), "provider" (default "Anthropic") and "id"
+                (default: a random ID), which also names the results file.
+
+        Returns:
+            Job: The queued job.
+
+        Raises:
+            ValueError: If the request is invalid.
+            asyncio.QueueFull: If too many jobs are already queued.
+        """
+        goal = payload.get("goal")
+        if not isinstance(goal, str) or not goal.strip():
+            raise ValueError("'goal' must be a non-empty string.")
+        num_test_cases = payload.get("num_test_cases", 3)
+        if not isinstance(num_test_cases, int) or not (
+            0 <= num_test_cases <= MAX_TEST_CASES
+        ):
+            raise ValueError(
+                f"'num_test_cases' must be an integer between 0 and {MAX_TEST_CASES}."
+            )
+        provider = payload.get("provider", "Anthropic")
+        if provider not in BACKEND_REGISTRY:
+            raise ValueError(
+                f"'provider' must be one of {', '.join(BACKEND_REGISTRY)}."
+            )
+        job_id = payload.get("id")
+        if job_id is not None and (
+            not isinstance(job_id, str) or not JOB_ID_PATTERN.fullmatch(job_id)
+        ):
+            raise ValueError("'id' must be 1-64 letters, digits, '-' or '_'.")
+        self.evict_finished_jobs()
+        if job_id in self.jobs:
+            raise ValueError(f"Job {job_id} already exists.")
+        if not goal.startswith(GOAL_PREFIX):
+            goal = GOAL_PREFIX + goal
+        job = Job(goal, num_test_cases, provider, job_id)
+        self.queue.put_nowait(job)
+        self.jobs[job.id] = job
+        job.add_event({"event": "queued"})
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                await self.run_job(job)
+            except Exception as e:
+                # The worker must survive, and the job must finish so queue.join() returns
+                if not job.done:
+                    job.status, job.error = "failed", f"{type(e).__name__}: {e}"
+                    job.add_event({"event": "failed", "error": job.error})
+                    job.finished_at = time.time()
+                print_error(f"Job {job.id} failed: {type(e).__name__}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def run_job(self, job: Job) -> None:
+        """
+        Runs the full generate/evaluate loop for a job.
+
+        Args:
+            job (Job): The job to run.
+
+        Returns:
+            None
+        """
+        job.status = "running"
+        job.add_event({"event": "started"})
+        try:
+            backend = self.get_backend(job.provider)
+        except ValueError as e:
+            job.status, job.error = "failed", str(e)
+            job.add_event({"event": "failed", "error": job.error})
+            job.finished_at = time.time()
+            return
+
+        processor = PromptProcessor(
+            backend, job.provider, self.task_semaphores.setdefault(job.provider, {})
+        )
+        processor.result_listeners.append(
+            lambda test_case, prompt, test_input, response, evaluation, failed: job.add_event(
+                {
+                    "event": "test_case_result",
+                    "test_case": test_case,
+                    "passed": not failed,
+                }
+            )
+        )
+        history = None
+        token = current_run_id.set(None)
+        try:
+            if self.history_connection is not None:
+                history = RunHistory(
+                    job.goal, job.provider, connection=self.history_connection
+                )
+                processor.result_listeners.append(history.record_result)
+                backend.call_listeners.append(history.record_api_call)
+                # Tags this job's API calls so the shared backend's listeners can tell jobs apart
+                current_run_id.set(history.run_id)
+            try:
+                job.final_prompt = await run_iterations(
+                    processor,
+                    job.goal,
+                    job.num_test_cases,
+                    history=history,
+                    results_path=os.path.join(self.results_dir, f"{job.id}.json"),
+                    on_event=job.add_event,
+                )
+            finally:
+                if history:
+                    backend.call_listeners.remove(history.record_api_call)
+                    history.finish(job.final_prompt)
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            current_run_id.reset(token)
+        if job.final_prompt is None or job.error is not None:
+            job.status = "failed"
+            job.error = job.error or "Prompt generation or evaluation failed."
+            job.add_event({"event": "failed", "error": job.error})
+        else:
+            job.status = "completed"
+            job.add_event({"event": "completed", "prompt": job.final_prompt})
+        job.finished_at = time.time()
+        self.evict_finished_jobs()
+        finished = sum(job.done for job in self.jobs.values())
+        print_info(
+            f"*** Job {job.id} {job.status} ({finished}/{len(self.jobs)} jobs done). ***",
+            level=QUIET,
+        )
+
+    def evict_finished_jobs(self) -> None:
+        """
+        Forgets finished jobs older than the TTL, then the oldest ones over the limit.
+
+        Returns:
+            None
+        """
+        finished = sorted(
+            (job for job in self.jobs.values() if job.finished_at is not None),
+            key=lambda job: job.finished_at,
+        )
+        excess = len(finished) - self.max_finished_jobs
+        now = time.time()
+        for job in finished:
+            expired = (
+                self.finished_job_ttl is not None
+                and now - job.finished_at > self.finished_job_ttl
+            )
+            if excess <= 0 and not expired:
+                break
+            del self.jobs[job.id]
+            excess -= 1
+
+    async def _read_request(
+        self, reader: asyncio.StreamReader
+    ) -> Tuple[str, str, Dict[str, str], bytes]:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        method, path, _ = request_line.split(" ", 2)
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY_BYTES:
+            raise OverflowError
+        body = await reader.readexactly(length) if length else b""
+        return method, path, headers, body
+
+    @staticmethod
+    async def _send_json(
+        writer: asyncio.StreamWriter, status: int, payload: Any
+    ) -> None:
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+    async def _stream_events(self, writer: asyncio.StreamWriter, job: Job) -> None:
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+            b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n"
+        )
+        subscriber = job.subscribe()
+        try:
+            # Replay what already happened, then follow live events until the job ends
+            pending = list(job.events)
+            while True:
+                for event in pending:
+                    line = (json.dumps(event) + "\n").encode()
+                    writer.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+                await writer.drain()
+                if job.done and subscriber.empty():
+                    break
+                pending = [await subscriber.get()]
+                while not subscriber.empty():
+                    pending.append(subscriber.get_nowait())
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            job.unsubscribe(subscriber)
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Serves one HTTP request.
+
+        Routes:
+            POST /jobs              Queue a job; returns its ID.
+            GET  /jobs              List jobs.
+            GET  /jobs/<id>         Job status and final prompt.
+            GET  /jobs/<id>/events  Stream the job's progress events as NDJSON.
+            GET  /health            Queue and worker status.
+
+        Args:
+            reader (asyncio.StreamReader): The client request stream.
+            writer (asyncio.StreamWriter): The client response stream.
+
+        Returns:
+            None
+        """
+        try:
+            try:
+                method, path, _, body = await self._read_request(reader)
+            except OverflowError:
+                await self._send_json(writer, 413, {"error": "Request body too large."})
+                return
+            except (ValueError, asyncio.IncompleteReadError):
+                await self._send_json(writer, 400, {"error": "Malformed request."})
+                return
+            parts = [part for part in path.split("?")[0].split("/") if part]
+
+            if parts == ["health"] and method == "GET":
+                await self._send_json(
+                    writer,
+                    200,
+                    {
+                        "queued": self.queue.qsize(),
+                        "running": sum(
+                            job.status == "running" for job in self.jobs.values()
+                        ),
+                        "workers": self.workers,
+                        "loop_lag": self.lag_monitor.report(),
+                        "usage": {
+                            provider: backend.get_usage()
+                            for provider, backend in self.backends.items()
+                        },
+                    },
+                )
+            elif parts == ["jobs"] and method == "POST":
+                try:
+                    job = self.submit(json.loads(body or b"{}"))
+                except (ValueError, AttributeError) as e:
+                    await self._send_json(writer, 400, {"error": str(e)})
+                    return
+                except asyncio.QueueFull:
+                    await self._send_json(writer, 503, {"error": "Job queue is full."})
+                    return
+                await self._send_json(writer, 202, job.to_dict())
+            elif parts == ["jobs"] and method == "GET":
+                await self._send_json(
+                    writer, 200, [job.to_dict() for job in self.jobs.values()]
+                )
+            elif len(parts) in (2, 3) and parts[0] == "jobs" and method == "GET":
+                job = self.jobs.get(parts[1])
+                if job is None:
+                    await self._send_json(writer, 404, {"error": "Unknown job."})
+                elif len(parts) == 2:
+                    await self._send_json(writer, 200, job.to_dict())
+                elif parts[2] == "events":
+                    await self._stream_events(writer, job)
+                else:
+                    await self._send_json(writer, 404, {"error": "Not found."})
+            elif parts and parts[0] in ("jobs", "health"):
+                await self._send_json(writer, 405, {"error": "Method not allowed."})
+            else:
+                await self._send_json(writer, 404, {"error": "Not found."})
+        except ConnectionError:
+            pass  # Client went away
+        finally:
+            writer.close()
+
+    def start(self) -> None:
+        """
+        Starts the workers. Must be called from a running event loop.
+
+        Returns:
+            None
+        """
+        os.makedirs(self.results_dir, exist_ok=True)
+        self.lag_monitor.start()
+        self._worker_tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+
+    async def serve(self, host: str, port: int) -> None:
+        """
+        Starts the workers and serves the HTTP API until cancelled.
+
+        Args:
+            host (str): The interface to listen on.
+            port (int): The port to listen on.
+
+        Returns:
+            None
+        """
+        self.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print_success(
+            f"*** Prompt generation service listening on http://{host}:{port} with {self.workers} workers ***",
+            level=QUIET,
+        )
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """
+        Stops the workers and closes the shared backends and history database.
+
+        Returns:
+            None
+        """
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        await self.lag_monitor.stop()
+        for backend in self.backends.values():
+            await backend.close()
+        if self.history_connection is not None:
+            self.history_connection.close()
+            self.history_connection = None
+
+
+def main() -> None:
+    """
+    Runs the prompt generation service.
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Prompt generation service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=4, help="Jobs run concurrently.")
+    parser.add_argument("--max-queued-jobs", type=int, default=1000)
+    parser.add_argument("--results-dir", default="service_results")
+    parser.add_argument("--history-db", default=DEFAULT_HISTORY_DB)
+    parser.add_argument("--no-history", action="store_true")
+    parser.add_argument(
+        "--requests-per-minute",
+        type=float,
+        help="Request rate limit per provider, shared by all jobs.",
+    )
+    parser.add_argument(
+        "--max-finished-jobs",
+        type=int,
+        default=1000,
+        help="Finished jobs kept in memory; the oldest are forgotten first.",
+    )
+    parser.add_argument(
+        "--finished-job-ttl",
+        type=float,
+        default=3600.0,
+        help="Seconds a finished job is kept in memory.",
+    )
+    parser.add_argument(
+        "--key-pool",
+        help="JSON file of additional API keys to spread requests over "
+        "(default: $KEY_POOL_FILE or key_pool.json, if present).",
+    )
+    add_output_arguments(parser, default="normal")
+    args = parser.parse_args()
+    configure_output(args)
+
+    load_task_profiles()
+    service = PromptGenerationService(
+        workers=args.workers,
+        max_queued_jobs=args.max_queued_jobs,
+        results_dir=args.results_dir,
+        history_db=None if args.no_history else args.history_db,
+        requests_per_minute=args.requests_per_minute,
+        key_pool_file=args.key_pool,
+        max_finished_jobs=args.max_finished_jobs,
+        finished_job_ttl=args.finished_job_ttl,
+    )
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print_info("\n*** Service stopped. ***", level=QUIET)
+    finally:
+        close_log_sink()
+
+
+if __name__ == "__main__":
+    main()
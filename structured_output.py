@@ -0,0 +1,145 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from assertions import schema_errors
+
+# Each schema names a structured output and describes its fields as JSON Schema. Field
+# names are the lower-case XML tags the text prompts ask for, so the prompts need only a
+# short note to switch formats, and reasoning fields come before the answer fields.
+GENERATED_PROMPT_SCHEMA = {
+    "name": "record_generated_prompt",
+    "description": "Records the generated prompt.",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "prompt_generation_scratchpad": {"type": "string"},
+            "lessons_learned": {"type": "string"},
+            "generated_prompt": {"type": "string"},
+            "reflection": {"type": "string"},
+        },
+        "required": ["prompt_generation_scratchpad", "generated_prompt"],
+    },
+}
+EVALUATION_SCHEMA = {
+    "name": "record_evaluation",
+    "description": "Records the evaluation of the response.",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "evaluation_scratchpad": {"type": "string"},
+            "evaluation_result": {"type": "string", "enum": ["PASS", "FAIL"]},
+        },
+        "required": ["evaluation_scratchpad", "evaluation_result"],
+    },
+}
+
+
+def test_case_schema(var_names: List[str], assertions: bool = False) -> Dict[str, Any]:
+    """
+    Builds the structured output schema for test case generation.
+
+    Args:
+        var_names (List[str]): The prompt's placeholders, e.g. ["{TEXT}"]; each test case
+            must give a string for every one of them.
+        assertions (bool): Whether to include the deterministic checks field.
+
+    Returns:
+        Dict[str, Any]: The schema.
+    """
+    names = list(dict.fromkeys(name.strip("{}") for name in var_names))
+    properties = {
+        "prompt_analysis": {"type": "string"},
+        "test_cases": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {name: {"type": "string"} for name in names},
+                "required": names,
+                "additionalProperties": False,
+            },
+        },
+        "rationale": {"type": "string"},
+    }
+    if assertions:
+        properties["assertions"] = {"type": "array", "items": {"type": "object"}}
+    return {
+        "name": "record_test_cases",
+        "description": "Records the generated test cases.",
+        "parameters": {
+            "type": "object",
+            "properties": properties,
+            "required": ["prompt_analysis", "test_cases"],
+        },
+    }
+
+
+def structured_output_instructions(schema: Dict[str, Any]) -> str:
+    """
+    Writes the note appended to a prompt when its answer is requested as structured output.
+
+    Args:
+        schema (Dict[str, Any]): The output schema.
+
+    Returns:
+        str: The prompt section.
+    """
+    field = next(iter(schema["parameters"]["properties"]))
+    return f"""
+# OUTPUT FORMAT #
+Return your answer as the structured {schema["name"]} output instead of XML tags. Write what the instructions above ask you to put in each XML tag into the field with the same name in lower case, e.g. the content of <{field.upper()}> into "{field}".
+"""
+
+
+def parse_structured_output(
+    response: str, schema: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """
+    Decodes a structured output response and validates it against its schema.
+
+    Args:
+        response (str): The response, as the JSON returned by `send_request_to_model`.
+        schema (Dict[str, Any]): The output schema.
+
+    Returns:
+        Optional[Dict[str, Any]]: The output, or None if it is not valid.
+    """
+    try:
+        output = json.loads(response)
+    except json.JSONDecodeError:
+        return None
+    if schema_errors(output, schema["parameters"]):
+        return None
+    return output
+
+
+def to_test_cases(output: Dict[str, Any]) -> Dict[str, Dict[str, str]]:
+    """
+    Converts structured test cases to the format returned by `extract_test_cases`.
+
+    Args:
+        output (Dict[str, Any]): The validated test case generation output.
+
+    Returns:
+        Dict[str, Dict[str, str]]: The test cases, keyed TEST_CASE_1, TEST_CASE_2, ...
+    """
+    return {
+        f"TEST_CASE_{number}": test_case
+        for number, test_case in enumerate(output["test_cases"], start=1)
+    }
+
+
+def to_evaluation(output: Dict[str, Any]) -> str:
+    """
+    Converts a structured evaluation to the tagged text the evaluation parsers read.
+
+    Args:
+        output (Dict[str, Any]): The validated evaluation output.
+
+    Returns:
+        str: The evaluation.
+    """
+    return (
+        f"<EVALUATION_SCRATCHPAD>\n{output['evaluation_scratchpad'].strip()}\n"
+        "</EVALUATION_SCRATCHPAD>\n"
+        f"<EVALUATION_RESULT>{output['evaluation_result']}</EVALUATION_RESULT>"
+    )
@@ -0,0 +1,173 @@
+import re
+import zlib
+from typing import Dict, List, Set, Tuple
+
+# MinHash parameters: NUM_BINS = BANDS * ROWS_PER_BAND. With 16 bands of 4 rows,
+# pairs above ~0.6 Jaccard similarity almost always share a bucket.
+NUM_BINS = 64
+BANDS = 16
+ROWS_PER_BAND = 4
+SHINGLE_SIZE = 3  # Words per shingle
+_BIN_BITS = 6  # log2(NUM_BINS)
+_VALUE_MASK = (1 << (32 - _BIN_BITS)) - 1
+
+
+def shingle(text: str) -> Set[int]:
+    """
+    Breaks a variable value into hashed word shingles.
+
+    Args:
+        text (str): The value of one test case variable.
+
+    Returns:
+        Set[int]: The hashed shingles of the normalized text. CRC32 is used rather than
+            the salted built-in hash so signatures are the same in every process.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {zlib.crc32(" ".join(words).encode())}
+    return {
+        zlib.crc32(" ".join(words[i : i + SHINGLE_SIZE]).encode())
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash_signature(shingles: Set[int]) -> List[int]:
+    """
+    Computes a one-permutation MinHash signature of a set of shingles.
+
+    Each shingle hash is assigned to one of NUM_BINS bins and the minimum per bin is kept,
+    so the signature takes a single pass instead of one pass per hash function. Empty bins
+    borrow the value of the next non-empty bin so short inputs still compare fairly.
+
+    Args:
+        shingles (Set[int]): The hashed shingles.
+
+    Returns:
+        List[int]: One minimum hash per bin.
+    """
+    empty = _VALUE_MASK + 1
+    signature = [empty] * NUM_BINS
+    for shingle_hash in shingles:
+        mixed = (shingle_hash * 0x9E3779B1) & 0xFFFFFFFF
+        bin_index, value = mixed >> (32 - _BIN_BITS), mixed & _VALUE_MASK
+        if value < signature[bin_index]:
+            signature[bin_index] = value
+    if all(value == empty for value in signature):
+        return signature
+    densified = list(signature)
+    for i in range(NUM_BINS):
+        offset = 1
+        while densified[i] == empty:
+            donor = signature[(i + offset) % NUM_BINS]
+            if donor != empty:
+                # The offset keeps borrowed values distinct from genuine ones
+                densified[i] = donor + offset * (_VALUE_MASK + 2)
+            offset += 1
+    return densified
+
+
+def estimate_similarity(signature_a: List[int], signature_b: List[int]) -> float:
+    """
+    Estimates the Jaccard similarity of two inputs from their MinHash signatures.
+
+    Args:
+        signature_a (List[int]): The first signature.
+        signature_b (List[int]): The second signature.
+
+    Returns:
+        float: The estimated similarity, between 0 and 1.
+    """
+    matches = sum(a == b for a, b in zip(signature_a, signature_b))
+    return matches / NUM_BINS
+
+
+def _is_near_duplicate(
+    signatures_a: Dict[str, List[int]],
+    signatures_b: Dict[str, List[int]],
+    threshold: float,
+) -> bool:
+    """
+    Checks whether every variable of one test case is a near-duplicate of the other's.
+
+    Args:
+        signatures_a (Dict[str, List[int]]): The signature of each variable of the first test case.
+        signatures_b (Dict[str, List[int]]): The signature of each variable of the second test case.
+        threshold (float): The estimated Jaccard similarity at or above which two values count as duplicates.
+
+    Returns:
+        bool: True if both test cases have the same variables and all of them are near-duplicates.
+    """
+    return signatures_a.keys() == signatures_b.keys() and all(
+        estimate_similarity(signature, signatures_b[variable]) >= threshold
+        for variable, signature in signatures_a.items()
+    )
+
+
+def find_near_duplicates(
+    test_cases: Dict[str, Dict[str, str]], threshold: float
+) -> Dict[str, str]:
+    """
+    Finds test cases whose inputs are near-duplicates of an earlier test case.
+
+    Each variable is compared separately and a test case only counts as a duplicate when
+    every variable is a near-duplicate, so cases that share a long document but ask
+    different short questions are all kept. Candidate pairs are found with
+    locality-sensitive hashing over signature bands, so large suites are not compared
+    pairwise.
+
+    Args:
+        test_cases (Dict[str, Dict[str, str]]): The test cases keyed by name.
+        threshold (float): The estimated Jaccard similarity at or above which two values count as duplicates.
+
+    Returns:
+        Dict[str, str]: Each duplicate test case mapped to the earlier test case it duplicates.
+    """
+    buckets: Dict[Tuple[str, int, Tuple[int, ...]], List[str]] = {}
+    signatures: Dict[str, Dict[str, List[int]]] = {}
+    order: Dict[str, int] = {}
+    duplicates: Dict[str, str] = {}
+    for name, test_case_input in test_cases.items():
+        if not isinstance(test_case_input, dict) or not test_case_input:
+            continue
+        case_signatures = {
+            variable: minhash_signature(shingle(str(value)))
+            for variable, value in test_case_input.items()
+        }
+        band_keys = [
+            (
+                variable,
+                band,
+                tuple(signature[band * ROWS_PER_BAND : (band + 1) * ROWS_PER_BAND]),
+            )
+            for variable, signature in case_signatures.items()
+            for band in range(BANDS)
+        ]
+        # A duplicate must share a band with this case in every variable
+        candidates = set.intersection(
+            *(
+                {
+                    kept
+                    for key in band_keys
+                    if key[0] == variable
+                    for kept in buckets.get(key, [])
+                }
+                for variable in case_signatures
+            )
+        )
+        match = next(
+            (
+                kept
+                for kept in sorted(candidates, key=order.get)
+                if _is_near_duplicate(case_signatures, signatures[kept], threshold)
+            ),
+            None,
+        )
+        if match is not None:
+            duplicates[name] = match
+            continue
+        signatures[name] = case_signatures
+        order[name] = len(order)
+        for key in band_keys:
+            buckets.setdefault(key, []).append(name)
+    return duplicates
@@ -0,0 +1,44 @@
+import asyncio
+import sqlite3
+
+from api_communication import LLMBackend
+
+
+class EchoBackend(LLMBackend):
+    """Answers every prompt with a fixed response and counts the calls made."""
+
+    provider_name = "Local"
+
+    def __init__(self):
+        super().__init__("test-key")
+        self.calls = 0
+
+    def get_client(self):
+        return None
+
+    async def _complete(self, prompt, model, max_tokens, temperature, stop, timeout):
+        self.calls += 1
+        return "<ANSWER>42</ANSWER>", 3, 2
+
+    async def _stream(self, prompt, model, max_tokens, temperature, stop, timeout):
+        self.calls += 1
+        self._record_usage(3, 2)
+        for chunk in ("<ANSWER>", "42", "</ANSWER>"):
+            yield chunk
+
+
+def test_failing_call_listener_does_not_fail_the_request():
+    backend = EchoBackend()
+    recorded = []
+
+    def locked_listener(metrics):
+        raise sqlite3.OperationalError("database is locked")
+
+    backend.call_listeners.extend([locked_listener, recorded.append])
+
+    response = asyncio.run(backend.send_request_to_model("Question?", "local-model"))
+
+    assert response == "<ANSWER>42</ANSWER>"
+    assert backend.calls == 1
+    assert backend.usage["errors"] == 0
+    assert [metrics["success"] for metrics in recorded] == [True]
@@ -0,0 +1,128 @@
+import json
+
+from assertions import check_response, failure_evaluation, parse_assertions
+from prompt_processing_utils import extract_evaluation_feedback
+
+
+def assertions_response(assertions):
+    return f"<TEST_CASE_1>...</TEST_CASE_1>\n<ASSERTIONS>{json.dumps(assertions)}</ASSERTIONS>"
+
+
+def test_parse_assertions_compiles_patterns():
+    assertions = parse_assertions(
+        assertions_response(
+            [{"type": "regex", "pattern": r"^\d+$", "tag": "ANSWER"}, {"type": "json"}]
+        )
+    )
+
+    assert [assertion["type"] for assertion in assertions] == ["regex", "json"]
+    assert assertions[0]["compiled"].search("42")
+
+
+def test_parse_assertions_drops_malformed_assertions():
+    assertions = parse_assertions(
+        assertions_response(
+            [
+                {"type": "regex", "pattern": "("},
+                {"type": "regex"},
+                {"type": "contains", "text": "x"},
+                "max_length",
+                {"type": "max_length", "chars": 100},
+            ]
+        )
+    )
+
+    assert assertions == [{"type": "max_length", "chars": 100}]
+
+
+def test_parse_assertions_without_assertions():
+    assert parse_assertions("<TEST_CASE_1>...</TEST_CASE_1>") == []
+    assert parse_assertions("<ASSERTIONS>[not json</ASSERTIONS>") == []
+    assert parse_assertions('<ASSERTIONS>{"type": "json"}</ASSERTIONS>') == []
+
+
+def check(response, *assertions):
+    return check_response(response, parse_assertions(assertions_response(assertions)))
+
+
+def test_regex_and_not_regex():
+    assert check("Call 555-0100", {"type": "regex", "pattern": r"\d{3}-\d{4}"}) == []
+    assert check("Call us", {"type": "regex", "pattern": r"\d{3}-\d{4}"}) == [
+        r"The response does not match /\d{3}-\d{4}/."
+    ]
+    assert check("Call 555-0100", {"type": "not_regex", "pattern": r"\d{3}-\d{4}"}) == [
+        "The response contains '555-0100', which matches /\\d{3}-\\d{4}/ and is not "
+        "allowed."
+    ]
+
+
+def test_checks_can_target_a_tag():
+    assertion = {"type": "max_length", "chars": 5, "tag": "ANSWER"}
+
+    assert (
+        check("<REASONING>long reasoning</REASONING><ANSWER>yes</ANSWER>", assertion)
+        == []
+    )
+    assert check("<answer> yes </answer>", assertion) == []
+    assert check("yes", assertion) == ["The response has no <ANSWER> tags."]
+
+
+def test_json_with_schema():
+    assertion = {
+        "type": "json",
+        "schema": {
+            "type": "object",
+            "required": ["label"],
+            "properties": {"label": {"enum": ["spam", "ham"]}},
+        },
+    }
+
+    assert check('{"label": "spam"}', assertion) == []
+    assert check('{"label": "other"}', assertion) == [
+        "The JSON does not match the schema: $.label is not one of ['spam', 'ham']."
+    ]
+    assert check("{}", assertion) == [
+        "The JSON does not match the schema: $ is missing required key 'label'."
+    ]
+    assert check("label: spam", assertion)[0].startswith(
+        "The response is not valid JSON"
+    )
+
+
+def test_required_tags():
+    assertion = {"type": "required_tags", "tags": ["SUMMARY", "KEYWORDS"]}
+
+    assert check("<SUMMARY>a</SUMMARY><keywords>b</keywords>", assertion) == []
+    assert check("<SUMMARY>a</SUMMARY>", assertion) == [
+        "The response is missing <KEYWORDS></KEYWORDS> tags."
+    ]
+
+
+def test_length_limits():
+    assert check("x" * 10, {"type": "max_length", "chars": 10}) == []
+    assert check("x" * 11, {"type": "max_length", "chars": 10}) == [
+        "The response is 11 characters long; the limit is 10."
+    ]
+    assert check("x" * 3, {"type": "min_length", "chars": 5}) == [
+        "The response is 3 characters long; at least 5 are required."
+    ]
+
+
+def test_every_failure_is_reported():
+    failures = check(
+        "no tags here",
+        {"type": "regex", "pattern": "^OK"},
+        {"type": "required_tags", "tags": ["ANSWER"]},
+        {"type": "max_length", "chars": 5},
+    )
+
+    assert len(failures) == 3
+
+
+def test_failure_evaluation_reads_as_a_failed_evaluation():
+    evaluation = failure_evaluation(["First problem.", "Second problem."])
+
+    failed, reasoning = extract_evaluation_feedback(evaluation)
+
+    assert failed
+    assert "- First problem.\n- Second problem." in reasoning
@@ -0,0 +1,89 @@
+from convergence import ConvergenceTracker
+
+
+def run_iteration(tracker, prompt, passed, failed):
+    for number in range(passed + failed):
+        tracker.record_result(
+            f"TEST_CASE_{number + 1}", prompt, {}, "", "", number >= passed
+        )
+    return tracker.end_iteration(prompt)
+
+
+def test_end_iteration_returns_the_pass_rate():
+    tracker = ConvergenceTracker()
+
+    assert run_iteration(tracker, "p1", 1, 3) == 0.25
+    assert run_iteration(tracker, "p2", 2, 2) == 0.5
+    assert tracker.pass_rates == [0.25, 0.5]
+
+
+def test_nothing_evaluated_is_not_an_iteration():
+    tracker = ConvergenceTracker()
+
+    assert tracker.end_iteration("p1") is None
+    assert tracker.pass_rates == []
+    assert tracker.stop_reason() is None
+
+
+def test_all_passed():
+    tracker = ConvergenceTracker()
+    run_iteration(tracker, "p1", 3, 0)
+
+    assert tracker.stop_reason() == "all_passed"
+
+
+def test_keeps_the_best_prompt():
+    tracker = ConvergenceTracker()
+    for prompt, passed in [("p1", 1), ("p2", 3), ("p3", 2)]:
+        run_iteration(tracker, prompt, passed, 4 - passed)
+
+    assert tracker.best_prompt == "p2"
+    assert tracker.best_pass_rate == 0.75
+    assert tracker.best_iteration == 2
+
+
+def test_ties_keep_the_earlier_prompt():
+    tracker = ConvergenceTracker()
+    run_iteration(tracker, "p1", 2, 2)
+    run_iteration(tracker, "p2", 2, 2)
+
+    assert tracker.best_prompt == "p1"
+
+
+def test_plateau_after_patience_iterations_without_improvement():
+    tracker = ConvergenceTracker(patience=2)
+    run_iteration(tracker, "p1", 2, 2)
+    run_iteration(tracker, "p2", 1, 3)
+    assert tracker.stop_reason() is None
+
+    run_iteration(tracker, "p3", 2, 2)
+
+    assert tracker.stop_reason() == "plateau"
+
+
+def test_improvements_below_min_gain_do_not_reset_patience():
+    tracker = ConvergenceTracker(patience=2, min_gain=0.1)
+    run_iteration(tracker, "p1", 10, 10)
+    run_iteration(tracker, "p2", 11, 9)
+    run_iteration(tracker, "p3", 12, 8)
+
+    assert tracker.stop_reason() == "plateau"
+    # A small gain still counts for the best prompt
+    assert tracker.best_prompt == "p3"
+
+
+def test_oscillation():
+    tracker = ConvergenceTracker(patience=10)
+    for prompt, passed in [("p1", 1), ("p2", 3), ("p3", 1), ("p4", 3)]:
+        run_iteration(tracker, prompt, passed, 4 - passed)
+
+    assert tracker.is_oscillating()
+    assert tracker.stop_reason() == "oscillation"
+
+
+def test_steady_improvement_continues():
+    tracker = ConvergenceTracker(patience=1)
+    for prompt, passed in [("p1", 1), ("p2", 2), ("p3", 3)]:
+        run_iteration(tracker, prompt, passed, 4 - passed)
+
+    assert tracker.stop_reason() is None
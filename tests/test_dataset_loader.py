@@ -0,0 +1,70 @@
+import json
+
+from dataset_loader import iter_dataset, resolve_column_mapping
+
+
+def write_jsonl(path, rows):
+    path.write_text("\n".join(json.dumps(row) for row in rows) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_iter_dataset_streams_jsonl_rows(tmp_path):
+    path = write_jsonl(tmp_path / "inputs.jsonl", [{"TEXT": "a"}, {"TEXT": "b"}])
+
+    rows = list(iter_dataset(path, ["{TEXT}"]))
+
+    assert rows == [("ROW_1", {"TEXT": "a"}), ("ROW_2", {"TEXT": "b"})]
+
+
+def test_iter_dataset_reads_csv(tmp_path):
+    path = tmp_path / "inputs.csv"
+    path.write_text("body,language\nhello,French\n", encoding="utf-8")
+
+    rows = list(iter_dataset(str(path), ["{TEXT}", "{LANGUAGE}"], {"TEXT": "body"}))
+
+    assert rows == [("ROW_1", {"TEXT": "hello", "LANGUAGE": "French"})]
+
+
+def test_iter_dataset_matches_columns_case_insensitively(tmp_path):
+    path = write_jsonl(tmp_path / "inputs.jsonl", [{"text": "a", "extra": 1}])
+
+    assert list(iter_dataset(path, ["{TEXT}"])) == [("ROW_1", {"TEXT": "a"})]
+
+
+def test_iter_dataset_converts_values_to_strings(tmp_path):
+    path = write_jsonl(tmp_path / "inputs.jsonl", [{"TEXT": 42}])
+
+    assert list(iter_dataset(path, ["{TEXT}"])) == [("ROW_1", {"TEXT": "42"})]
+
+
+def test_iter_dataset_skips_bad_rows(tmp_path):
+    path = tmp_path / "inputs.jsonl"
+    path.write_text(
+        '{"TEXT": "a"}\nnot json\n\n[1, 2]\n{"OTHER": "x"}\n{"TEXT": "b"}\n',
+        encoding="utf-8",
+    )
+
+    rows = list(iter_dataset(str(path), ["{TEXT}"]))
+
+    assert rows == [("ROW_1", {"TEXT": "a"}), ("ROW_4", {"TEXT": "b"})]
+
+
+def test_iter_dataset_stops_if_a_placeholder_has_no_column(tmp_path):
+    path = write_jsonl(tmp_path / "inputs.jsonl", [{"BODY": "a"}])
+
+    assert list(iter_dataset(path, ["{TEXT}"])) == []
+
+
+def test_iter_dataset_rejects_missing_and_unsupported_files(tmp_path):
+    assert list(iter_dataset(str(tmp_path / "missing.jsonl"), ["{TEXT}"])) == []
+    assert list(iter_dataset(str(tmp_path / "inputs.txt"), ["{TEXT}"])) == []
+
+
+def test_resolve_column_mapping_prefers_explicit_mappings():
+    mapping = resolve_column_mapping(["TEXT", "body"], ["{TEXT}"], {"TEXT": "body"})
+
+    assert mapping == {"TEXT": "body"}
+
+
+def test_resolve_column_mapping_rejects_unknown_explicit_columns():
+    assert resolve_column_mapping(["TEXT"], ["{TEXT}"], {"TEXT": "missing"}) is None
@@ -0,0 +1,50 @@
+import asyncio
+
+from api_communication import LLMBackend
+from key_pool import KeyPool, PooledKey
+
+
+class StreamingBackend(LLMBackend):
+    """Streams a fixed answer and records its usage on itself, like the real backends."""
+
+    provider_name = "Local"
+
+    def get_client(self):
+        return None
+
+    async def _complete(self, prompt, model, max_tokens, temperature, stop, timeout):
+        return "<ANSWER>42</ANSWER>", 3, 2
+
+    async def _stream(self, prompt, model, max_tokens, temperature, stop, timeout):
+        for chunk in ("<ANSWER>", "42", "</ANSWER>"):
+            await asyncio.sleep(0)
+            yield chunk
+        self._record_usage(3, 2)
+
+
+async def stream(pool):
+    return "".join([chunk async for chunk in pool.stream_request_to_model("Q?", "m")])
+
+
+def test_streamed_usage_is_recorded_on_the_pool():
+    # Two streams run on each key at once
+    pool = KeyPool(
+        [
+            PooledKey(StreamingBackend("key-one"), max_concurrency=2),
+            PooledKey(StreamingBackend("key-two"), max_concurrency=2),
+        ]
+    )
+
+    async def main():
+        return await asyncio.gather(*(stream(pool) for _ in range(4)))
+
+    responses = asyncio.run(main())
+
+    assert responses == ["<ANSWER>42</ANSWER>"] * 4
+    usage = pool.get_usage()
+    assert (usage["requests"], usage["input_tokens"], usage["output_tokens"]) == (
+        4,
+        12,
+        8,
+    )
+    assert [key["requests"] for key in usage["keys"]] == [2, 2]
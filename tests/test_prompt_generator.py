@@ -0,0 +1,96 @@
+import asyncio
+import re
+
+from api_communication import LLMBackend
+from prompt_generator import run_iterations
+from prompt_processing import PromptProcessor
+from regression import load_suite
+
+# Which inputs each generated prompt fails: prompt 1 passes 2 of 3, later ones fewer
+FAILING_INPUTS = {1: {1}, 2: {1, 2, 3}}
+
+
+class ScriptedBackend(LLMBackend):
+    """Numbers each generated prompt and records the prompts feedback was given for."""
+
+    provider_name = "Anthropic"
+
+    def __init__(self):
+        super().__init__("test-key")
+        self.generated = 0
+        self.feedback_prompts = []
+
+    def get_client(self):
+        return None
+
+    async def _complete(self, prompt, model, max_tokens, temperature, stop, timeout):
+        if "improve an existing LLM prompt" in prompt or "craft a prompt" in prompt:
+            if "improve an existing LLM prompt" in prompt:
+                self.feedback_prompts.append(
+                    sorted(set(re.findall(r"Summarize text (\d+)", prompt)))
+                )
+            self.generated += 1
+            return (
+                f"<GENERATED_PROMPT>Summarize text {self.generated}: {{TEXT}}"
+                "</GENERATED_PROMPT>",
+                1,
+                1,
+            )
+        if "create test case inputs" in prompt:
+            cases = "".join(
+                f"<TEST_CASE_{i}><TEXT>input number {i}</TEXT></TEST_CASE_{i}>"
+                for i in range(1, 4)
+            )
+            return cases, 1, 1
+        if "evaluate the adherence" in prompt:
+            version = int(re.search(r"Summarize text (\d+)", prompt).group(1))
+            number = int(re.search(r"input number (\d+)", prompt).group(1))
+            failed = number in FAILING_INPUTS.get(version, {1, 2})
+            return (
+                "<EVALUATION_SCRATCHPAD>Checked.</EVALUATION_SCRATCHPAD>"
+                f"<EVALUATION_RESULT>{'FAIL' if failed else 'PASS'}</EVALUATION_RESULT>",
+                1,
+                1,
+            )
+        return "<SUMMARY>ok</SUMMARY>", 1, 1
+
+    async def _stream(self, *args):
+        yield ""
+
+
+def test_feedback_comes_from_the_best_prompt(tmp_path):
+    backend = ScriptedBackend()
+    processor = PromptProcessor(backend, "Anthropic")
+
+    prompt = asyncio.run(
+        run_iterations(
+            processor,
+            "Summarize a text {TEXT}.",
+            3,
+            results_path=str(tmp_path / "results.json"),
+            max_iterations=4,
+        )
+    )
+
+    # Prompt 1 passes the most; prompts 2 and 3 are regenerated from its failures
+    assert prompt == "Summarize text 1: {TEXT}"
+    assert backend.feedback_prompts == [["1"], ["1"], ["1"]]
+
+
+def test_regression_suite_uses_the_returned_prompt(tmp_path):
+    results_path = str(tmp_path / "results.json")
+    prompt = asyncio.run(
+        run_iterations(
+            PromptProcessor(ScriptedBackend(), "Anthropic"),
+            "Summarize a text {TEXT}.",
+            3,
+            results_path=results_path,
+            max_iterations=4,
+        )
+    )
+
+    test_cases, suite_prompt = load_suite(results_path)
+
+    # The results file ends with prompt 4, but the run returned prompt 1
+    assert suite_prompt == prompt == "Summarize text 1: {TEXT}"
+    assert sorted(test_cases) == ["TEST_CASE_1", "TEST_CASE_2", "TEST_CASE_3"]
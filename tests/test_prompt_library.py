@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+
+from api_communication import LLMBackend
+from prompt_library import GoalIndex, PromptLibrary
+from prompt_processing import PromptProcessor
+
+GOALS = [
+    ("news", "Summarize news articles in three bullet points"),
+    ("poems", "Translate poems from English to French"),
+    ("emails", "Classify customer emails by urgency"),
+]
+SUITE = {
+    "TEST_CASE_1": {"TEXT": "Parliament passed the budget after a long debate."},
+    "TEST_CASE_2": {"TEXT": "A storm closed schools across the region on Monday."},
+}
+
+
+class OfflineBackend(LLMBackend):
+    provider_name = "Anthropic"
+
+    def get_client(self):
+        return None
+
+    async def _complete(self, *args):
+        raise AssertionError("no requests expected")
+
+    async def _stream(self, *args):
+        yield ""
+
+
+@pytest.fixture
+def library(tmp_path):
+    library = PromptLibrary(str(tmp_path / "library.db"))
+    yield library
+    library.close()
+
+
+def test_goal_index_finds_the_most_similar_goal():
+    index = GoalIndex(GOALS)
+
+    key, similarity = index.nearest("Summarize sports articles in bullet points")
+
+    assert key == "news"
+    assert 0 < similarity < 1
+
+
+def test_goal_index_identical_goal_has_similarity_one():
+    key, similarity = GoalIndex(GOALS).nearest(GOALS[1][1])
+
+    assert key == "poems"
+    assert similarity == pytest.approx(1.0)
+
+
+def test_goal_index_ignores_case_and_punctuation():
+    key, similarity = GoalIndex(GOALS).nearest("CLASSIFY customer e-mails, by urgency!")
+
+    assert key == "emails"
+    assert similarity > 0.5
+
+
+def test_goal_index_without_shared_terms():
+    assert GoalIndex(GOALS).nearest("Write a haiku") is None
+    assert GoalIndex([]).nearest("anything") is None
+
+
+def test_rare_terms_weigh_more_than_common_ones():
+    index = GoalIndex(
+        [
+            ("a", "Summarize legal contracts"),
+            ("b", "Summarize news"),
+            ("c", "Summarize recipes"),
+        ]
+    )
+
+    assert index.nearest("Summarize contracts for lawyers")[0] == "a"
+
+
+def test_library_exact_match(library):
+    library.add(GOALS[0][1], "Summarize {TEXT}.", SUITE, 1.0, "Anthropic")
+
+    match = library.lookup(GOALS[0][1])
+
+    assert match.exact
+    assert match.prompt == "Summarize {TEXT}."
+    assert match.test_cases == SUITE
+    assert match.similarity == 1.0
+
+
+def test_library_similar_match(library):
+    library.add(GOALS[0][1], "Summarize {TEXT}.", SUITE, 1.0, "Anthropic")
+
+    match = library.lookup("Summarize news articles in five bullet points")
+
+    assert not match.exact
+    assert match.goal == GOALS[0][1]
+    assert match.similarity >= library.min_similarity
+
+
+def test_library_below_min_similarity(library):
+    library.add(GOALS[0][1], "Summarize {TEXT}.", SUITE, 1.0, "Anthropic")
+
+    assert library.lookup("Translate poems to French") is None
+
+
+def test_library_add_replaces_the_entry_and_refreshes_the_index(library):
+    library.add(GOALS[0][1], "Old {TEXT}", SUITE, 1.0, "Anthropic")
+    library.lookup("Summarize news")  # Builds the index
+    library.add(GOALS[1][1], "Translate {TEXT}", None, 1.0, "Anthropic")
+    library.add(GOALS[0][1], "New {TEXT}", SUITE, 1.0, "Anthropic")
+
+    assert library.lookup(GOALS[0][1]).prompt == "New {TEXT}"
+    match = library.lookup("Translate English poems into French")
+    assert match.prompt == "Translate {TEXT}"
+    assert match.test_cases == {}
+
+
+def check_stored(test_cases, num_test_cases, placeholders):
+    processor = PromptProcessor(OfflineBackend("test-key"), "Anthropic")
+    return asyncio.run(
+        processor.check_stored_test_cases(test_cases, num_test_cases, placeholders)
+    )
+
+
+def test_stored_suite_is_reused_when_valid():
+    assert check_stored(SUITE, 2, ["{TEXT}"]) == SUITE
+
+
+def test_stored_suite_fixes_placeholder_case():
+    suite = {name: {"text": case["TEXT"]} for name, case in SUITE.items()}
+
+    assert check_stored(suite, 2, ["{TEXT}"]) == SUITE
+    assert "text" in suite["TEST_CASE_1"]  # The stored suite is not modified
+
+
+def test_stored_suite_with_a_different_count_is_regenerated():
+    assert check_stored(SUITE, 3, ["{TEXT}"]) is None
+
+
+def test_stored_suite_with_other_placeholders_is_regenerated():
+    assert check_stored(SUITE, 2, ["{ARTICLE}"]) is None
+    assert check_stored(SUITE, 2, ["{TEXT}", "{LANGUAGE}"]) is None
+    assert check_stored({"TEST_CASE_1": "parsing failed"}, 1, ["{TEXT}"]) is None
+
+
+def test_stored_suite_drops_near_duplicates():
+    suite = {**SUITE, "TEST_CASE_3": dict(SUITE["TEST_CASE_1"])}
+
+    assert check_stored(suite, 3, ["{TEXT}"]) == SUITE
@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+import pytest
+
+from api_communication import LLMBackend
+from prompt_processing import PromptProcessor
+from result_store import ResultStore
+
+PROMPT = "Summarize {TEXT} in one sentence."
+# Passing evaluations that mention failure
+EVALUATIONS = [
+    "<EVALUATION_SCRATCHPAD>The summary does not fail to mention the key figure."
+    "</EVALUATION_SCRATCHPAD><EVALUATION_RESULT>PASS</EVALUATION_RESULT>",
+    "<EVALUATION_SCRATCHPAD>Accurate.</EVALUATION_SCRATCHPAD>"
+    "<EVALUATION_RESULT>PASS (no failures)</EVALUATION_RESULT>",
+]
+
+
+class JudgeBackend(LLMBackend):
+    """Answers every execution with a summary and every evaluation with a fixed one."""
+
+    provider_name = "Anthropic"
+
+    def __init__(self, evaluation):
+        super().__init__("test-key")
+        self.evaluation = evaluation
+
+    def get_client(self):
+        return None
+
+    async def _complete(self, prompt, model, max_tokens, temperature, stop, timeout):
+        if "evaluate the adherence" in prompt:
+            return self.evaluation, 1, 1
+        return "<SUMMARY>Prices rose.</SUMMARY>", 1, 1
+
+    async def _stream(self, *args):
+        yield ""
+
+
+@pytest.mark.parametrize("evaluation", EVALUATIONS)
+def test_dataset_and_generated_suites_agree_on_the_verdict(tmp_path, evaluation):
+    dataset = tmp_path / "inputs.jsonl"
+    dataset.write_text(json.dumps({"TEXT": "Prices rose 5%."}) + "\n")
+    processor = PromptProcessor(JudgeBackend(evaluation), "Anthropic")
+
+    _, stats, dataset_failed = asyncio.run(
+        processor.process_dataset(
+            str(dataset),
+            PROMPT,
+            ["{TEXT}"],
+            output_path=str(tmp_path / "dataset_results.jsonl"),
+        )
+    )
+    _, _, suite_failed = asyncio.run(
+        processor.process_test_cases(
+            {"TEST_CASE_1": {"TEXT": "Prices rose 5%."}}, PROMPT, ResultStore(), {}
+        )
+    )
+
+    assert stats["passed"] == 1
+    assert dataset_failed is suite_failed is False
@@ -0,0 +1,165 @@
+from prompt_processing_utils import (
+    apply_prompt_edits,
+    compact_failure_feedback,
+    extract_prompt_edits,
+)
+
+TEMPLATE = "Summarize the text.\n<TEXT>{TEXT}</TEXT>\nAnswer in English."
+
+
+def make_result(text, verdict, reasoning, prompt="Summarize {TEXT}."):
+    return {
+        "prompt": prompt,
+        "input": {"TEXT": text},
+        "response": f"Summary of {text}",
+        "evaluation": (
+            f"<EVALUATION_SCRATCHPAD>{reasoning}</EVALUATION_SCRATCHPAD>"
+            f"<EVALUATION_RESULT>{verdict}</EVALUATION_RESULT>"
+        ),
+    }
+
+
+def test_compact_failure_feedback_includes_the_prompt_once():
+    results = {
+        "TEST_CASE_1": make_result("first", "FAIL", "missed the point"),
+        "TEST_CASE_2": make_result("second", "FAIL", "too long"),
+    }
+
+    feedback = compact_failure_feedback(results, 10_000, 1_000)
+
+    assert feedback.count("Summarize {TEXT}.") == 1
+    assert feedback.startswith(
+        "<Original_Prompt>\nSummarize {TEXT}.\n</Original_Prompt>"
+    )
+
+
+def test_compact_failure_feedback_puts_failures_first():
+    results = {
+        "TEST_CASE_1": make_result("passing", "PASS", "good summary"),
+        "TEST_CASE_2": make_result("failing", "FAIL", "wrong language"),
+    }
+
+    feedback = compact_failure_feedback(results, 10_000, 1_000)
+
+    assert feedback.index("failing") < feedback.index("passing")
+    assert "<TEST_CASE_1>\n<Input1>\n{'TEXT': 'failing'}" in feedback
+
+
+def test_compact_failure_feedback_prefers_new_information():
+    results = {
+        "TEST_CASE_1": make_result("a", "FAIL", "the summary is too long"),
+        "TEST_CASE_2": make_result("b", "FAIL", "the summary is too long"),
+        "TEST_CASE_3": make_result("c", "FAIL", "bullet points were requested instead"),
+    }
+
+    feedback = compact_failure_feedback(results, 10_000, 1_000)
+
+    assert feedback.index("bullet points") < feedback.index("{'TEXT': 'b'}")
+
+
+def test_compact_failure_feedback_skips_identical_inputs():
+    results = {
+        "TEST_CASE_1": make_result("same", "FAIL", "first"),
+        "TEST_CASE_2": make_result("same", "FAIL", "second"),
+    }
+
+    feedback = compact_failure_feedback(results, 10_000, 1_000)
+
+    assert "<TEST_CASE_2>" not in feedback
+    assert "omitted" not in feedback
+
+
+def test_compact_failure_feedback_omits_cases_over_the_budget():
+    results = {
+        f"TEST_CASE_{i}": make_result(f"input {i} " * 50, "FAIL", f"reason {i}")
+        for i in range(1, 11)
+    }
+
+    feedback = compact_failure_feedback(results, 300, 1_000)
+
+    assert "<TEST_CASE_1>" in feedback
+    assert "<TEST_CASE_10>" not in feedback
+    included = feedback.count("</TEST_CASE_")
+    assert f"({10 - included} more test case(s) omitted" in feedback
+
+
+def test_compact_failure_feedback_keeps_one_case_over_the_budget():
+    results = {"TEST_CASE_1": make_result("x " * 500, "FAIL", "reason")}
+
+    feedback = compact_failure_feedback(results, 10, 1_000)
+
+    assert "<TEST_CASE_1>" in feedback
+    assert "omitted" not in feedback
+
+
+def test_compact_failure_feedback_truncates_long_fields():
+    results = {"TEST_CASE_1": make_result("word " * 1_000, "FAIL", "reason")}
+
+    feedback = compact_failure_feedback(results, 10_000, 20)
+
+    assert "characters truncated" in feedback
+    assert len(feedback) < 1_000
+
+
+def test_apply_prompt_edits_applies_edits_in_order():
+    edits = [
+        {"find": "Summarize the text.", "replace": "Summarize the text in one line."},
+        {"find": "in one line", "replace": "in one short line"},
+    ]
+
+    edited, reason = apply_prompt_edits(TEMPLATE, edits)
+
+    assert reason == ""
+    assert edited.startswith("Summarize the text in one short line.\n<TEXT>{TEXT}")
+
+
+def test_apply_prompt_edits_requires_exactly_one_match():
+    missing = [{"find": "Answer in French.", "replace": ""}]
+    repeated = [{"find": "T", "replace": "t"}]
+    empty = [{"find": "", "replace": "Be brief."}]
+
+    assert apply_prompt_edits(TEMPLATE, missing) == (
+        None,
+        "edit 1 matches the prompt 0 times instead of once",
+    )
+    assert apply_prompt_edits(TEMPLATE, repeated)[0] is None
+    assert apply_prompt_edits(TEMPLATE, empty)[0] is None
+
+
+def test_apply_prompt_edits_rejects_no_op_edits():
+    edits = [{"find": "English", "replace": "English"}]
+
+    assert apply_prompt_edits(TEMPLATE, edits) == (
+        None,
+        "the edits do not change the prompt",
+    )
+    assert apply_prompt_edits(TEMPLATE, [])[0] is None
+
+
+def test_apply_prompt_edits_keeps_placeholders():
+    renamed = [{"find": "{TEXT}", "replace": "{INPUT}"}]
+    removed = [{"find": "<TEXT>{TEXT}</TEXT>\n", "replace": ""}]
+
+    assert apply_prompt_edits(TEMPLATE, renamed) == (
+        None,
+        "the edits change the prompt's placeholders",
+    )
+    assert apply_prompt_edits(TEMPLATE, removed)[0] is None
+
+
+def test_extract_prompt_edits():
+    response = (
+        "<LESSONS_LEARNED>Be shorter.</LESSONS_LEARNED>\n<PROMPT_EDITS>\n"
+        '[{"find": "Summarize", "replace": "Briefly summarize"}]\n</PROMPT_EDITS>'
+    )
+
+    assert extract_prompt_edits(response) == [
+        {"find": "Summarize", "replace": "Briefly summarize"}
+    ]
+
+
+def test_extract_prompt_edits_rejects_malformed_edits():
+    assert extract_prompt_edits("No edits here") is None
+    assert extract_prompt_edits("<PROMPT_EDITS>[{</PROMPT_EDITS>") is None
+    assert extract_prompt_edits('<PROMPT_EDITS>{"find": "a"}</PROMPT_EDITS>') is None
+    assert extract_prompt_edits('<PROMPT_EDITS>[{"find": "a"}]</PROMPT_EDITS>') is None
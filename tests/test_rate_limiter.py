@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+import rate_limiter
+from rate_limiter import RateLimiter
+
+
+class FakeClock:
+    """Replaces time.monotonic and asyncio.sleep so waits are instant and measurable."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", clock.sleep)
+    return clock
+
+
+def acquire_times(limiter, clock, count):
+    async def run():
+        times = []
+        for _ in range(count):
+            await limiter.acquire()
+            times.append(clock.now)
+        return times
+
+    return asyncio.run(run())
+
+
+def test_rejects_a_non_positive_rate():
+    with pytest.raises(ValueError):
+        RateLimiter(0)
+
+
+def test_allows_one_second_of_requests_as_a_burst(clock):
+    limiter = RateLimiter(600)
+
+    assert acquire_times(limiter, clock, 10) == [0.0] * 10
+    assert clock.sleeps == []
+
+
+def test_spaces_requests_after_the_burst(clock):
+    limiter = RateLimiter(600)
+
+    times = acquire_times(limiter, clock, 13)
+
+    assert times[10:] == pytest.approx([0.1, 0.2, 0.3])
+
+
+def test_slow_rates_allow_one_request_at_a_time(clock):
+    limiter = RateLimiter(30)
+
+    assert acquire_times(limiter, clock, 3) == pytest.approx([0.0, 2.0, 4.0])
+
+
+def test_explicit_burst(clock):
+    limiter = RateLimiter(60, burst=3)
+
+    assert acquire_times(limiter, clock, 4) == pytest.approx([0.0, 0.0, 0.0, 1.0])
+
+
+def test_tokens_refill_while_idle(clock):
+    limiter = RateLimiter(60, burst=2)
+    acquire_times(limiter, clock, 2)
+    clock.now += 5.0  # Refills to the burst capacity, not beyond
+
+    times = acquire_times(limiter, clock, 3)
+
+    assert times == pytest.approx([5.0, 5.0, 6.0])
+
+
+def test_concurrent_waiters_start_in_arrival_order(clock):
+    limiter = RateLimiter(60, burst=1)
+    started = []
+
+    async def request(number):
+        await limiter.acquire()
+        started.append((number, clock.now))
+
+    async def run():
+        await asyncio.gather(*(request(number) for number in range(4)))
+
+    asyncio.run(run())
+
+    assert started == [(0, 0.0), (1, 1.0), (2, 2.0), (3, 3.0)]
@@ -0,0 +1,58 @@
+import json
+
+from regression import load_suite, read_manifest
+
+PROMPT = "Summarize {TEXT} in one sentence."
+
+
+def write_results(path, prompts):
+    path.write_text(
+        json.dumps(
+            [
+                {
+                    "test_case": f"TEST_CASE_{number}",
+                    "prompt_template": prompt,
+                    "input": {"TEXT": f"text {number}"},
+                }
+                for number, prompt in enumerate(prompts, start=1)
+            ]
+        )
+    )
+
+
+def test_load_suite_falls_back_to_the_last_prompt(tmp_path):
+    path = tmp_path / "results.json"
+    write_results(path, ["Old {TEXT}", PROMPT])
+
+    test_cases, prompt = load_suite(str(path))
+
+    assert prompt == PROMPT
+    assert test_cases == {
+        "TEST_CASE_1": {"TEXT": "text 1"},
+        "TEST_CASE_2": {"TEXT": "text 2"},
+    }
+
+
+def test_load_suite_prefers_the_saved_prompt(tmp_path):
+    path = tmp_path / "results.json"
+    write_results(path, [PROMPT, "Worse {TEXT}"])
+    (tmp_path / "results_prompt.txt").write_text(PROMPT)
+
+    assert load_suite(str(path))[1] == PROMPT
+
+
+def test_read_manifest_skips_duplicate_ids(tmp_path):
+    path = tmp_path / "nightly.jsonl"
+    path.write_text(
+        '{"id": "summary", "suite": "a.json"}\n'
+        '{"suite": "b.json"}\n'
+        '{"id": "summary", "suite": "c.json"}\n'
+        "[1, 2]\n"
+    )
+
+    payloads = read_manifest(str(path))
+
+    assert [(payload["id"], payload["suite"]) for payload in payloads] == [
+        ("summary", "a.json"),
+        ("suite_2", "b.json"),
+    ]
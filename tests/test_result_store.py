@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+import utils
+from result_store import ResultStore
+from utils import save_results_to_json
+
+PROMPT = "Summarize {TEXT} in one sentence."
+
+
+def make_store():
+    store = ResultStore()
+    store.add(
+        "TEST_CASE_1",
+        PROMPT,
+        {"TEXT": "Café prices rose 5% in 2024."},
+        "<SUMMARY>Prices rose.</SUMMARY>",
+        "<EVALUATION_SCRATCHPAD>Accurate.</EVALUATION_SCRATCHPAD>"
+        "<EVALUATION_RESULT>PASS</EVALUATION_RESULT>",
+    )
+    store.add(
+        "TEST_CASE_2",
+        PROMPT,
+        {"TEXT": "Line one\nline two"},
+        "Not XML at all",
+        "<EVALUATION_SCRATCHPAD>No summary tag.</EVALUATION_SCRATCHPAD>"
+        "<EVALUATION_RESULT>FAIL</EVALUATION_RESULT>",
+    )
+    store.add(0, "Write a haiku.", "None", "<HAIKU>a b c</HAIKU>", "PASS")
+    return store
+
+
+def test_results_file_matches_json_dump(tmp_path):
+    store = make_store()
+    path = tmp_path / "results.json"
+
+    save_results_to_json(store.iter_dicts(), str(path))
+
+    # The format of the former json.dump(results, file, indent=4)
+    expected = json.dumps(list(store.iter_dicts()), indent=4)
+    assert path.read_text() == expected
+
+
+def test_empty_results_file_matches_json_dump(tmp_path):
+    path = tmp_path / "results.json"
+
+    save_results_to_json(ResultStore().iter_dicts(), str(path))
+
+    assert path.read_text() == json.dumps([], indent=4)
+
+
+def test_results_file_ignores_the_compact_serializer(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "_json_serializer", lambda obj: "compact")
+    store = make_store()
+    path = tmp_path / "results.json"
+
+    save_results_to_json(store.iter_dicts(), str(path))
+
+    assert path.read_text() == json.dumps(list(store.iter_dicts()), indent=4)
+
+
+def test_entries_have_the_results_file_fields():
+    entry = next(make_store().iter_dicts())
+
+    assert entry == {
+        "test_case": "TEST_CASE_1",
+        "input": {"TEXT": "Café prices rose 5% in 2024."},
+        "prompt_template": PROMPT,
+        "raw_response": "<SUMMARY>Prices rose.</SUMMARY>",
+        "parsed_response": {"SUMMARY": "Prices rose."},
+        "parsed_evaluation": {
+            "EVALUATION_SCRATCHPAD": "Accurate.",
+            "EVALUATION_RESULT": "PASS",
+        },
+    }
+
+
+def test_prompt_versions_are_stored_once():
+    store = make_store()
+
+    assert len(store) == 3
+    assert len(store.versions) == 2
+    first, second, _ = store
+    assert first.prompt_id == second.prompt_id
+    assert second.prompt == PROMPT
+
+
+def test_records_support_the_test_result_keys():
+    record = next(iter(make_store()))
+
+    assert record["prompt"] == PROMPT
+    assert record["input"] == {"TEXT": "Café prices rose 5% in 2024."}
+    assert record["response"] == "<SUMMARY>Prices rose.</SUMMARY>"
+    with pytest.raises(KeyError):
+        record["parsed_response"]
@@ -0,0 +1,62 @@
+import sqlite3
+
+import run_history
+from run_history import RunHistory, connect
+
+PROMPT = "Summarize {TEXT} in one sentence."
+
+
+def record_iteration(history, test_case):
+    history.start_iteration()
+    history.record_prompt_version(PROMPT)
+    history.record_result(
+        test_case, PROMPT, {"TEXT": "Prices rose."}, "<S>Up.</S>", "PASS", False
+    )
+    history.record_api_call(
+        {
+            "provider": "Local",
+            "task": "test-case-execution",
+            "test_case": test_case,
+            "model": "local-model",
+            "latency": 0.5,
+            "input_tokens": 10,
+            "output_tokens": 5,
+            "success": True,
+            "status_code": 200,
+        }
+    )
+
+
+def test_concurrent_runs_do_not_lock_each_other_out(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_history, "BUSY_TIMEOUT", 0.1)
+    path = str(tmp_path / "history.db")
+    first = RunHistory("Summarize articles", "Local", path)
+    record_iteration(first, "TEST_CASE_1")
+
+    # A second process starts and records while the first is mid-iteration
+    second = RunHistory("Translate articles", "Local", path)
+    record_iteration(second, "TEST_CASE_1")
+    second.finish(PROMPT)
+    first.finish(PROMPT)
+
+    connection = connect(path)
+    assert connection.execute("SELECT COUNT(*) FROM results").fetchone() == (2,)
+    assert connection.execute("SELECT COUNT(*) FROM api_calls").fetchone() == (2,)
+    assert connection.execute(
+        "SELECT COUNT(*) FROM runs WHERE finished_at IS NOT NULL"
+    ).fetchone() == (2,)
+    connection.close()
+
+
+def test_rows_are_written_at_the_next_iteration(tmp_path):
+    path = str(tmp_path / "history.db")
+    history = RunHistory("Summarize articles", "Local", path)
+    record_iteration(history, "TEST_CASE_1")
+    reader = sqlite3.connect(path)
+
+    assert reader.execute("SELECT COUNT(*) FROM results").fetchone() == (0,)
+    history.start_iteration()
+    assert reader.execute("SELECT COUNT(*) FROM results").fetchone() == (1,)
+    assert reader.execute("SELECT COUNT(*) FROM prompt_versions").fetchone() == (1,)
+    history.finish(PROMPT)
+    reader.close()
@@ -0,0 +1,109 @@
+import json
+
+import structured_output
+from assertions import schema_errors
+from structured_output import (
+    EVALUATION_SCHEMA,
+    GENERATED_PROMPT_SCHEMA,
+    parse_structured_output,
+    structured_output_instructions,
+    to_evaluation,
+    to_test_cases,
+)
+from prompt_processing_utils import extract_evaluation_feedback
+
+# Imported from the module so pytest does not collect it as a test
+build_test_case_schema = structured_output.test_case_schema
+
+
+def test_schema_errors_checks_types():
+    assert schema_errors("text", {"type": "string"}) == []
+    assert schema_errors(3, {"type": "number"}) == []
+    assert schema_errors(3.5, {"type": "integer"}) == ["$ is not of type integer"]
+    # JSON booleans are not numbers, although bool is an int subclass in Python
+    assert schema_errors(True, {"type": "integer"}) == ["$ is not of type integer"]
+    assert schema_errors(None, {"type": "null"}) == []
+
+
+def test_schema_errors_reports_nested_paths():
+    schema = {
+        "type": "object",
+        "required": ["items"],
+        "properties": {
+            "items": {
+                "type": "array",
+                "items": {"type": "object", "required": ["name"]},
+            }
+        },
+    }
+
+    assert schema_errors({"items": [{"name": "a"}, {}]}, schema) == [
+        "$.items[1] is missing required key 'name'"
+    ]
+    assert schema_errors({}, schema) == ["$ is missing required key 'items'"]
+    assert schema_errors({"items": "a"}, schema) == ["$.items is not of type array"]
+
+
+def test_schema_errors_checks_enums():
+    assert schema_errors("PASS", {"enum": ["PASS", "FAIL"]}) == []
+    assert schema_errors("MAYBE", {"enum": ["PASS", "FAIL"]}) == [
+        "$ is not one of ['PASS', 'FAIL']"
+    ]
+
+
+def test_schema_errors_ignores_unsupported_keywords():
+    assert schema_errors("abc", {"type": "string", "maxLength": 1}) == []
+
+
+def test_test_case_schema_requires_every_placeholder():
+    schema = build_test_case_schema(["{TEXT}", "{LANGUAGE}", "{TEXT}"])
+    test_case = schema["parameters"]["properties"]["test_cases"]["items"]
+
+    assert test_case["required"] == ["TEXT", "LANGUAGE"]
+    assert "assertions" not in schema["parameters"]["properties"]
+    assert (
+        "assertions"
+        in build_test_case_schema(["{TEXT}"], assertions=True)["parameters"][
+            "properties"
+        ]
+    )
+
+
+def test_parse_structured_output_validates_against_the_schema():
+    schema = build_test_case_schema(["{TEXT}"])
+    valid = {"prompt_analysis": "...", "test_cases": [{"TEXT": "a"}, {"TEXT": "b"}]}
+
+    assert parse_structured_output(json.dumps(valid), schema) == valid
+    assert parse_structured_output(json.dumps({"test_cases": []}), schema) is None
+    assert (
+        parse_structured_output(
+            json.dumps({"prompt_analysis": "", "test_cases": [{"TEXT": 1}]}), schema
+        )
+        is None
+    )
+    assert parse_structured_output("<TEST_CASE_1>", schema) is None
+
+
+def test_to_test_cases_numbers_test_cases():
+    output = {"prompt_analysis": "", "test_cases": [{"TEXT": "a"}, {"TEXT": "b"}]}
+
+    assert to_test_cases(output) == {
+        "TEST_CASE_1": {"TEXT": "a"},
+        "TEST_CASE_2": {"TEXT": "b"},
+    }
+
+
+def test_to_evaluation_reads_like_a_tagged_evaluation():
+    output = {"evaluation_scratchpad": " Too long. ", "evaluation_result": "FAIL"}
+
+    assert schema_errors(output, EVALUATION_SCHEMA["parameters"]) == []
+    assert extract_evaluation_feedback(to_evaluation(output)) == (True, "Too long.")
+
+
+def test_structured_output_instructions_name_the_first_field():
+    instructions = structured_output_instructions(GENERATED_PROMPT_SCHEMA)
+
+    assert "record_generated_prompt" in instructions
+    assert '<PROMPT_GENERATION_SCRATCHPAD> into "prompt_generation_scratchpad"' in (
+        instructions
+    )
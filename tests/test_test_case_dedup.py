@@ -0,0 +1,107 @@
+import os
+import subprocess
+import sys
+
+import test_case_dedup
+from test_case_dedup import (
+    estimate_similarity,
+    find_near_duplicates,
+    minhash_signature,
+    shingle,
+)
+
+ARTICLE = (
+    "The city council approved a new budget on Tuesday that raises spending on "
+    "public transport, adds two hundred teachers and freezes property taxes for a year"
+)
+
+
+def test_shingle_is_stable_across_processes():
+    code = (
+        "from test_case_dedup import shingle; " f"print(sorted(shingle({ARTICLE!r})))"
+    )
+    outputs = {
+        subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={
+                "PYTHONHASHSEED": seed,
+                "PYTHONPATH": os.path.dirname(test_case_dedup.__file__),
+            },
+        ).stdout
+        for seed in ("1", "2")
+    }
+
+    assert len(outputs) == 1
+    assert outputs.pop().strip() == str(sorted(shingle(ARTICLE)))
+
+
+def test_identical_inputs_have_identical_signatures():
+    signature = minhash_signature(shingle(ARTICLE))
+
+    assert estimate_similarity(signature, signature) == 1.0
+
+
+def test_find_near_duplicates_maps_duplicates_to_the_earlier_case():
+    test_cases = {
+        "TEST_CASE_1": {"TEXT": ARTICLE},
+        "TEST_CASE_2": {
+            "TEXT": "Write a haiku about autumn leaves falling in the rain"
+        },
+        "TEST_CASE_3": {"TEXT": ARTICLE.upper() + "."},
+        "TEST_CASE_4": {"TEXT": ARTICLE.replace("Tuesday", "Wednesday")},
+    }
+
+    duplicates = find_near_duplicates(test_cases, 0.6)
+
+    assert duplicates == {"TEST_CASE_3": "TEST_CASE_1", "TEST_CASE_4": "TEST_CASE_1"}
+
+
+def test_find_near_duplicates_keeps_distinct_inputs():
+    test_cases = {
+        f"TEST_CASE_{i}": {"TEXT": f"{topic} is described in detail for reader {i}"}
+        for i, topic in enumerate(
+            ["Photosynthesis in plants", "The history of Rome", "Quantum tunnelling"],
+            start=1,
+        )
+    }
+
+    assert find_near_duplicates(test_cases, 0.8) == {}
+
+
+def test_find_near_duplicates_compares_every_variable():
+    test_cases = {
+        "TEST_CASE_1": {"TEXT": ARTICLE, "LANGUAGE": "French"},
+        "TEST_CASE_2": {"TEXT": ARTICLE, "LANGUAGE": "German"},
+    }
+
+    assert find_near_duplicates(test_cases, 1.0) == {}
+
+
+def test_find_near_duplicates_keeps_questions_about_a_shared_document():
+    document = " ".join([ARTICLE] * 10)
+    questions = [
+        "When was the budget approved?",
+        "How many teachers will be added?",
+        "What happens to property taxes?",
+        "Which service gets more spending?",
+        "Who approved the budget?",
+    ]
+    test_cases = {
+        f"TEST_CASE_{i}": {"FAQ_DOCUMENT": document, "QUESTION": question}
+        for i, question in enumerate(questions, start=1)
+    }
+    test_cases["TEST_CASE_6"] = {
+        "FAQ_DOCUMENT": document,
+        "QUESTION": "when was the budget approved",
+    }
+
+    assert find_near_duplicates(test_cases, 0.9) == {"TEST_CASE_6": "TEST_CASE_1"}
+
+
+def test_find_near_duplicates_ignores_malformed_test_cases():
+    test_cases = {"TEST_CASE_1": "parsing failed", "TEST_CASE_2": {"TEXT": ARTICLE}}
+
+    assert find_near_duplicates(test_cases, 0.5) == {}
@@ -1,5 +1,9 @@
+from api_communication import BACKEND_REGISTRY
 from utils import print_info, print_success, print_warning
 
+GOAL_PREFIX = "The prompt should guide the LLM to: "
+MAX_TEST_CASES = 5
+
 
 def prompt_user():
     """
@@ -22,7 +26,7 @@ def prompt_user():
         print_info(f"\nInclude any input variables the model should consider\n")
         custom_prompt = input("This prompt should guide the LLM to: ")
         print_success(f"\nCustom prompt description entered: {custom_prompt}")
-        return "The prompt should guide the LLM to: " + custom_prompt
+        return GOAL_PREFIX + custom_prompt
     elif user_choice == "2":
         return display_presets()
     else:
@@ -46,7 +50,7 @@ def display_presets():
 
     if user_input in prompt_options:
         print_success(f"\nYou have selected: {prompt_options[user_input]}")
-        return "The prompt should guide the LLM to: " + prompt_options[user_input]
+        return GOAL_PREFIX + prompt_options[user_input]
     else:
         print_warning("\nInvalid selection. Please try again.")
         return display_presets()  # Recursive call for invalid input
@@ -92,24 +96,24 @@ def get_prompt_options():
 
 
 def get_provider():
-    """Prompts the user to select LLM provider, Anthropic or Writer.
+    """Prompts the user to select a registered LLM provider.
 
     Returns:
         str: The selected provider.
     """
+    providers = list(BACKEND_REGISTRY)
     while True:
         print_success("\nSelect the LLM provider:")
         print_info(
-            "Note: You will need an API key for the selected provider in a .env file.\n"
+            "Note: You will need an API key for the selected provider in a .env file "
+            "(or LOCAL_OPENAI_BASE_URL for a local server).\n"
         )
-        print("1. Anthropic")
-        print("2. Writer")
+        for i, provider in enumerate(providers, start=1):
+            print(f"{i}. {provider}")
         user_input = input("\nEnter the number of your choice: ")
 
-        if user_input == "1":
-            return "Anthropic"
-        elif user_input == "2":
-            return "Writer"
+        if user_input.isdigit() and 1 <= int(user_input) <= len(providers):
+            return providers[int(user_input) - 1]
         else:
             print_info("\nInvalid selection. Please try again.")
 
@@ -126,10 +130,14 @@ def get_test_cases_count():
     """
     while True:
         try:
-            count = int(input("\nEnter the number of test cases to generate (0-5): "))
-            if 0 <= count <= 5:
+            count = int(
+                input(
+                    f"\nEnter the number of test cases to generate (0-{MAX_TEST_CASES}): "
+                )
+            )
+            if 0 <= count <= MAX_TEST_CASES:
                 return count
             else:
-                print_warning("Please enter a number between 0 and 5.")
+                print_warning(f"Please enter a number between 0 and {MAX_TEST_CASES}.")
         except ValueError:
             print_warning("Invalid input. Please enter a number.")
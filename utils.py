@@ -1,33 +1,171 @@
+import argparse
 import json
+import os
+import threading
+import time
+from typing import Any, Callable, Optional, TextIO, Tuple
+
 from colorama import Fore, Style
 
+# Verbosity levels: QUIET shows errors, progress counters and the final summary; NORMAL adds
+# status messages; VERBOSE (the default) also shows full prompts, inputs and responses
+QUIET, NORMAL, VERBOSE = 0, 1, 2
+VERBOSITY_LEVELS = {"quiet": QUIET, "normal": NORMAL, "verbose": VERBOSE}
+
+_verbosity = VERBOSE
+# When set, every message is also written here as a JSON line, whatever the verbosity.
+# Messages also come from offload threads, so writes hold a lock to keep lines whole
+_log_sink: Optional[TextIO] = None
+_log_lock = threading.Lock()
+
+
+def set_verbosity(level: int) -> None:
+    global _verbosity
+    _verbosity = level
+
+
+def open_log_sink(path: str) -> None:
+    global _log_sink
+    close_log_sink()
+    with _log_lock:
+        _log_sink = open(path, "a", encoding="utf-8")
+
+
+def output_settings() -> Tuple[int, Optional[str]]:
+    """
+    Returns the verbosity and JSON log path, so worker processes can use the same settings.
+
+    Returns:
+        Tuple[int, Optional[str]]: The verbosity level and the log path, if any.
+    """
+    return _verbosity, _log_sink.name if _log_sink is not None else None
+
+
+def close_log_sink() -> None:
+    global _log_sink
+    with _log_lock:
+        if _log_sink is not None:
+            _log_sink.close()
+            _log_sink = None
+
+
+def add_output_arguments(parser: argparse.ArgumentParser, default: str = "verbose"):
+    parser.add_argument(
+        "--verbosity",
+        choices=list(VERBOSITY_LEVELS),
+        default=default,
+        help=f"How much to print (default: {default}).",
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        dest="verbosity",
+        action="store_const",
+        const="quiet",
+        help="Only print errors, progress counters and the final summary.",
+    )
+    parser.add_argument(
+        "--log-json", metavar="PATH", help="Also write every message to a JSONL log."
+    )
+
+
+def configure_output(args: argparse.Namespace) -> None:
+    set_verbosity(VERBOSITY_LEVELS[args.verbosity])
+    if args.log_json:
+        open_log_sink(args.log_json)
+
+
+def _output(kind: str, color: str, message: str, end: str, level: int) -> None:
+    if _log_sink is not None and message.strip():
+        line = to_json(
+            {"time": round(time.time(), 3), "level": kind, "message": message.strip()}
+        )
+        with _log_lock:
+            if _log_sink is not None:
+                _log_sink.write(line + "\n")
+    if _verbosity >= level:
+        print(f"{color}{message}{Style.RESET_ALL}" if color else message, end=end)
+
 
 # Example of using color-coded print statements:
-def print_info(message: str, end="\n"):
-    print(f"{Fore.BLUE}{message}{Style.RESET_ALL}", end=end)
+def print_info(message: str, end="\n", level=NORMAL):
+    _output("info", Fore.BLUE, message, end, level)
+
+
+def print_success(message: str, end="\n", level=NORMAL):
+    _output("success", Fore.GREEN, message, end, level)
 
 
-def print_success(message: str, end="\n"):
-    print(f"{Fore.GREEN}{message}{Style.RESET_ALL}", end=end)
+def print_warning(message: str, end="\n", level=NORMAL):
+    _output("warning", Fore.YELLOW, message, end, level)
 
 
-def print_warning(message: str, end="\n"):
-    print(f"{Fore.YELLOW}{message}{Style.RESET_ALL}", end=end)
+def print_error(message: str, end="\n", level=QUIET):
+    _output("error", Fore.RED, message, end, level)
 
 
-def print_error(message: str, end="\n"):
-    print(f"{Fore.RED}{message}{Style.RESET_ALL}", end=end)
+# Uncolored output such as full prompts, inputs and responses
+def print_detail(message: str, end="\n", level=VERBOSE):
+    _output("detail", "", message, end, level)
 
 
 # Function to print the final generated prompt and completion message
-def print_final_results(prompt_template: str):
-    print_info(f"\nGENERATED PROMPT:")
-    print(f"{prompt_template}")
-    print_success(f"\n\n*** Prompt generation and evaluation complete. ***")
-    print_info(f"*** See more in results.json file ***\n")
+def print_final_results(prompt_template: str, results_path: str = "results.json"):
+    print_info(f"\nGENERATED PROMPT:", level=QUIET)
+    print_detail(f"{prompt_template}", level=QUIET)
+    print_success(
+        f"\n\n*** Prompt generation and evaluation complete. ***", level=QUIET
+    )
+    print_info(f"*** See more in {results_path} file ***\n", level=QUIET)
+
+
+# Rough token count used where a provider does not report usage (~4 characters per token)
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4) if text else 0
+
+
+# Serializer for compact JSON (JSONL records); fast_runtime replaces it with orjson.
+# Compact output matches orjson's format (no spaces, UTF-8), so --fast writes the same
+# records. Pretty output (results files) always uses json, indented by 4 spaces, since
+# orjson only indents by 2
+_json_serializer: Optional[Callable[[Any], str]] = None
+_json_indent = 4
+
+
+def set_json_serializer(serializer: Optional[Callable[[Any], str]]) -> None:
+    global _json_serializer
+    _json_serializer = serializer
+
+
+def to_json(obj: Any, pretty: bool = False) -> str:
+    if pretty:
+        return json.dumps(obj, indent=_json_indent)
+    if _json_serializer is not None:
+        return _json_serializer(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
 
 
 # Function to save results to a JSON file
+# Entries are written one at a time so results can be streamed from a generator;
+# the output matches json.dump(results, file, indent=4)
 def save_results_to_json(results, filename="results.json"):
+    padding = "\n" + " " * _json_indent
     with open(filename, "w") as file:
-        json.dump(results, file, indent=4)
+        file.write("[")
+        count = 0
+        for result in results:
+            entry = to_json(result, pretty=True).replace("\n", padding)
+            file.write(f"{',' if count else ''}{padding}{entry}")
+            count += 1
+        file.write("\n]" if count else "]")
+
+
+# The prompt a run returned is saved next to its results file, since the results hold
+# every iteration's prompt and the returned one (the best) need not be the last
+def final_prompt_path(results_path: str) -> str:
+    return os.path.splitext(results_path)[0] + "_prompt.txt"
+
+
+def save_final_prompt(prompt_template: str, results_path: str = "results.json"):
+    with open(final_prompt_path(results_path), "w", encoding="utf-8") as file:
+        file.write(prompt_template)